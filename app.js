@@ -20,16 +20,34 @@ app.post('/chat', (req, res) => {
 
     try {
         // 1. Processamento NLP (Intenção e Entidades)
-        const processedTokens = nlpUtils.preprocessText(userMessage);
-        const tfidfVector = nlpUtils.calculateTfIdf(processedTokens);
-
-        if (!tfidfVector) {
-            console.error(`Falha ao calcular TF-IDF para: "${userMessage}" (Tokens: ${processedTokens ? processedTokens.join(',') : 'N/A'})`);
-            return res.status(500).json({ error: 'Falha ao calcular o vetor TF-IDF. Verifique os logs do servidor.' });
+        // Utterances frequentes saem do cache de respostas com uma consulta; as demais passam pelo pipeline completo.
+        const nlpStart = process.hrtime.bigint();
+        const cached = nlpUtils.lookupCachedResponse(userMessage);
+        let predictedIntent;
+        let extractedEntities;
+        if (cached) {
+            predictedIntent = cached.intent;
+            // Entidades do cache só quando o texto é idêntico; senão dependem do texto cru
+            extractedEntities = cached.entities || nlpUtils.extractEntities(userMessage);
+        } else {
+            const processedTokens = nlpUtils.preprocessText(userMessage);
+            if (nlpUtils.isFusedModelLoaded()) {
+                // Tabela fundida: custo proporcional ao número de tokens da mensagem
+                predictedIntent = nlpUtils.predictIntentFused(processedTokens);
+            } else {
+                const tfidfVector = nlpUtils.calculateTfIdf(processedTokens);
+
+                if (!tfidfVector) {
+                    console.error(`Falha ao calcular TF-IDF para: "${userMessage}" (Tokens: ${processedTokens ? processedTokens.join(',') : 'N/A'})`);
+                    return res.status(500).json({ error: 'Falha ao calcular o vetor TF-IDF. Verifique os logs do servidor.' });
+                }
+
+                predictedIntent = nlpUtils.predictIntent(tfidfVector);
+            }
+            extractedEntities = nlpUtils.extractEntities(userMessage); // Usar a mensagem original
+            nlpUtils.cacheResponse(userMessage, predictedIntent, extractedEntities);
         }
-
-        const predictedIntent = nlpUtils.predictIntent(tfidfVector);
-        const extractedEntities = nlpUtils.extractEntities(userMessage); // Usar a mensagem original
+        nlpUtils.recordResponseLatency(Boolean(cached), Number(process.hrtime.bigint() - nlpStart) / 1e6);
 
         // 2. Gerenciamento da Conversa e Geração da Resposta da IA
         if (!predictedIntent) { // Se nlp_utils.predictIntent retornar null ou um fallback problemático
@@ -76,6 +94,11 @@ app.get('/session/:userId', (req, res) => {
 });
 
 
+// Endpoint GET /metrics/response-cache: taxa de acerto e latência média (acerto vs. pipeline completo)
+app.get('/metrics/response-cache', (req, res) => {
+    res.json(nlpUtils.getResponseCacheStats());
+});
+
 // Endpoint GET /health para verificações de saúde básicas
 app.get('/health', (req, res) => {
     res.status(200).json({ status: 'UP', message: 'Serviço de NLP e Conversa está operacional.' });
@@ -87,4 +110,5 @@ app.listen(port, () => {
     console.log('Endpoint POST /chat esperando por requisições (Ex: {"message": "Olá", "userId": "user123"})');
     console.log('Endpoint GET /session/:userId disponível para checagem de sessão.');
     console.log('Endpoint GET /health disponível para checagem de status.');
+    console.log('Endpoint GET /metrics/response-cache disponível para estatísticas do cache de respostas.');
 });
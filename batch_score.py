@@ -0,0 +1,184 @@
+import argparse
+import collections
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from intent_runtime import MODELS_DIR, IntentRuntime
+from response_cache import cached_top_k, format_stats, load_response_cache
+
+# Rotulagem em lote de logs de conversa em JSONL.
+#
+# Pipeline de geradores com memória limitada:
+#   leitura (arquivo ou stdin) -> blocos de tamanho fixo -> pré-processamento
+#   -> vetorização -> classificação -> entidades -> escrita JSONL
+# Os blocos podem ser distribuídos entre processos; no máximo 2 blocos por
+# processo ficam em voo e a saída sai sempre na ordem da entrada.
+# Utterances repetidas saem do cache de respostas exportado (response_cache.py),
+# quando ele existe e corresponde aos artefatos atuais.
+# Com --binary o modelo vem do formato binário (models/bin, memory-map) em vez dos
+# JSONs; o cache de respostas, versionado pelos JSONs, não é usado nesse modo.
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def read_records(stream, text_field):
+    # Cada linha: objeto JSON com o campo de texto, ou uma string JSON simples.
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'_line': line_number, 'error': f'JSON inválido: {e}'}, None
+            continue
+        if isinstance(record, str):
+            record = {text_field: record}
+        text = record.get(text_field) if isinstance(record, dict) else None
+        if not isinstance(text, str):
+            yield {'_line': line_number, 'error': f"Campo '{text_field}' ausente ou não é texto"}, None
+            continue
+        yield record, text
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+_worker_runtime = None
+_worker_cache = None
+
+
+def _init_worker(models_dir, use_cache=True, binary=False):
+    global _worker_runtime, _worker_cache
+    _worker_runtime = IntentRuntime(models_dir, binary=binary)
+    _worker_cache = load_response_cache(models_dir) if use_cache else None
+
+
+def score_chunk(chunk, top_k=1, runtime=None, cache=None):
+    if runtime is None:
+        runtime, cache = _worker_runtime, _worker_cache
+    start = time.perf_counter()
+    texts = [text for _, text in chunk if text is not None]
+    scored = iter(cached_top_k(runtime, texts, top_k, cache))
+    results = []
+    for record, text in chunk:
+        if text is None:
+            results.append(record)
+            continue
+        candidates, entities = next(scored)
+        output = dict(record)
+        output['intent'] = candidates[0][0]
+        output['score'] = candidates[0][1]
+        if top_k > 1:
+            output['top_k'] = [{'intent': intent, 'score': score} for intent, score in candidates]
+        output['entities'] = entities
+        results.append(output)
+    return results, time.perf_counter() - start
+
+
+def iter_scored_chunks(chunks, models_dir, top_k, workers, cache=None, binary=False):
+    # cache: só no modo serial (cada processo do pool carrega o seu).
+    if not workers or workers <= 1:
+        runtime = IntentRuntime(models_dir, binary=binary)
+        for chunk in chunks:
+            yield score_chunk(chunk, top_k, runtime, cache)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(models_dir, cache is not None, binary)) as executor:
+        in_flight = collections.deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(score_chunk, chunk, top_k))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(input_stream, output_stream, models_dir=MODELS_DIR, text_field='text', chunk_size=DEFAULT_CHUNK_SIZE,
+        workers=None, top_k=1, use_cache=True, binary=False):
+    start = time.perf_counter()
+    records = read_records(input_stream, text_field)
+    # As respostas do cache vêm do modelo em precisão total dos JSONs: no modo binário (quantizado) ficam de fora.
+    cache = load_response_cache(models_dir) if use_cache and not binary else None
+    total = 0
+    errors = 0
+    chunk_latencies = []
+    for results, elapsed in iter_scored_chunks(chunked(records, chunk_size), models_dir, top_k, workers, cache, binary):
+        chunk_latencies.append(elapsed)
+        for result in results:
+            total += 1
+            errors += 'error' in result
+            output_stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+    elapsed = time.perf_counter() - start
+
+    chunk_latencies.sort()
+    scored = total - errors
+    return {
+        'records': total,
+        'scored': scored,
+        'errors': errors,
+        'chunks': len(chunk_latencies),
+        'seconds': elapsed,
+        'records_per_second': scored / elapsed if elapsed > 0 else 0.0,
+        'chunk_latency_p50_ms': percentile(chunk_latencies, 0.50) * 1000,
+        'chunk_latency_p95_ms': percentile(chunk_latencies, 0.95) * 1000,
+        'chunk_latency_p99_ms': percentile(chunk_latencies, 0.99) * 1000,
+        'mean_latency_per_record_ms': (sum(chunk_latencies) / scored * 1000) if scored else 0.0,
+        # No modo multiprocessado cada processo tem o próprio cache; só o serial é reportado.
+        'response_cache': cache.stats() if cache is not None and not (workers and workers > 1) else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classifica utterances de um JSONL (arquivo ou stdin) em blocos e grava JSONL.")
+    parser.add_argument('input', nargs='?', default='-', help="Arquivo JSONL de entrada ('-' para stdin)")
+    parser.add_argument('-o', '--output', default='-', help="Arquivo JSONL de saída ('-' para stdout)")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--text-field', default='text', help="Campo com o texto da mensagem em cada linha")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help="Processos para classificar blocos em paralelo")
+    parser.add_argument('--top-k', type=int, default=1, help="Inclui as k intenções mais prováveis com score")
+    parser.add_argument('--no-response-cache', action='store_true', help="Não consulta o cache de respostas exportado")
+    parser.add_argument('--binary', action='store_true',
+                        help="Carrega o modelo do formato binário (models-dir/bin, memory-map) em vez dos JSONs")
+    args = parser.parse_args(argv)
+
+    input_stream = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        summary = run(input_stream, output_stream, args.models_dir, args.text_field, args.chunk_size,
+                      args.workers, args.top_k, use_cache=not args.no_response_cache, binary=args.binary)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+    print(f"{summary['scored']} mensagens classificadas ({summary['errors']} linhas com erro) em {summary['seconds']:.2f}s "
+          f"-> {summary['records_per_second']:.0f} mensagens/s", file=sys.stderr)
+    print(f"Latência por bloco de {args.chunk_size}: p50 {summary['chunk_latency_p50_ms']:.1f} ms, "
+          f"p95 {summary['chunk_latency_p95_ms']:.1f} ms, p99 {summary['chunk_latency_p99_ms']:.1f} ms; "
+          f"média por mensagem {summary['mean_latency_per_record_ms']:.3f} ms", file=sys.stderr)
+    if summary['response_cache']:
+        print(format_stats(summary['response_cache']), file=sys.stderr)
+    return summary
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import json
+import random
+import re
+import time
+from entity_matcher import EntityMatcher, build_automaton
+
+# Benchmark da extração de entidades por dicionário: laço de regex por valor
+# (como nlp_utils.extractEntities, que compila um RegExp por valor a cada
+# mensagem) contra o autômato Aho-Corasick, para dicionários de 10 a 100k valores.
+
+SIZES = [10, 100, 1000, 10000, 100000]
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'la', 'me', 'ni', 'po', 'ru', 'sa', 'te', 'vi', 'xo', 'ção', 'são', 'lê', 'pé']
+FILLER = ['quero', 'saber', 'do', 'plano', 'em', 'para', 'minha', 'família', 'hospital', 'cidade', 'rede', 'no', 'bairro']
+
+
+def synthetic_dictionaries(size, rng):
+    values = set()
+    while len(values) < size:
+        words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(rng.randint(1, 3))]
+        values.add(' '.join(words))
+    values = sorted(values)
+    # Mesmo formato de entity_dictionaries.json: tipo -> lista de valores
+    types = ['nome_operadora', 'bairro_cidade', 'nome_hospital']
+    return {entity_type: values[i::len(types)] for i, entity_type in enumerate(types)}, values
+
+
+def synthetic_messages(values, count, rng):
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(8, 20))]
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randint(0, len(words)), rng.choice(values))
+        messages.append(' '.join(words))
+    return messages
+
+
+def regex_loop(entity_dictionaries, text):
+    # Equivalente ao laço atual: compila um padrão \b<valor>\b por valor, por mensagem.
+    text_lower = text.lower()
+    found = []
+    for entity_type, values in entity_dictionaries.items():
+        for value in values:
+            if re.compile(r'\b' + re.escape(value.lower()) + r'\b').search(text_lower):
+                found.append((entity_type, value))
+    return found
+
+
+def time_per_message(function, messages):
+    start = time.perf_counter()
+    results = [function(message) for message in messages]
+    return (time.perf_counter() - start) / len(messages), results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark: regex por valor vs. autômato Aho-Corasick.")
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--regex-max-size', type=int, default=10000,
+                        help="Maior dicionário em que o laço de regex é medido (acima disso é lento demais)")
+    parser.add_argument('--output', default=None, help="Grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    rows = []
+    print(f"{'valores':>8} | {'build (ms)':>10} | {'artefato (KB)':>13} | {'autômato (µs/msg)':>17} | {'regex (µs/msg)':>14} | speedup")
+    for size in SIZES:
+        entity_dictionaries, values = synthetic_dictionaries(size, rng)
+        messages = synthetic_messages(values, args.messages, rng)
+
+        start = time.perf_counter()
+        automaton = build_automaton(entity_dictionaries)
+        build_ms = (time.perf_counter() - start) * 1000
+        artifact_kb = len(json.dumps(automaton, ensure_ascii=False, separators=(',', ':')).encode('utf-8')) / 1024
+        matcher = EntityMatcher(automaton)
+        automaton_s, automaton_results = time_per_message(matcher.find_all, messages)
+
+        row = {'values': size, 'build_ms': build_ms, 'artifact_kb': artifact_kb,
+               'automaton_us_per_message': automaton_s * 1e6, 'regex_us_per_message': None}
+        if size <= args.regex_max_size:
+            regex_s, regex_results = time_per_message(lambda text: regex_loop(entity_dictionaries, text), messages)
+            for got, expected in zip(automaton_results, regex_results):
+                assert set(got) == set(expected), "Autômato e regex divergem."
+            row['regex_us_per_message'] = regex_s * 1e6
+        rows.append(row)
+
+        regex_text = f"{row['regex_us_per_message']:>14.1f}" if row['regex_us_per_message'] is not None else f"{'(pulado)':>14}"
+        speedup = f"{row['regex_us_per_message'] / row['automaton_us_per_message']:.0f}x" if row['regex_us_per_message'] else '-'
+        print(f"{size:>8} | {build_ms:>10.1f} | {artifact_kb:>13.1f} | {row['automaton_us_per_message']:>17.1f} | {regex_text} | {speedup}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    return rows
+
+
+if __name__ == '__main__':
+    main()
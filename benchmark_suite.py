@@ -0,0 +1,325 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+# Suíte de benchmark do pipeline de treino e de inferência.
+#
+# 1) Gera datasets sintéticos no esquema de dataset_planos_saude.json
+#    (intenções x exemplos x entidades) em 1x, 10x, 100x e 1000x o tamanho atual.
+#    O nº de exemplos e de valores de entidade cresce linearmente com a escala e
+#    o nº de intenções com a raiz cúbica (como um catálogo que ganha intenções
+#    mais devagar do que exemplos).
+# 2) Para cada escala, em um processo separado (pico de RSS isolado), mede:
+#    throughput do pré-processamento, fit do vetorizador e dos classificadores,
+#    tempo e tamanho da exportação, tempo de carga dos artefatos, latência de
+#    predição por mensagem e por lote (p50/p95/p99) e pico de RSS.
+# Resultados em JSON; --compare aponta regressões contra um baseline salvo.
+
+BASE_INTENTS = 11        # tamanho atual de models/dataset_planos_saude.json
+BASE_EXAMPLES = 40
+BASE_ENTITY_VALUES = 9
+SCALES = [1, 10, 100, 1000]
+RESULTS_PATH = 'benchmark_results.json'
+LATENCY_SAMPLES = 300
+BATCH_SIZE = 256
+REGRESSION_THRESHOLD = 0.10
+# Diferenças absolutas abaixo destes pisos são ruído de medição, não regressão.
+NOISE_FLOORS = {'_seconds': 0.005, '_ms': 0.05, '_bytes': 1024, '_per_second': 0.0}
+
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'la', 'me', 'ni', 'po', 'ru', 'sa', 'te', 'vi', 'xo', 'ção', 'são', 'lê', 'pé', 'nha', 'lho']
+FILLER = ['quero', 'saber', 'sobre', 'o', 'a', 'do', 'da', 'meu', 'minha', 'plano', 'para', 'como', 'qual', 'gostaria',
+          'preciso', 'ajuda', 'por', 'favor', 'com', 'no']
+ENTITY_TYPES = ['nome_plano', 'procedimento_medico', 'cidade_cotacao', 'nome_operadora', 'nome_hospital']
+FUNNEL_STAGES = ['ToFu', 'MoFu', 'BoFu', 'FAQ']
+TOPIC_WORDS_PER_INTENT = 8
+TEMPLATES_PER_INTENT = 5
+
+
+def _word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def generate_dataset(scale, seed=42):
+    rng = random.Random(seed + scale)
+    n_intents = max(2, round(BASE_INTENTS * scale ** (1 / 3)))
+    intents = []
+    for i in range(n_intents):
+        topic = [_word(rng) for _ in range(TOPIC_WORDS_PER_INTENT)]
+        intents.append({
+            'etapa_funil': rng.choice(FUNNEL_STAGES),
+            'intencao': f'intencao_{i:04d}',
+            'exemplos_usuario': [],
+            'entidades': [],
+            'resposta_ia': f"Resposta sintética para a intenção {i}.",
+            '_templates': [rng.sample(topic, rng.randint(2, 4)) for _ in range(TEMPLATES_PER_INTENT)],
+        })
+
+    for _ in range(BASE_ENTITY_VALUES * scale):
+        item = intents[rng.randrange(n_intents)]
+        value = ' '.join(_word(rng) for _ in range(rng.randint(1, 2)))
+        item['entidades'].append({'tipo_entidade': rng.choice(ENTITY_TYPES), 'valor_entidade': value})
+
+    for j in range(BASE_EXAMPLES * scale):
+        item = intents[j % n_intents]
+        words = list(rng.choice(item['_templates']))
+        for _ in range(rng.randint(1, 3)):
+            words.insert(rng.randint(0, len(words)), rng.choice(FILLER))
+        if item['entidades'] and rng.random() < 0.3:
+            words.append(rng.choice(item['entidades'])['valor_entidade'])
+        text = ' '.join(words)
+        item['exemplos_usuario'].append(text[0].upper() + text[1:] + rng.choice(['?', '.', '']))
+
+    for item in intents:
+        del item['_templates']
+    return {'dataset': intents}
+
+
+def percentiles(values_seconds):
+    ordered = sorted(values_seconds)
+    if not ordered:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99)}
+
+
+def peak_rss_bytes():
+    # ru_maxrss vem em KB no Linux e em bytes no macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def benchmark_scale(scale, workdir, workers=None, seed=42):
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.pipeline import Pipeline
+    from dataset_loader import load_dataset
+    from entity_matcher import export_automaton
+    from fused_scoring import FUSED_FILENAME, export_fused_table
+    from intent_runtime import IntentRuntime
+    from text_preprocessing import download_nltk_resources, load_default_preprocessor
+    from train_pipeline import NGRAM_RANGE, build_classifiers, build_entity_dictionaries, export_json_artifacts
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not download_nltk_resources():
+            raise RuntimeError("Alguns recursos NLTK não puderam ser baixados/carregados.")
+    models_dir = os.path.join(workdir, 'models')
+    dataset_path = os.path.join(workdir, 'dataset.json')
+    with open(dataset_path, 'w', encoding='utf-8') as f:
+        json.dump(generate_dataset(scale, seed), f, ensure_ascii=False)
+    texts, intents, entities_data = load_dataset(dataset_path)
+    result = {
+        'scale': scale,
+        'dataset': {'intents': len(set(intents)), 'examples': len(texts),
+                    'entity_values': sum(len(item['entities']) for item in entities_data),
+                    'bytes': os.path.getsize(dataset_path)},
+    }
+
+    # Pré-processamento (preprocessador novo: cache de stems frio)
+    preprocessor = load_default_preprocessor()
+    processed, seconds = _timed(preprocessor.preprocess_batch, texts, workers=workers)
+    result['preprocessing'] = {'seconds': seconds, 'texts_per_second': len(texts) / seconds if seconds > 0 else 0.0}
+
+    # Fit
+    vectorizer = TfidfVectorizer(ngram_range=NGRAM_RANGE)
+    X, seconds = _timed(vectorizer.fit_transform, processed)
+    result['fit'] = {'vectorizer_seconds': seconds, 'vocabulary_size': len(vectorizer.vocabulary_)}
+    models = {}
+    for name, clf in build_classifiers().items():
+        models[name], result['fit'][f'{name}_seconds'] = _timed(clf.fit, X, intents)
+
+    # Exportação
+    entity_dictionaries = build_entity_dictionaries(entities_data)
+    export = {}
+    json_paths, export['json_seconds'] = _timed(export_json_artifacts, vectorizer, models['svm'], entity_dictionaries,
+                                                preprocessor.stop_words, models_dir)
+    json_paths['fused'] = os.path.join(models_dir, FUSED_FILENAME)
+    _, export['fused_seconds'] = _timed(export_fused_table, vectorizer, models['svm'], json_paths['fused'], processed[:1000])
+    json_paths['automaton'] = os.path.join(models_dir, 'entity_automaton.json')
+    _, export['automaton_seconds'] = _timed(export_automaton, entity_dictionaries, json_paths['automaton'])
+    joblib_paths = {name: os.path.join(workdir, f'intent_classifier_{name}.joblib') for name in models}
+    start = time.perf_counter()
+    for name, model in models.items():
+        joblib.dump(Pipeline([('tfidf', vectorizer), ('clf', model)]), joblib_paths[name])
+    export['joblib_seconds'] = time.perf_counter() - start
+    sizes = {name: os.path.getsize(path) for name, path in {**json_paths, **joblib_paths}.items()}
+    export['artifact_bytes'] = sizes
+    export['total_bytes'] = sum(sizes.values())
+    result['export'] = export
+
+    # Carga dos artefatos
+    runtime, runtime_seconds = _timed(IntentRuntime, models_dir)
+    _, joblib_seconds = _timed(joblib.load, joblib_paths['svm'])
+    result['load'] = {'runtime_seconds': runtime_seconds, 'joblib_seconds': joblib_seconds}
+
+    # Latência de predição (texto cru -> intenção, incluindo pré-processamento)
+    rng = random.Random(seed)
+    sample = [rng.choice(texts) for _ in range(LATENCY_SAMPLES)]
+    runtime.predict(sample[0])  # aquecimento: carrega o pré-processador do runtime
+    single = []
+    for text in sample:
+        start = time.perf_counter()
+        runtime.predict(text)
+        single.append(time.perf_counter() - start)
+    batches = []
+    batch_texts = [rng.choice(texts) for _ in range(BATCH_SIZE * 10)]
+    for i in range(0, len(batch_texts), BATCH_SIZE):
+        start = time.perf_counter()
+        runtime.predict_batch(batch_texts[i:i + BATCH_SIZE])
+        batches.append(time.perf_counter() - start)
+    result['predict'] = {
+        **{f'single_{key}': value for key, value in percentiles(single).items()},
+        **{f'batch_{key}': value for key, value in percentiles(batches).items()},
+        'batch_size': BATCH_SIZE,
+        'batch_messages_per_second': len(batch_texts) / sum(batches),
+    }
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def run(scales=SCALES, workers=None, isolate=True, seed=42):
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scales': [],
+    }
+    for scale in scales:
+        with tempfile.TemporaryDirectory(prefix=f'patel_bench_{scale}x_') as workdir:
+            if isolate:
+                # Um processo novo por escala: o pico de RSS não herda o das escalas anteriores.
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                    result = executor.submit(benchmark_scale, scale, workdir, workers, seed).result()
+            else:
+                result = benchmark_scale(scale, workdir, workers, seed)
+        results['scales'].append(result)
+        print_scale(result)
+    return results
+
+
+def print_scale(r):
+    d, p, f, e, l = r['dataset'], r['predict'], r['fit'], r['export'], r['load']
+    print(f"\n=== {r['scale']}x: {d['intents']} intenções, {d['examples']} exemplos, {d['entity_values']} valores de entidade ===")
+    print(f"  Pré-processamento: {r['preprocessing']['texts_per_second']:.0f} textos/s ({r['preprocessing']['seconds']:.2f}s)")
+    print(f"  Fit: vetorizador {f['vectorizer_seconds']:.2f}s ({f['vocabulary_size']} termos), "
+          + ', '.join(f"{name} {f[f'{name}_seconds']:.2f}s" for name in ('nb', 'svm') if f'{name}_seconds' in f))
+    print(f"  Exportação: JSON {e['json_seconds']:.2f}s, fundida {e['fused_seconds']:.2f}s, autômato {e['automaton_seconds']:.2f}s, "
+          f"joblib {e['joblib_seconds']:.2f}s; total {e['total_bytes'] / 1024:.1f} KB")
+    print(f"  Carga: runtime {l['runtime_seconds'] * 1000:.1f} ms, joblib {l['joblib_seconds'] * 1000:.1f} ms")
+    print(f"  Predição por mensagem: p50 {p['single_p50_ms']:.3f} ms, p95 {p['single_p95_ms']:.3f} ms, p99 {p['single_p99_ms']:.3f} ms")
+    print(f"  Predição em lote ({p['batch_size']}): p50 {p['batch_p50_ms']:.1f} ms, p95 {p['batch_p95_ms']:.1f} ms, "
+          f"p99 {p['batch_p99_ms']:.1f} ms; {p['batch_messages_per_second']:.0f} mensagens/s")
+    print(f"  Pico de RSS: {r['peak_rss_bytes'] / 2 ** 20:.1f} MB")
+
+
+# --- Comparação com baseline ---
+
+def flatten_metrics(results):
+    flat = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(f'{prefix}.{key}', child)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix] = value
+
+    for scale_result in results['scales']:
+        scale = scale_result['scale']
+        for section, value in scale_result.items():
+            if section not in ('scale', 'dataset'):
+                walk(f'{scale}x.{section}', value)
+    return flat
+
+
+def metric_direction(name):
+    # +1: maior é melhor (throughput); -1: menor é melhor (tempo, latência, bytes); None: não comparado.
+    if name.endswith('_per_second'):
+        return 1
+    if name.endswith(('_seconds', '_ms', '_bytes')) or '.artifact_bytes.' in name:
+        return -1
+    return None
+
+
+def _noise_floor(name):
+    for suffix, floor in NOISE_FLOORS.items():
+        if name.endswith(suffix):
+            return floor
+    return NOISE_FLOORS['_bytes'] if '.artifact_bytes.' in name else 0.0
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    base_metrics, current_metrics = flatten_metrics(baseline), flatten_metrics(current)
+    rows = []
+    for name in sorted(set(base_metrics) & set(current_metrics)):
+        direction = metric_direction(name)
+        if direction is None:
+            continue
+        old, new = base_metrics[name], current_metrics[name]
+        change = (new - old) / old if old else 0.0
+        worse = (old - new) if direction > 0 else (new - old)
+        regression = worse > _noise_floor(name) and old and worse / abs(old) > threshold
+        improvement = -worse > _noise_floor(name) and old and -worse / abs(old) > threshold
+        rows.append({'metric': name, 'baseline': old, 'current': new, 'change': change,
+                     'status': 'REGRESSÃO' if regression else ('melhora' if improvement else 'ok')})
+    return rows
+
+
+def print_comparison(rows, threshold):
+    print(f"\nComparação com o baseline (limite {threshold:.0%}):")
+    print(f"{'métrica':<48} {'baseline':>14} {'atual':>14} {'variação':>9}  status")
+    for row in rows:
+        print(f"{row['metric']:<48} {row['baseline']:>14.4g} {row['current']:>14.4g} {row['change']:>+9.1%}  {row['status']}")
+    regressions = [row for row in rows if row['status'] == 'REGRESSÃO']
+    print(f"{len(regressions)} regressões, {sum(row['status'] == 'melhora' for row in rows)} melhoras em {len(rows)} métricas.")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de treino/inferência com datasets sintéticos em várias escalas.")
+    parser.add_argument('--scales', nargs='+', type=int, default=SCALES, help="Múltiplos do tamanho atual do dataset")
+    parser.add_argument('--workers', type=int, default=None, help="Processos para o pré-processamento")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Arquivo JSON com os resultados")
+    parser.add_argument('--compare', default=None, help="JSON de baseline: aponta regressões (código de saída 1 se houver)")
+    parser.add_argument('--current', default=None, help="Com --compare: compara este JSON já salvo em vez de rodar o benchmark")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="Piora relativa considerada regressão")
+    parser.add_argument('--no-isolate', action='store_true', help="Roda todas as escalas no mesmo processo (RSS acumulado)")
+    args = parser.parse_args(argv)
+
+    if args.current:
+        with open(args.current, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+    else:
+        results = run(args.scales, args.workers, isolate=not args.no_isolate)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"\nResultados salvos em: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if print_comparison(compare(baseline, results, args.threshold), args.threshold):
+            sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
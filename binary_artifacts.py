@@ -0,0 +1,245 @@
+import bisect
+import itertools
+import json
+import os
+import numpy as np
+import scipy.sparse as sp
+
+# Formato binário compacto para os artefatos TF-IDF + SVM.
+#
+# Diretório com um manifest.json pequeno e arrays .npy que podem ser abertos
+# com memory-map (np.load(mmap_mode='r')), sem parsing de JSON:
+#   - coef_data/coef_indices/coef_indptr: coef_ em CSR (linhas = classes);
+#     zeros exatos (e os que zeram após a quantização) não são gravados;
+#   - coef_scales: escala por classe quando quantizado em int8
+#     (coef ~= coef_data * coef_scales[classe]);
+#   - idf, intercept;
+#   - vocab.bin + vocab_offsets + vocab_index: vocabulário empacotado em UTF-8,
+#     em ordem lexicográfica de bytes, com o índice de feature de cada termo
+#     (busca binária direto sobre o mmap, sem montar dicionário).
+
+FORMAT_VERSION = 1
+QUANTIZATION_MODES = ('float32', 'float16', 'int8')
+BINARY_DIRNAME = 'bin'
+# Termos do vocabulário conferidos por busca no arquivo empacotado após a exportação.
+ROUND_TRIP_TERMS = 1000
+
+
+def quantize_coef(coef, quantization):
+    # Retorna (CSR, escalas). Em float16 o CSR é montado em float32 e só os dados
+    # são reduzidos ao gravar, pois scipy.sparse não opera em float16.
+    coef = np.asarray(coef, dtype=np.float64)
+    if quantization == 'int8':
+        max_abs = np.abs(coef).max(axis=1)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0)
+        data = np.rint(coef / scales[:, None]).astype(np.int8)
+        return sp.csr_matrix(data), scales.astype(np.float32)
+    if quantization == 'float16':
+        return sp.csr_matrix(coef.astype(np.float16).astype(np.float32)), None
+    if quantization == 'float32':
+        return sp.csr_matrix(coef.astype(np.float32)), None
+    raise ValueError(f"Quantização desconhecida: {quantization} (use uma de {QUANTIZATION_MODES})")
+
+
+def pack_vocabulary(vocabulary):
+    encoded = sorted((term.encode('utf-8'), int(idx)) for term, idx in vocabulary.items())
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(term) for term, _ in encoded])
+    blob = b''.join(term for term, _ in encoded)
+    index = np.array([idx for _, idx in encoded], dtype=np.int32)
+    return blob, offsets, index
+
+
+def _write_atomic(path, write):
+    # Arquivo novo + rename: quem já tem os arquivos anteriores mapeados (ex.: o serviço antes
+    # da recarga a quente) continua lendo o inode antigo em vez de um arquivo truncado.
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def export_binary(fitted_tfidf, fitted_svm, out_dir, quantization='float16'):
+    os.makedirs(out_dir, exist_ok=True)
+    coef_q, scales = quantize_coef(fitted_svm.coef_, quantization)
+    coef_q.eliminate_zeros()
+    blob, offsets, index = pack_vocabulary(fitted_tfidf.vocabulary_)
+
+    arrays = {
+        'coef_data': coef_q.data.astype(np.float16) if quantization == 'float16' else coef_q.data,
+        'coef_indices': coef_q.indices.astype(np.int32),
+        'coef_indptr': coef_q.indptr.astype(np.int32),
+        'idf': fitted_tfidf.idf_.astype(np.float32),
+        'intercept': fitted_svm.intercept_.astype(np.float64),
+        'vocab_offsets': offsets,
+        'vocab_index': index,
+    }
+    if scales is not None:
+        arrays['coef_scales'] = scales
+
+    files = {}
+    for name, array in arrays.items():
+        path = os.path.join(out_dir, f'{name}.npy')
+        _write_atomic(path, lambda f: np.save(f, np.ascontiguousarray(array)))
+        files[name] = os.path.basename(path)
+    vocab_path = os.path.join(out_dir, 'vocab.bin')
+    _write_atomic(vocab_path, lambda f: f.write(blob))
+    files['vocab'] = os.path.basename(vocab_path)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'quantization': quantization,
+        'classes_': fitted_svm.classes_.tolist(),
+        'n_features': int(len(fitted_tfidf.idf_)),
+        'nnz': int(coef_q.nnz),
+        'ngram_range': list(fitted_tfidf.ngram_range),
+        'token_pattern': fitted_tfidf.token_pattern,
+        'sublinear_tf': fitted_tfidf.sublinear_tf,
+        'norm': fitted_tfidf.norm,
+        'files': files,
+    }
+    # O manifest por último: um leitor nunca vê um manifest novo apontando para arrays antigos.
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    _write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')))
+    paths = [manifest_path] + [os.path.join(out_dir, filename) for filename in files.values()]
+    return paths
+
+
+class BinaryModel:
+    def __init__(self, model_dir, mmap=True):
+        with open(os.path.join(model_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Versão de formato binário não suportada: {self.manifest.get('format_version')}")
+        mmap_mode = 'r' if mmap else None
+        files = self.manifest['files']
+        load = lambda name: np.load(os.path.join(model_dir, files[name]), mmap_mode=mmap_mode)
+
+        self.classes_ = self.manifest['classes_']
+        self.n_features = self.manifest['n_features']
+        self.quantization = self.manifest['quantization']
+        self.idf_ = load('idf')
+        self.intercept_ = load('intercept')
+        self.coef_scales = load('coef_scales') if 'coef_scales' in files else None
+        coef_data = load('coef_data')
+        if coef_data.dtype == np.float16:
+            coef_data = coef_data.astype(np.float32) # cópia de nnz valores; int8/float32 seguem mapeados
+        coef_indptr = load('coef_indptr')
+        # Uma linha por classe, exceto no caso binário: o LinearSVC guarda só a da classe positiva.
+        self.coef = sp.csr_matrix(
+            (coef_data, load('coef_indices'), coef_indptr),
+            shape=(len(coef_indptr) - 1, self.n_features), copy=False)
+        self._vocab_offsets = load('vocab_offsets')
+        self._vocab_index = load('vocab_index')
+        vocab_path = os.path.join(model_dir, files['vocab'])
+        if mmap and os.path.getsize(vocab_path) > 0:
+            self._vocab_blob = np.memmap(vocab_path, dtype=np.uint8, mode='r')
+        else:
+            self._vocab_blob = np.fromfile(vocab_path, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self._vocab_index)
+
+    def _term_at(self, position):
+        start, end = int(self._vocab_offsets[position]), int(self._vocab_offsets[position + 1])
+        return self._vocab_blob[start:end].tobytes()
+
+    def term_index(self, term):
+        # Busca binária no vocabulário empacotado (ordem de bytes UTF-8).
+        key = term.encode('utf-8')
+        position = bisect.bisect_left(_PackedTerms(self), key)
+        if position < len(self) and self._term_at(position) == key:
+            return int(self._vocab_index[position])
+        return None
+
+    def get(self, term, default=None):
+        # Interface de dict, para o IntentRuntime usar no lugar de vocabulary_.
+        idx = self.term_index(term)
+        return default if idx is None else idx
+
+    def scores(self, X):
+        # X: matriz TF-IDF (n_amostras x n_features), já normalizada. Uma coluna por linha de coef.
+        return quantized_scores(self.coef, self.coef_scales, self.intercept_, X)
+
+    def decision_function(self, X):
+        # Como o sklearn: no caso binário, um score por amostra (da classe positiva).
+        scores = self.scores(X)
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, X):
+        return predict_from_scores(self.classes_, self.scores(X))
+
+
+class _PackedTerms:
+    # Sequência "virtual" de termos para o bisect, lendo direto do blob mapeado.
+    def __init__(self, model):
+        self._model = model
+
+    def __len__(self):
+        return len(self._model)
+
+    def __getitem__(self, position):
+        return self._model._term_at(position)
+
+
+def quantized_scores(coef, coef_scales, intercept, X):
+    scores = X @ coef.T
+    scores = np.asarray(scores.toarray() if sp.issparse(scores) else scores, dtype=np.float64)
+    if coef_scales is not None:
+        scores *= np.asarray(coef_scales, dtype=np.float64)
+    return scores + np.asarray(intercept)
+
+
+def predict_from_scores(classes, scores):
+    # Mesma regra do IntentRuntime._class_scores: com uma só coluna, score > 0 é a classe positiva.
+    classes = np.asarray(classes)
+    if scores.shape[1] == 1:
+        return classes[(scores[:, 0] > 0).astype(int)]
+    return classes[np.argmax(scores, axis=1)]
+
+
+def check_round_trip(fitted_tfidf, fitted_svm, model_dir, quantization):
+    # Reabre o diretório exportado e confere com o que foi gravado (inclusive o caso binário,
+    # com uma só linha em coef_). Devolve o erro máximo dos coeficientes após a quantização.
+    model = BinaryModel(model_dir)
+    expected, scales = quantize_coef(fitted_svm.coef_, quantization)
+    if model.coef.shape != expected.shape or list(model.classes_) != fitted_svm.classes_.tolist():
+        raise ValueError(f"{model_dir}: coef {model.coef.shape} / classes {model.classes_} não batem com o modelo "
+                         f"exportado ({expected.shape}, {fitted_svm.classes_.tolist()}).")
+    dequantized = model.coef.toarray().astype(np.float64)
+    if model.coef_scales is not None:
+        dequantized *= np.asarray(model.coef_scales, dtype=np.float64)[:, None]
+    reference = expected.toarray().astype(np.float64) * (scales[:, None] if scales is not None else 1.0)
+    if not np.array_equal(dequantized, reference) or not np.array_equal(model.idf_, fitted_tfidf.idf_.astype(np.float32)):
+        raise ValueError(f"{model_dir}: coeficientes ou IDF relidos diferem dos gravados.")
+    for term, idx in itertools.islice(fitted_tfidf.vocabulary_.items(), ROUND_TRIP_TERMS):
+        if model.term_index(term) != idx:
+            raise ValueError(f"{model_dir}: termo '{term}' aponta para {model.term_index(term)}, esperado {idx}.")
+    return float(np.max(np.abs(dequantized - fitted_svm.coef_))) if dequantized.size else 0.0
+
+
+def quantization_report(fitted_svm, quantization, X, y):
+    # Compara o SVM em precisão total com os mesmos coeficientes quantizados (o que o formato binário
+    # grava) na matriz X. Para medir o efeito na acurácia, fitted_svm e X devem vir da divisão treino/teste.
+    coef_q, scales = quantize_coef(fitted_svm.coef_, quantization)
+    scores_q = quantized_scores(coef_q, scales, fitted_svm.intercept_, X)
+    reference = fitted_svm.predict(X)
+    quantized = predict_from_scores(fitted_svm.classes_, scores_q)
+    y = np.asarray(y)
+    reference_acc = float(np.mean(reference == y))
+    quantized_acc = float(np.mean(quantized == y))
+    reference_scores = fitted_svm.decision_function(X).reshape(scores_q.shape)
+    max_score_error = float(np.max(np.abs(reference_scores - scores_q))) if len(y) else 0.0
+    return {
+        'quantization': quantization,
+        'samples': int(len(y)),
+        'accuracy_full': reference_acc,
+        'accuracy_quantized': quantized_acc,
+        'accuracy_delta': quantized_acc - reference_acc,
+        'prediction_agreement': float(np.mean(reference == quantized)),
+        'max_score_error': max_score_error,
+    }
+
+
+def artifact_bytes(paths):
+    return sum(os.path.getsize(path) for path in paths)
@@ -0,0 +1,155 @@
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Ponto de entrada único: python cli.py [--nltk-data DIR] <comando> [opções do comando]
+#
+#   train     train_pipeline          treino + avaliação treino/teste + exportação
+#   evaluate  process_data            idem + relatório de análise
+#   export    export_model_artifacts  treino com todos os dados e exportação, sem avaliação
+#   score     batch_score             classifica um JSONL com os artefatos exportados
+#   serve     intent_service          serviço HTTP asyncio com micro-batching e recarga a quente
+#   startup   (este módulo)           mede a inicialização a frio dos comandos leves contra um orçamento
+#
+# Cada módulo só é importado quando o seu comando roda: pandas/sklearn ficam fora
+# do `score` e do `--help`. As opções depois do comando vão para o parser do
+# próprio módulo (python cli.py train --help).
+# Recursos NLTK: resolvidos uma vez por processo a partir de --nltk-data (ou dos
+# caminhos padrão do NLTK), sem nltk.download: um recurso ausente é erro, com o
+# comando para provisioná-lo.
+
+COMMANDS = {
+    'train': ('train_pipeline', "Treino + avaliação treino/teste + exportação dos artefatos"),
+    'evaluate': ('process_data', "Treino + avaliação + exportação + relatório de análise"),
+    'export': ('export_model_artifacts', "Treino com todos os dados e exportação, sem avaliação"),
+    'score': ('batch_score', "Classifica utterances de um JSONL com os artefatos exportados"),
+    'serve': ('intent_service', "Serviço HTTP de classificação com micro-batching e recarga a quente"),
+}
+NLTK_DATA_ENV = 'PATEL_NLTK_DATA'
+
+# Cenários de inicialização a frio (processo novo a cada medição) e orçamento em ms.
+# score_load: importa o runtime e carrega os artefatos (entrada vazia, sem NLTK);
+# score_first: primeira mensagem em texto cru, inclui importar o NLTK e carregar os recursos.
+STARTUP_SCENARIOS = {
+    'help': (['--help'], ''),
+    'score_load': (['score'], ''),
+    'score_first': (['score'], json.dumps({'text': 'quero um plano de saúde para minha família'}) + '\n'),
+}
+STARTUP_BUDGETS_MS = {'help': 250, 'score_load': 1000, 'score_first': 5000}
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy.stats', 'nltk')
+# Roda o cli.py como __main__ e informa quais módulos pesados foram importados.
+_STARTUP_PROBE = (
+    "import json, runpy, sys\n"
+    "sys.argv = sys.argv[1:]\n"
+    "try:\n"
+    "    runpy.run_path(sys.argv[0], run_name='__main__')\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "finally:\n"
+    f"    sys.stderr.write('\\n@heavy ' + json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]) + '\\n')\n"
+)
+
+
+def run_command(command, argv):
+    module = importlib.import_module(COMMANDS[command][0])
+    return module.main(argv)
+
+
+def measure_startup(scenario, repeat=5, models_dir=None, binary=False):
+    # Processo novo a cada repetição: inclui a subida do interpretador, como um job de curta duração.
+    argv, stdin_text = STARTUP_SCENARIOS[scenario]
+    if models_dir and argv[:1] == ['score']:
+        argv = argv + ['--models-dir', models_dir]
+    if binary and argv[:1] == ['score']:
+        argv = argv + ['--binary']
+    command = [sys.executable, '-c', _STARTUP_PROBE, os.path.abspath(__file__)] + argv
+    timings = []
+    heavy = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(command, input=stdin_text, capture_output=True, text=True, env=os.environ.copy())
+        timings.append((time.perf_counter() - start) * 1000)
+        marker = completed.stderr.rsplit('@heavy ', 1)
+        if completed.returncode != 0 or len(marker) != 2:
+            raise RuntimeError(f"Cenário '{scenario}' falhou (código {completed.returncode}):\n{completed.stderr.strip()}")
+        heavy = json.loads(marker[1])
+    return {
+        'scenario': scenario,
+        'command': ' '.join(['cli.py'] + argv),
+        'median_ms': statistics.median(timings),
+        'max_ms': max(timings),
+        'heavy_modules': heavy,
+    }
+
+
+def startup(argv=None):
+    parser = argparse.ArgumentParser(prog='cli.py startup', description="Mede a inicialização a frio dos comandos leves contra um orçamento (ms).")
+    parser.add_argument('--scenarios', nargs='+', choices=STARTUP_SCENARIOS, default=list(STARTUP_SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=5, help="Processos novos por cenário (vale a mediana)")
+    parser.add_argument('--budget', nargs='+', default=[], metavar='CENARIO=MS',
+                        help="Sobrescreve o orçamento de um cenário (ex.: score_load=800)")
+    parser.add_argument('--models-dir', default=None, help="Artefatos usados pelos cenários de score")
+    parser.add_argument('--binary', action='store_true', help="Cenários de score com o formato binário (models-dir/bin)")
+    parser.add_argument('--output', default=None, help="Grava as medições em JSON")
+    args = parser.parse_args(argv)
+
+    budgets = dict(STARTUP_BUDGETS_MS)
+    for item in args.budget:
+        name, _, value = item.partition('=')
+        if name not in STARTUP_SCENARIOS or not value:
+            parser.error(f"Orçamento inválido: {item}")
+        budgets[name] = float(value)
+
+    results = []
+    over_budget = []
+    print(f"{'cenário':<12} {'mediana (ms)':>12} {'máx (ms)':>9} {'orçamento':>9}  módulos pesados")
+    for scenario in args.scenarios:
+        result = measure_startup(scenario, args.repeat, args.models_dir, args.binary)
+        result['budget_ms'] = budgets[scenario]
+        result['within_budget'] = result['median_ms'] <= result['budget_ms']
+        results.append(result)
+        flag = '' if result['within_budget'] else '  <- ACIMA DO ORÇAMENTO'
+        print(f"{scenario:<12} {result['median_ms']:>12.0f} {result['max_ms']:>9.0f} {result['budget_ms']:>9.0f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}{flag}")
+        if not result['within_budget']:
+            over_budget.append(scenario)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Medições salvas em: {args.output}")
+    if over_budget:
+        print(f"Acima do orçamento: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    commands_help = '\n'.join(f"  {name:<9} {description}" for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog='cli.py',
+        description="Treino, avaliação, exportação e classificação de intenções.",
+        epilog=f"comandos:\n{commands_help}\n  startup   Mede a inicialização a frio dos comandos leves\n\n"
+               "Use 'cli.py <comando> --help' para as opções de cada comando.",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nltk-data', default=os.environ.get(NLTK_DATA_ENV),
+                        help=f"Diretório local com punkt_tab/stopwords/rslp (padrão: ${NLTK_DATA_ENV} ou os caminhos do NLTK)")
+    parser.add_argument('command', choices=list(COMMANDS) + ['startup'], metavar='comando')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.command == 'startup':
+        return startup(args.args)
+    # Só registra a configuração: o NLTK é importado quando (e se) houver texto a pré-processar.
+    from text_preprocessing import configure_nltk
+    configure_nltk(args.nltk_data, offline=True)
+    run_command(args.command, args.args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+# Cache endereçado por conteúdo para o pipeline de treino.
+#
+# - Pré-processamento: cada exemplo é guardado sob sha256(config + texto), de
+#   modo que exemplos inalterados não passam de novo por tokenização/stemming.
+#   Mudar a lista de stopwords, o stemmer ou o ngram_range muda a chave.
+# - Execução completa: um manifesto registra a impressão digital de todo o
+#   treino (textos, intenções, entidades, hiperparâmetros) e o hash de cada
+#   artefato gerado; se nada mudou e os arquivos estão intactos, o pipeline
+#   reaproveita o vetorizador e os modelos sem refazer o fit.
+
+# Incrementar quando a lógica de pré-processamento mudar de forma que invalide o cache.
+CACHE_VERSION = 1
+CACHE_DIR = os.path.join('.cache', 'patel')
+
+
+def _sha256(data):
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_fingerprint(config):
+    payload = json.dumps({'version': CACHE_VERSION, 'config': config}, sort_keys=True, ensure_ascii=False)
+    return _sha256(payload)
+
+
+class RunFingerprint:
+    def __init__(self, base):
+        self._digest = hashlib.sha256(base.encode('utf-8'))
+
+    def add(self, text, intent):
+        self._digest.update(_sha256(intent + '\0' + text).encode('utf-8'))
+
+    def hexdigest(self, entities_data, params):
+        digest = self._digest.copy()
+        extra = json.dumps({'entities': entities_data, 'params': params}, sort_keys=True, ensure_ascii=False, default=repr)
+        digest.update(extra.encode('utf-8'))
+        return digest.hexdigest()
+
+
+class CorpusCache:
+    def __init__(self, cache_dir, preprocessing_config):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.fingerprint = config_fingerprint(preprocessing_config)
+        self.manifest_path = os.path.join(cache_dir, 'run_manifest.json')
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'preprocessed.sqlite3'))
+        self._db.execute("CREATE TABLE IF NOT EXISTS preprocessed (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        self._db.close()
+
+    def example_key(self, text):
+        return _sha256(self.fingerprint + '\0' + text)
+
+    def preprocess(self, texts, preprocess_batch_fn, batch_size=900):
+        # Consulta em lotes (limite de parâmetros do SQLite) e só processa as chaves ausentes,
+        # todas de uma vez via preprocess_batch_fn (lista de textos -> lista de textos processados).
+        keys = [self.example_key(text) for text in texts]
+        known = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), batch_size):
+            batch = unique_keys[start:start + batch_size]
+            placeholders = ','.join('?' * len(batch))
+            rows = self._db.execute(f"SELECT key, value FROM preprocessed WHERE key IN ({placeholders})", batch)
+            known.update(rows)
+
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in known and key not in pending:
+                pending[key] = text
+        computed = dict(zip(pending.keys(), preprocess_batch_fn(list(pending.values())))) if pending else {}
+        if computed:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO preprocessed (key, value) VALUES (?, ?)", computed.items())
+            known.update(computed)
+
+        self.misses += len(computed)
+        self.hits += len(keys) - len(computed)
+        return [known[key] for key in keys]
+
+    def run_fingerprint(self):
+        # Incremental: os exemplos entram um a um durante a leitura em fluxo do dataset.
+        return RunFingerprint(self.fingerprint)
+
+    def load_run(self, run_key, require_accuracy=False):
+        # Retorna o manifesto somente se a impressão digital bate e todos os artefatos estão intactos.
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get('run_key') != run_key:
+            return None
+        if require_accuracy and not manifest.get('accuracy'):
+            return None
+        for path, digest in manifest.get('artifacts', {}).items():
+            if not os.path.exists(path) or file_sha256(path) != digest:
+                return None
+        return manifest
+
+    def save_run(self, run_key, artifact_paths, accuracy=None, train_idx=None, extra=None):
+        manifest = {
+            'run_key': run_key,
+            'artifacts': {path: file_sha256(path) for path in artifact_paths},
+            'accuracy': accuracy or {},
+            'train_idx': [int(i) for i in train_idx] if train_idx is not None else None,
+        }
+        if extra:
+            manifest.update(extra)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        return manifest
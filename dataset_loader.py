@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+import weakref
+
+# Leitura do dataset de treino em fluxo, sem carregar o arquivo inteiro.
+#
+# Formatos:
+#   json  - o formato original: {"dataset": [{"intencao": ..., "exemplos_usuario": [...],
+#           "entidades": [...], ...}, ...]}. Lido incrementalmente com
+#           JSONDecoder.raw_decode sobre um buffer de tamanho limitado: os exemplos
+#           de cada intenção saem um a um, sem materializar o item nem o arquivo.
+#   jsonl - um exemplo por linha: {"text": ..., "intent": ..., "entities": [...]}
+#           (entities opcional, no mesmo esquema tipo_entidade/valor_entidade).
+# DatasetReader produz pares (texto, intenção) e pode ser percorrido mais de uma
+# vez (cada iteração relê o arquivo). As entidades ficam agregadas por intenção,
+# sem repetição, então a memória cresce com o nº de valores distintos, não com
+# o nº de exemplos.
+
+DATASET_FORMATS = ('json', 'jsonl')
+READ_CHUNK_CHARS = 1 << 16
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Caracteres que ainda podem estender um número JSON lido até aqui.
+_NUMBER_CONTINUATION = frozenset('0123456789.eE+-')
+
+
+def dataset_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'json'
+
+
+class _JsonCursor:
+    # Cursor sobre um texto JSON lido em blocos: só o trecho ainda não consumido fica em memória.
+    def __init__(self, f, chunk_chars=READ_CHUNK_CHARS):
+        self._f = f
+        self._chunk_chars = chunk_chars
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._consumed = 0
+        self._eof = False
+
+    @property
+    def offset(self):
+        return self._consumed + self._pos
+
+    def _fill(self):
+        # Descarta o trecho consumido e lê mais um bloco (ao menos do tamanho do buffer, para valores longos).
+        chunk = self._f.read(max(self._chunk_chars, len(self._buffer) - self._pos))
+        self._consumed += self._pos
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        self._eof = not chunk
+        return bool(chunk)
+
+    def _error(self, message):
+        return ValueError(f"JSON inválido perto do caractere {self.offset}: {message}")
+
+    def peek(self):
+        # Próximo caractere que não é espaço em branco ('' no fim do arquivo).
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise self._error(f"esperado '{char}', encontrado '{found or 'fim do arquivo'}'")
+        self._pos += 1
+
+    def value(self):
+        # Um valor JSON completo a partir da posição atual.
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Um número no fim do buffer (ou cortado no meio, ex.: "3." + "14") pode continuar no próximo bloco.
+                if self._eof or (end < len(self._buffer) and self._buffer[end] not in _NUMBER_CONTINUATION):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise self._error(e.msg) from e
+            self._fill()
+
+    def members(self):
+        # Chaves de um objeto; a cada chave devolvida, quem chama deve consumir o valor correspondente.
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise self._error("chave de objeto deve ser uma string")
+            self.expect(':')
+            yield key
+            if self.peek() == '}':
+                self._pos += 1
+                return
+            self.expect(',')
+
+    def items(self):
+        # Posições dos elementos de um array; a cada passo, quem chama consome um elemento.
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ']':
+                self._pos += 1
+                return
+            self.expect(',')
+
+
+def _iter_nested(f, add_entities):
+    cursor = _JsonCursor(f)
+    for key in cursor.members():
+        if key != 'dataset':
+            cursor.value()
+            continue
+        for _ in cursor.items():
+            intent = None
+            pending = [] # exemplos lidos antes da chave "intencao" (ordem de chaves não garantida)
+            entities = None
+            for item_key in cursor.members():
+                if item_key == 'exemplos_usuario':
+                    for _ in cursor.items():
+                        text = cursor.value()
+                        if intent is None:
+                            pending.append(text)
+                        else:
+                            yield text, intent
+                elif item_key == 'intencao':
+                    intent = cursor.value()
+                    for text in pending:
+                        yield text, intent
+                    pending = []
+                elif item_key == 'entidades':
+                    entities = cursor.value()
+                else:
+                    cursor.value()
+            if intent is None:
+                raise ValueError(f"Item do dataset sem 'intencao' (caractere {cursor.offset})")
+            add_entities(intent, entities)
+    if cursor.peek():
+        raise cursor._error("conteúdo após o fim do objeto")
+
+
+def _iter_jsonl(f, add_entities):
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Linha {line_number}: JSON inválido: {e}") from e
+        text = record.get('text') if isinstance(record, dict) else None
+        intent = record.get('intent') if isinstance(record, dict) else None
+        if not isinstance(text, str) or not isinstance(intent, str):
+            raise ValueError(f"Linha {line_number}: campos 'text'/'intent' ausentes ou não são texto")
+        add_entities(intent, record.get('entities'))
+        yield text, intent
+
+
+class DatasetReader:
+    # Iterável sobre os pares (texto, intenção) do dataset, em fluxo.
+    def __init__(self, path, format=None):
+        if format is not None and format not in DATASET_FORMATS:
+            raise ValueError(f"Formato de dataset desconhecido: {format} (use um de {', '.join(DATASET_FORMATS)})")
+        self.path = path
+        self.format = format or dataset_format(path)
+        self._entities = {} # intenção -> {(tipo, valor): entidade}, preenchido durante a iteração
+
+    def _add_entities(self, intent, entities):
+        if not entities:
+            return
+        values = self._entities.setdefault(intent, {})
+        for entity in entities:
+            values.setdefault((entity['tipo_entidade'], entity['valor_entidade']), entity)
+
+    def __iter__(self):
+        self._entities = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            parse = _iter_jsonl if self.format == 'jsonl' else _iter_nested
+            yield from parse(f, self._add_entities)
+
+    @property
+    def entities_data(self):
+        # Mesmo formato usado por build_entity_dictionaries; completo só depois de uma iteração inteira.
+        return [{'intent': intent, 'entities': list(values.values())} for intent, values in self._entities.items()]
+
+
+def load_dataset(path, format=None):
+    # Tudo em listas (seleção de modelo, curvas, benchmark); o treino usa DatasetReader em fluxo.
+    reader = DatasetReader(path, format)
+    texts = []
+    intents = []
+    for text, intent in reader:
+        texts.append(text)
+        intents.append(intent)
+    return texts, intents, reader.entities_data
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpooledTexts:
+    # Textos (já pré-processados) gravados em disco, um por linha, e relidos a cada iteração.
+    # O arquivo temporário é apagado quando o objeto deixa de ser usado.
+    def __init__(self, directory=None):
+        fd, self.path = tempfile.mkstemp(prefix='processed-', suffix='.txt', dir=directory)
+        self._file = os.fdopen(fd, 'w', encoding='utf-8', newline='\n')
+        self._count = 0
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+
+    def write(self, texts):
+        for text in texts:
+            self._file.write(text.replace('\n', ' ') + '\n')
+            self._count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8', newline='\n') as f:
+            for line in f:
+                yield line[:-1]
+
+
+def convert_to_jsonl(source, destination, format=None):
+    # Duas passadas em fluxo: a primeira só coleta as entidades (no formato aninhado elas
+    # vêm depois dos exemplos), a segunda grava um exemplo por linha, com as entidades
+    # da intenção no primeiro exemplo dela.
+    reader = DatasetReader(source, format)
+    for _ in reader:
+        pass
+    entities = {item['intent']: item['entities'] for item in reader.entities_data}
+    count = 0
+    with open(destination, 'w', encoding='utf-8') as f:
+        for text, intent in DatasetReader(source, format):
+            record = {'text': text, 'intent': intent}
+            if intent in entities:
+                record['entities'] = entities.pop(intent)
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def dataset_stats(path, format=None):
+    # Uma passada completa medindo tempo e pico de memória alocada pelo Python (tracemalloc).
+    reader = DatasetReader(path, format)
+    intents = set()
+    examples = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for _, intent in reader:
+            examples += 1
+            intents.add(intent)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'format': reader.format,
+        'file_bytes': os.path.getsize(path),
+        'examples': examples,
+        'intents': len(intents),
+        'entity_values': sum(len(item['entities']) for item in reader.entities_data),
+        'seconds': elapsed,
+        'examples_per_second': examples / elapsed if elapsed > 0 else 0.0,
+        'peak_memory_bytes': peak,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Leitura em fluxo do dataset de treino (JSON aninhado ou JSONL).")
+    parser.add_argument('--format', choices=DATASET_FORMATS, default=None, help="Padrão: pela extensão do arquivo")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    stats_parser = subparsers.add_parser('stats', help="Conta exemplos/intenções e mede tempo e pico de memória da leitura")
+    stats_parser.add_argument('dataset')
+    convert_parser = subparsers.add_parser('convert', help="Converte o dataset para JSONL (um exemplo por linha)")
+    convert_parser.add_argument('dataset')
+    convert_parser.add_argument('output')
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        count = convert_to_jsonl(args.dataset, args.output, args.format)
+        print(f"{count} exemplos gravados em: {args.output}")
+        return count
+    stats = dataset_stats(args.dataset, args.format)
+    print(f"{args.dataset} ({stats['format']}, {stats['file_bytes'] / 2 ** 20:.1f} MB): {stats['examples']} exemplos, "
+          f"{stats['intents']} intenções, {stats['entity_values']} valores de entidade")
+    print(f"Leitura em {stats['seconds']:.2f}s ({stats['examples_per_second']:.0f} exemplos/s); "
+          f"pico de memória: {stats['peak_memory_bytes'] / 2 ** 20:.2f} MB")
+    return stats
+
+
+if __name__ == '__main__':
+    main()
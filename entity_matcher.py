@@ -0,0 +1,161 @@
+import argparse
+import collections
+import hashlib
+import json
+import os
+
+# Extração de entidades por dicionário com um autômato Aho-Corasick.
+#
+# Substitui o laço "um regex \b<valor>\b por valor, a cada mensagem" por uma
+# única passada sobre o texto: custo O(tamanho do texto + ocorrências),
+# independente do tamanho dos dicionários. O autômato é montado pelo
+# exportador a partir de entity_dictionaries.json e gravado como artefato.
+#
+# Semântica de fronteira igual à do regex \b do Python (re, unicode): há
+# fronteira na posição i quando exatamente um entre texto[i-1] e texto[i] é
+# caractere de palavra (alfanumérico ou '_'); fora do texto conta como não-palavra.
+
+AUTOMATON_FORMAT = 'entity_aho_corasick'
+AUTOMATON_FORMAT_VERSION = 1
+AUTOMATON_FILENAME = 'entity_automaton.json'
+
+
+def dictionaries_fingerprint(entity_dictionaries):
+    payload = json.dumps(entity_dictionaries, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_automaton(entity_dictionaries):
+    patterns = []
+    goto = [{}]
+    outputs = [[]]
+    for entity_type, values in entity_dictionaries.items():
+        for value in values:
+            key = value.lower()
+            if not key:
+                continue
+            node = 0
+            for char in key:
+                next_node = goto[node].get(char)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][char] = next_node
+                    goto.append({})
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(len(patterns))
+            patterns.append([entity_type, value, len(key)])
+
+    # Links de falha (BFS) e "dict links": próximo nó na cadeia de falha que
+    # termina algum padrão, para enumerar as saídas sem copiar listas.
+    fail = [0] * len(goto)
+    dict_link = [-1] * len(goto)
+    queue = collections.deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for char, child in goto[node].items():
+            queue.append(child)
+            state = fail[node]
+            while state and char not in goto[state]:
+                state = fail[state]
+            candidate = goto[state].get(char, 0)
+            fail[child] = candidate if candidate != child else 0
+            dict_link[child] = fail[child] if outputs[fail[child]] else dict_link[fail[child]]
+
+    return {
+        'format': AUTOMATON_FORMAT,
+        'format_version': AUTOMATON_FORMAT_VERSION,
+        'source_fingerprint': dictionaries_fingerprint(entity_dictionaries),
+        'patterns': patterns,
+        'goto': goto,
+        'fail': fail,
+        'outputs': outputs,
+        'dict_link': dict_link,
+    }
+
+
+def export_automaton(entity_dictionaries, path):
+    automaton = build_automaton(entity_dictionaries)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(automaton, f, ensure_ascii=False, separators=(',', ':'))
+    return automaton
+
+
+def _is_word(char):
+    return char.isalnum() or char == '_'
+
+
+class EntityMatcher:
+    def __init__(self, automaton):
+        if automaton.get('format') != AUTOMATON_FORMAT or automaton.get('format_version') != AUTOMATON_FORMAT_VERSION:
+            raise ValueError("Artefato de autômato de entidades inválido ou de versão não suportada.")
+        self.source_fingerprint = automaton['source_fingerprint']
+        self.patterns = [tuple(pattern) for pattern in automaton['patterns']]
+        self._goto = automaton['goto']
+        self._fail = automaton['fail']
+        self._outputs = automaton['outputs']
+        self._dict_link = automaton['dict_link']
+
+    @classmethod
+    def from_dictionaries(cls, entity_dictionaries):
+        return cls(build_automaton(entity_dictionaries))
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def iter_matches(self, text):
+        # Gera (início, fim, tipo, valor) para cada ocorrência com fronteira de palavra,
+        # sobre o texto em minúsculas (mesma normalização dos dicionários).
+        text = text.lower()
+        length = len(text)
+        goto, fail, outputs, dict_link, patterns = self._goto, self._fail, self._outputs, self._dict_link, self.patterns
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            node = state if outputs[state] else dict_link[state]
+            while node > 0:
+                for pattern_id in outputs[node]:
+                    entity_type, value, pattern_length = patterns[pattern_id]
+                    start, end = position - pattern_length + 1, position + 1
+                    before = text[start - 1] if start > 0 else ''
+                    after = text[end] if end < length else ''
+                    if (_is_word(text[start]) != (before != '' and _is_word(before)) and
+                            _is_word(text[position]) != (after != '' and _is_word(after))):
+                        yield start, end, entity_type, value
+                node = dict_link[node]
+
+    def find_all(self, text):
+        # Uma entrada por (tipo, valor), na ordem da primeira ocorrência no texto.
+        found = {}
+        for _, _, entity_type, value in self.iter_matches(text):
+            found.setdefault((entity_type, value), None)
+        return list(found)
+
+
+def load_matcher(models_dir, entity_dictionaries):
+    # Usa o artefato pré-compilado se ele corresponde aos dicionários; senão monta em memória.
+    path = os.path.join(models_dir, AUTOMATON_FILENAME)
+    if os.path.exists(path):
+        matcher = EntityMatcher.from_json(path)
+        if matcher.source_fingerprint == dictionaries_fingerprint(entity_dictionaries):
+            return matcher
+    return EntityMatcher.from_dictionaries(entity_dictionaries)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compila entity_dictionaries.json em um autômato Aho-Corasick.")
+    parser.add_argument('--models-dir', default='models')
+    args = parser.parse_args()
+    with open(os.path.join(args.models_dir, 'entity_dictionaries.json'), 'r', encoding='utf-8') as f:
+        entity_dictionaries = json.load(f)
+    output_path = os.path.join(args.models_dir, AUTOMATON_FILENAME)
+    automaton = export_automaton(entity_dictionaries, output_path)
+    print(f"Autômato de entidades ({len(automaton['patterns'])} valores, {len(automaton['goto'])} estados) "
+          f"exportado para: {output_path} ({os.path.getsize(output_path)/1024:.2f} KB)")
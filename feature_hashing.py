@@ -0,0 +1,226 @@
+import argparse
+import functools
+import json
+import numpy as np
+
+# Modo de hashing de features: em vez de um vocabulary_ que cresce sem limite
+# com o dataset, cada n-grama é mapeado para um de n_features baldes por uma
+# função de hash com sinal. Memória e tamanho dos artefatos ficam limitados
+# por n_features (x nº de classes), independente do tamanho do vocabulário.
+#
+# Especificação exportada em tfidf_model.json (campo "feature_hashing"), igual
+# ao HashingVectorizer(alternate_sign=True) do sklearn:
+#   h      = murmurhash3_32(bytes UTF-8 do n-grama, seed=0), inteiro COM sinal (int32)
+#   índice = abs(h) % n_features   (para h = -2^31: (2^31 - 1 - (n_features - 1)) % n_features)
+#   sinal  = +1 se h >= 0, senão -1; a contagem do n-grama é somada com esse sinal
+# Os n-gramas vêm do mesmo analisador do TfidfVectorizer (minúsculas,
+# token_pattern, ngram_range). Em seguida TF-IDF e normalização usuais com idf_.
+# sklearn só é importado pelo treino/relatório: o runtime usa apenas a especificação.
+
+HASH_FUNCTION = 'murmurhash3_32'
+HASH_SEED = 0
+DEFAULT_N_FEATURES = 2 ** 12
+CURVE_BUCKETS = [2 ** 8, 2 ** 9, 2 ** 10, 2 ** 11, 2 ** 12, 2 ** 14, 2 ** 16]
+CURVE_PATH = 'hashing_report.json'
+INT32_MIN = -2 ** 31
+
+
+def murmurhash3_32(key, seed=HASH_SEED):
+    # Implementação de referência (MurmurHash3 x86 32 bits), com sinal, igual a sklearn.utils.murmurhash3_32.
+    data = key.encode('utf-8') if isinstance(key, str) else bytes(key)
+    length = len(data)
+    h = seed & 0xffffffff
+    rounded_end = length & ~3
+    for i in range(0, rounded_end, 4):
+        k = int.from_bytes(data[i:i + 4], 'little')
+        k = (k * 0xcc9e2d51) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * 0x1b873593) & 0xffffffff
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xffffffff
+        h = (h * 5 + 0xe6546b64) & 0xffffffff
+    k = 0
+    tail = length & 3
+    if tail == 3:
+        k ^= data[rounded_end + 2] << 16
+    if tail >= 2:
+        k ^= data[rounded_end + 1] << 8
+    if tail >= 1:
+        k ^= data[rounded_end]
+        k = (k * 0xcc9e2d51) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * 0x1b873593) & 0xffffffff
+        h ^= k
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+
+def hashed_feature(term, n_features, seed=HASH_SEED):
+    # (índice, sinal) de um n-grama, segundo a especificação acima.
+    h = murmurhash3_32(term, seed)
+    if h == INT32_MIN:
+        index = (2147483647 - (n_features - 1)) % n_features
+    else:
+        index = abs(h) % n_features
+    return index, (1 if h >= 0 else -1)
+
+
+def feature_hasher(spec, cache_size=65536):
+    # Função termo -> (índice, sinal) com cache LRU limitado (a memória continua com teto).
+    n_features, seed = spec['n_features'], spec.get('seed', HASH_SEED)
+    if spec.get('function', HASH_FUNCTION) != HASH_FUNCTION:
+        raise ValueError(f"Função de hash não suportada: {spec.get('function')}")
+
+    @functools.lru_cache(maxsize=cache_size)
+    def lookup(term):
+        index, sign = hashed_feature(term, n_features, seed)
+        return index, sign if spec.get('alternate_sign', True) else 1
+    return lookup
+
+
+def build_hashing_vectorizer(n_features=DEFAULT_N_FEATURES, ngram_range=(1, 2)):
+    # Substituto do TfidfVectorizer: hashing com sinal (sem vocabulary_) + TF-IDF.
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import Pipeline
+    return Pipeline([
+        ('hash', HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=True, norm=None)),
+        ('idf', TfidfTransformer()),
+    ])
+
+
+def is_hashing_vectorizer(vectorizer):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return isinstance(vectorizer, HashingVectorizer) or 'hash' in getattr(vectorizer, 'named_steps', {})
+
+
+def hashing_model_payload(fitted_hashing):
+    if not hasattr(fitted_hashing, 'named_steps'):
+        # HashingVectorizer sozinho (sem IDF, ex.: aprendizado online): idf_ neutro e a normalização do próprio hasher.
+        return {**_hashing_payload(fitted_hashing, np.ones(fitted_hashing.n_features)),
+                'use_idf': False, 'smooth_idf': False, 'sublinear_tf': False, 'norm': fitted_hashing.norm}
+    transformer = fitted_hashing.named_steps['idf']
+    return {**_hashing_payload(fitted_hashing.named_steps['hash'], transformer.idf_),
+            'use_idf': transformer.use_idf, 'smooth_idf': transformer.smooth_idf,
+            'sublinear_tf': transformer.sublinear_tf, 'norm': transformer.norm}
+
+
+def _hashing_payload(hasher, idf):
+    return {
+        'feature_hashing': {
+            'function': HASH_FUNCTION,
+            'seed': HASH_SEED,
+            'encoding': 'utf-8',
+            'n_features': hasher.n_features,
+            'alternate_sign': hasher.alternate_sign,
+            'index': 'abs(h) % n_features',
+        },
+        'idf_': idf.tolist(),
+        'ngram_range': hasher.ngram_range,
+        'lowercase': hasher.lowercase,
+        'token_pattern': hasher.token_pattern,
+        'stop_words': None,
+    }
+
+
+# --- Relatório: colisões e acurácia por nº de baldes ---
+
+def collision_stats(terms, n_features):
+    # Sobre os n-gramas distintos do corpus: baldes ocupados e fração de termos que dividem balde com outro.
+    buckets = np.fromiter((hashed_feature(term, n_features)[0] for term in terms), dtype=np.int64, count=len(terms))
+    counts = np.bincount(buckets, minlength=n_features)
+    occupied = int(np.count_nonzero(counts))
+    return {
+        'distinct_terms': len(terms),
+        'occupied_buckets': occupied,
+        'collision_rate': 1.0 - occupied / len(terms) if terms else 0.0,
+        'colliding_terms_fraction': float(counts[counts > 1].sum() / len(terms)) if terms else 0.0,
+    }
+
+
+def _artifact_bytes(tfidf_payload, clf):
+    from train_pipeline import classifier_payload, json_artifact_bytes
+    return json_artifact_bytes(tfidf_payload) + json_artifact_bytes(classifier_payload(clf))
+
+
+def _evaluate(vectorizer, processed, y, train_idx, test_idx):
+    # O SVM exportado pelo pipeline de treino (mesmos hiperparâmetros), para vocabulário e hashing.
+    from sklearn.base import clone
+    from sklearn.metrics import accuracy_score
+    from train_pipeline import build_classifiers
+    # IDF (e vocabulário) só das linhas de treino: as frequências de documento do teste não entram na acurácia.
+    vectorizer.fit([processed[i] for i in train_idx])
+    X = vectorizer.transform(processed)
+    clf = clone(build_classifiers(True)['svm']).fit(X[train_idx], y[train_idx])
+    return vectorizer, clf, float(accuracy_score(y[test_idx], clf.predict(X[test_idx])))
+
+
+def hashing_report(processed, y, train_idx, test_idx, bucket_sizes=CURVE_BUCKETS, ngram_range=(1, 2)):
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+    from train_pipeline import tfidf_model_payload
+    vectorizer, clf, accuracy = _evaluate(TfidfVectorizer(ngram_range=ngram_range), processed, y, train_idx, test_idx)
+    baseline = {
+        'n_features': len(vectorizer.vocabulary_),
+        'accuracy': accuracy,
+        'artifact_bytes': _artifact_bytes(tfidf_model_payload(vectorizer), clf),
+    }
+    terms = list(CountVectorizer(ngram_range=ngram_range).fit(processed).vocabulary_)
+    points = []
+    for n_features in bucket_sizes:
+        vectorizer, clf, accuracy = _evaluate(build_hashing_vectorizer(n_features, ngram_range), processed, y, train_idx, test_idx)
+        point = {'n_features': n_features, 'accuracy': accuracy, 'accuracy_delta': accuracy - baseline['accuracy'],
+                 'artifact_bytes': _artifact_bytes(hashing_model_payload(vectorizer), clf)}
+        point.update(collision_stats(terms, n_features))
+        points.append(point)
+    return {'vocabulary': baseline, 'hashing': points}
+
+
+def print_report(report):
+    baseline = report['vocabulary']
+    print(f"Vocabulário: {baseline['n_features']} termos, acurácia {baseline['accuracy']:.4f}, "
+          f"{baseline['artifact_bytes'] / 1024:.1f} KB")
+    print(f"{'baldes':>8} {'ocupados':>9} {'colisão':>8} {'termos c/ colisão':>18} {'acurácia':>9} {'delta':>8} {'artefato (KB)':>13}")
+    for p in report['hashing']:
+        print(f"{p['n_features']:>8} {p['occupied_buckets']:>9} {p['collision_rate']:>8.2%} {p['colliding_terms_fraction']:>18.2%} "
+              f"{p['accuracy']:>9.4f} {p['accuracy_delta']:>+8.4f} {p['artifact_bytes'] / 1024:>13.1f}")
+
+
+def main(argv=None):
+    from corpus_cache import CACHE_DIR
+    from dataset_loader import load_dataset
+    from text_preprocessing import download_nltk_resources, load_default_preprocessor
+    from train_pipeline import DATASET_PATH, NGRAM_RANGE, open_corpus_cache, split_indices
+
+    parser = argparse.ArgumentParser(description="Taxa de colisão e impacto na acurácia do hashing de features para vários nºs de baldes.")
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--buckets', nargs='+', type=int, default=CURVE_BUCKETS)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--output', default=CURVE_PATH, help="Arquivo JSON com o relatório")
+    args = parser.parse_args(argv)
+
+    if not download_nltk_resources():
+        raise RuntimeError("Alguns recursos NLTK não puderam ser baixados/carregados.")
+    texts, intents, _ = load_dataset(args.dataset)
+    preprocessor = load_default_preprocessor()
+    cache = open_corpus_cache(args.cache_dir, preprocessor)
+    processed = cache.preprocess(texts, preprocessor.preprocess_batch)
+    cache.close()
+    train_idx, test_idx = split_indices(np.asarray(intents))
+    if train_idx is None:
+        raise ValueError("Não há dados/classes suficientes para avaliar após a filtragem.")
+
+    report = hashing_report(processed, np.asarray(intents), train_idx, test_idx, args.buckets, NGRAM_RANGE)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Relatório salvo em: {args.output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import json
+import math
+import os
+import random
+import re
+from collections import Counter
+
+# Tabela de scores fundidos termo -> classes.
+#
+# O modelo é linear: score_c(x) = sum_t x_t * coef[c, t] + intercept[c], com
+# x_t = tf_t * idf_t / ||tf * idf||. Dobrando o IDF nos coeficientes
+# (w[t, c] = idf_t * coef[c, t]) temos
+#     score_c = (sum_t tf_t * w[t, c]) / ||tf * idf|| + intercept[c]
+# e a inferência só visita os n-gramas presentes na mensagem: o custo passa a
+# ser O(tokens x classes), independente do tamanho do vocabulário.
+
+FUSED_FORMAT = 'fused_term_scores'
+FUSED_FORMAT_VERSION = 1
+# Diferença máxima aceita entre este scorer e pipeline.decision_function.
+FUSED_TOLERANCE = 1e-9
+FUSED_FILENAME = 'fused_scoring.json'
+# Padrão do TfidfVectorizer (tokens com 2+ caracteres de palavra).
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+
+def build_fused_table(fitted_tfidf, fitted_svm):
+    return _fused_table(
+        fitted_tfidf.vocabulary_, fitted_tfidf.idf_, fitted_svm.coef_, fitted_svm.intercept_, fitted_svm.classes_.tolist(),
+        fitted_tfidf.ngram_range, fitted_tfidf.token_pattern, fitted_tfidf.sublinear_tf, fitted_tfidf.norm)
+
+
+def fused_table_from_json(tfidf_model_data, svm_model_data):
+    # Permite gerar a tabela a partir dos JSONs já exportados, sem retreinar.
+    coef = svm_model_data['coef_']
+    return _fused_table(
+        tfidf_model_data['vocabulary_'], tfidf_model_data['idf_'],
+        [[row[idx] for row in coef] for idx in range(len(tfidf_model_data['idf_']))],
+        svm_model_data['intercept_'], svm_model_data['classes_'],
+        tfidf_model_data['ngram_range'], tfidf_model_data.get('token_pattern', DEFAULT_TOKEN_PATTERN),
+        tfidf_model_data['sublinear_tf'], tfidf_model_data['norm'], coef_by_term=True)
+
+
+def _fused_table(vocabulary, idf, coef, intercept, classes, ngram_range, token_pattern, sublinear_tf, norm,
+                 coef_by_term=False):
+    terms = {}
+    for term, idx in vocabulary.items():
+        column = coef[idx] if coef_by_term else coef[:, idx]
+        terms[term] = [float(idf[idx]), [float(w) * float(idf[idx]) for w in column]]
+    return {
+        'format': FUSED_FORMAT,
+        'format_version': FUSED_FORMAT_VERSION,
+        'classes_': list(classes),
+        'intercept_': [float(b) for b in intercept],
+        'ngram_range': list(ngram_range),
+        'token_pattern': token_pattern,
+        'sublinear_tf': sublinear_tf,
+        'norm': norm,
+        'tolerance': FUSED_TOLERANCE,
+        # termo -> [idf, [score fundido por classe]]
+        'terms': terms,
+    }
+
+
+def word_ngrams(tokens, ngram_range):
+    # Mesmos n-gramas do TfidfVectorizer (analyzer='word'), unidos por espaço.
+    min_n, max_n = ngram_range
+    ngrams = []
+    for n in range(min_n, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            ngrams.append(' '.join(tokens[i:i + n]))
+    return ngrams
+
+
+class FusedScorer:
+    def __init__(self, table):
+        if table.get('format') != FUSED_FORMAT:
+            raise ValueError("Tabela fundida inválida.")
+        self.classes_ = table['classes_']
+        self.intercept_ = table['intercept_']
+        self.ngram_range = tuple(table['ngram_range'])
+        self.sublinear_tf = table['sublinear_tf']
+        self.norm = table['norm']
+        self.terms = table['terms']
+        self._token_re = re.compile(table['token_pattern'])
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def tokenize(self, processed_text):
+        return self._token_re.findall(processed_text.lower())
+
+    def decision_function_tokens(self, tokens):
+        n_classes = len(self.intercept_) # 1 no caso binário (score da classe positiva)
+        accumulated = [0.0] * n_classes
+        norm_acc = 0.0
+        for term, count in Counter(word_ngrams(tokens, self.ngram_range)).items():
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            idf, weights = entry
+            tf = 1.0 + math.log(count) if self.sublinear_tf else float(count)
+            for c in range(n_classes):
+                accumulated[c] += tf * weights[c]
+            value = tf * idf
+            norm_acc += value * value if self.norm == 'l2' else abs(value)
+        if self.norm == 'l2':
+            scale = math.sqrt(norm_acc)
+        elif self.norm == 'l1':
+            scale = norm_acc
+        else:
+            scale = 1.0
+        if scale == 0.0:
+            return list(self.intercept_)
+        return [acc / scale + b for acc, b in zip(accumulated, self.intercept_)]
+
+    def decision_function(self, processed_text):
+        return self.decision_function_tokens(self.tokenize(processed_text))
+
+    def predict(self, processed_text):
+        scores = self.decision_function(processed_text)
+        if len(scores) == 1:
+            return self.classes_[1] if scores[0] > 0 else self.classes_[0]
+        return self.classes_[max(range(len(scores)), key=scores.__getitem__)]
+
+
+def max_decision_error(scorer, fitted_tfidf, fitted_svm, processed_texts):
+    # Compara o scorer de referência com sklearn em todos os textos informados.
+    reference = fitted_svm.decision_function(fitted_tfidf.transform(processed_texts))
+    if reference.ndim == 1: # caso binário: sklearn devolve só o score da classe positiva
+        return max(abs(scorer.decision_function(text)[0] - ref) for text, ref in zip(processed_texts, reference))
+    worst = 0.0
+    for text, ref_row in zip(processed_texts, reference):
+        for value, ref in zip(scorer.decision_function(text), ref_row):
+            worst = max(worst, abs(value - ref))
+    return worst
+
+
+def _dense_reference_scores(tfidf_model_data, svm_model_data, tokens):
+    # Caminho denso original (vetor do tamanho do vocabulário), usado só para conferência.
+    vocab = tfidf_model_data['vocabulary_']
+    idf = tfidf_model_data['idf_']
+    vector = [0.0] * len(idf)
+    for term in word_ngrams(tokens, tfidf_model_data['ngram_range']):
+        if term in vocab:
+            vector[vocab[term]] += 1.0
+    if tfidf_model_data['sublinear_tf']:
+        vector = [1.0 + math.log(v) if v > 0 else 0.0 for v in vector]
+    vector = [v * w for v, w in zip(vector, idf)]
+    magnitude = math.sqrt(sum(v * v for v in vector))
+    if magnitude > 0:
+        vector = [v / magnitude for v in vector]
+    return [sum(v * w for v, w in zip(vector, row)) + b
+            for row, b in zip(svm_model_data['coef_'], svm_model_data['intercept_'])]
+
+
+def export_fused_table(fitted_tfidf, fitted_svm, path, processed_texts=None):
+    table = build_fused_table(fitted_tfidf, fitted_svm)
+    if processed_texts is not None:
+        error = max_decision_error(FusedScorer(table), fitted_tfidf, fitted_svm, processed_texts)
+        if error > FUSED_TOLERANCE:
+            raise ValueError(f"Tabela fundida diverge de decision_function: erro máximo {error:.3e} > {FUSED_TOLERANCE:.0e}")
+        table['max_error_vs_sklearn'] = error
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, separators=(',', ':'))
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera fused_scoring.json a partir de tfidf_model.json + svm_model.json já exportados.")
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--samples', type=int, default=500, help="Mensagens sintéticas usadas na conferência contra o caminho denso")
+    args = parser.parse_args()
+
+    with open(os.path.join(args.models_dir, 'tfidf_model.json'), 'r', encoding='utf-8') as f:
+        tfidf_model_data = json.load(f)
+    with open(os.path.join(args.models_dir, 'svm_model.json'), 'r', encoding='utf-8') as f:
+        svm_model_data = json.load(f)
+    if tfidf_model_data['norm'] != 'l2':
+        raise SystemExit("A conferência densa só cobre norm='l2'.")
+    table = fused_table_from_json(tfidf_model_data, svm_model_data)
+    scorer = FusedScorer(table)
+
+    rng = random.Random(42)
+    unigrams = [term for term in tfidf_model_data['vocabulary_'] if ' ' not in term]
+    worst = 0.0
+    for _ in range(args.samples):
+        tokens = [rng.choice(unigrams) for _ in range(rng.randint(1, 8))]
+        reference = _dense_reference_scores(tfidf_model_data, svm_model_data, tokens)
+        worst = max(worst, max(abs(a - b) for a, b in zip(scorer.decision_function_tokens(tokens), reference)))
+    if worst > FUSED_TOLERANCE:
+        raise SystemExit(f"Tabela fundida diverge do caminho denso: erro máximo {worst:.3e}")
+    table['max_error_vs_dense'] = worst
+
+    path = os.path.join(args.models_dir, FUSED_FILENAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Tabela de scores fundidos exportada para: {path} ({os.path.getsize(path)/1024:.2f} KB; "
+          f"erro máximo vs. caminho denso em {args.samples} mensagens: {worst:.2e})")
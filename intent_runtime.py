@@ -0,0 +1,217 @@
+import functools
+import json
+import os
+import re
+import numpy as np
+import scipy.sparse as sp
+from entity_matcher import load_matcher
+from feature_hashing import feature_hasher
+from fused_scoring import DEFAULT_TOKEN_PATTERN, word_ngrams
+
+# Runtime de inferência em Python sobre os artefatos exportados
+# (tfidf_model.json, svm_model.json, entity_dictionaries.json) — os mesmos que
+# a aplicação Node.js usa em produção. Não depende de pandas nem de sklearn:
+# a vetorização é feita direto em CSR (scipy.sparse) e a classificação é um
+# único produto matriz esparsa x coeficientes por lote.
+
+MODELS_DIR = 'models'
+DEFAULT_BATCH_SIZE = 4096
+TERM_CACHE_SIZE = 65536
+
+AGE_REGEX = re.compile(r'\b(\d{1,2})\s*(anos)?\b', re.IGNORECASE)
+EMAIL_REGEX = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+
+class IntentRuntime:
+    def __init__(self, models_dir=MODELS_DIR, preprocessor=None, binary=False):
+        self.models_dir = models_dir
+        self.binary = binary
+        entity_path = os.path.join(models_dir, 'entity_dictionaries.json')
+        if os.path.exists(entity_path):
+            with open(entity_path, 'r', encoding='utf-8') as f:
+                self.entity_dictionaries = json.load(f)
+        else:
+            self.entity_dictionaries = {}
+
+        self.binary_model = None
+        if binary:
+            self._load_binary()
+        else:
+            self._load_json()
+
+        self._preprocessor = preprocessor
+        # Autômato Aho-Corasick: uma passada no texto, independente do tamanho dos dicionários
+        self.entity_matcher = load_matcher(models_dir, self.entity_dictionaries)
+
+    def _load_json(self):
+        with open(os.path.join(self.models_dir, 'tfidf_model.json'), 'r', encoding='utf-8') as f:
+            tfidf_model_data = json.load(f)
+        with open(os.path.join(self.models_dir, 'svm_model.json'), 'r', encoding='utf-8') as f:
+            svm_model_data = json.load(f)
+
+        # Modo de hashing de features: sem vocabulary_, o índice de cada n-grama vem da função de hash exportada.
+        self.feature_hashing = tfidf_model_data.get('feature_hashing')
+        self.vocabulary = tfidf_model_data.get('vocabulary_')
+        self._hasher = feature_hasher(self.feature_hashing) if self.feature_hashing else None
+        self.idf = np.asarray(tfidf_model_data['idf_'], dtype=np.float64)
+        self.ngram_range = tuple(tfidf_model_data['ngram_range'])
+        self.sublinear_tf = tfidf_model_data.get('sublinear_tf', False)
+        self.norm = tfidf_model_data.get('norm', 'l2')
+        self._token_re = re.compile(tfidf_model_data.get('token_pattern') or DEFAULT_TOKEN_PATTERN)
+
+        self.classes = np.asarray(svm_model_data['classes_'])
+        # (n_features x n_classes) contíguo: X @ W devolve os scores de todas as classes de uma vez
+        self.weights = np.ascontiguousarray(np.asarray(svm_model_data['coef_'], dtype=np.float64).T)
+        self.intercept = np.asarray(svm_model_data['intercept_'], dtype=np.float64)
+
+    def _load_binary(self):
+        # Formato binário (--binary-export): vocabulário empacotado, IDF e coef_ em CSR abertos por
+        # memory-map, sem parsing de JSON nem cópia dos arrays para a memória do processo.
+        from binary_artifacts import BINARY_DIRNAME, BinaryModel
+        model = BinaryModel(os.path.join(self.models_dir, BINARY_DIRNAME))
+        manifest = model.manifest
+        self.binary_model = model
+        self.feature_hashing = None
+        self._hasher = None
+        # Busca binária no vocabulário mapeado; os termos frequentes ficam num cache LRU limitado.
+        self.vocabulary = _CachedTermIndex(model)
+        self.idf = model.idf_
+        self.ngram_range = tuple(manifest['ngram_range'])
+        self.sublinear_tf = manifest.get('sublinear_tf', False)
+        self.norm = manifest.get('norm', 'l2')
+        self._token_re = re.compile(manifest.get('token_pattern') or DEFAULT_TOKEN_PATTERN)
+        self.classes = np.asarray(model.classes_)
+        self.weights = None
+        self.intercept = np.asarray(model.intercept_, dtype=np.float64)
+
+    # --- Pré-processamento / vetorização ---
+
+    @property
+    def preprocessor(self):
+        # Carregado sob demanda: NLTK só é importado quando há texto cru para processar.
+        if self._preprocessor is None:
+            from text_preprocessing import download_nltk_resources, load_default_preprocessor
+            if not download_nltk_resources():
+                raise RuntimeError("Recursos NLTK indisponíveis para pré-processar o texto.")
+            from stem_table import STEM_TABLE_FILENAME, load_stem_table
+            preprocessor = load_default_preprocessor()
+            # Tokens conhecidos (treino + logs) saem da tabela exportada; o RSLP só roda nos demais.
+            preprocessor.use_stem_table(load_stem_table(os.path.join(self.models_dir, STEM_TABLE_FILENAME),
+                                                        preprocessor.stemmer_name()))
+            self._preprocessor = preprocessor
+        return self._preprocessor
+
+    def preprocess(self, texts):
+        return self.preprocessor.preprocess_batch(texts)
+
+    def vectorize(self, processed_texts):
+        # Mesmo resultado de TfidfVectorizer.transform sobre o texto pré-processado.
+        indptr = [0]
+        indices = []
+        counts = []
+        vocabulary = self.vocabulary
+        hasher = self._hasher
+        for text in processed_texts:
+            row = {}
+            for term in word_ngrams(self._token_re.findall(text.lower()), self.ngram_range):
+                if hasher is not None:
+                    idx, sign = hasher(term)
+                    row[idx] = row.get(idx, 0) + sign
+                    continue
+                idx = vocabulary.get(term)
+                if idx is not None:
+                    row[idx] = row.get(idx, 0) + 1
+            indices.extend(row.keys())
+            counts.extend(row.values())
+            indptr.append(len(indices))
+
+        indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(counts, dtype=np.float64)
+        if self.sublinear_tf:
+            data = 1.0 + np.log(data)
+        data *= self.idf[indices]
+        X = sp.csr_matrix((data, indices, np.asarray(indptr, dtype=np.int64)),
+                          shape=(len(indptr) - 1, len(self.idf)))
+        if self.norm in ('l1', 'l2'):
+            squared = X.multiply(X) if self.norm == 'l2' else abs(X)
+            row_norms = np.asarray(squared.sum(axis=1)).ravel()
+            if self.norm == 'l2':
+                row_norms = np.sqrt(row_norms)
+            row_norms[row_norms == 0.0] = 1.0
+            X = sp.diags(1.0 / row_norms) @ X
+        return X.tocsr()
+
+    # --- Classificação ---
+
+    def decision_function(self, texts, preprocessed=False):
+        processed = list(texts) if preprocessed else self.preprocess(texts)
+        X = self.vectorize(processed)
+        if self.binary_model is not None:
+            return self.binary_model.scores(X)
+        return np.asarray(X @ self.weights) + self.intercept
+
+    def _class_scores(self, scores):
+        # Caso binário: sklearn guarda só o score da classe positiva.
+        if scores.shape[1] == 1:
+            return np.hstack([-scores, scores])
+        return scores
+
+    def predict(self, text, preprocessed=False):
+        return self.predict_batch([text], preprocessed=preprocessed)[0]
+
+    def predict_batch(self, texts, preprocessed=False, batch_size=DEFAULT_BATCH_SIZE):
+        predictions = []
+        for scores in self._iter_scores(texts, preprocessed, batch_size):
+            predictions.extend(self.classes[np.argmax(scores, axis=1)].tolist())
+        return predictions
+
+    def top_k_with_scores(self, texts, k=3, preprocessed=False, batch_size=DEFAULT_BATCH_SIZE):
+        # Para cada texto: [(intenção, score de decisão), ...] em ordem decrescente.
+        single = isinstance(texts, str)
+        results = []
+        for scores in self._iter_scores([texts] if single else texts, preprocessed, batch_size):
+            k_eff = min(k, scores.shape[1])
+            top = np.argpartition(-scores, k_eff - 1, axis=1)[:, :k_eff]
+            for row, candidates in zip(scores, top):
+                ordered = candidates[np.argsort(-row[candidates])]
+                results.append([(str(self.classes[c]), float(row[c])) for c in ordered])
+        return results[0] if single else results
+
+    def _iter_scores(self, texts, preprocessed, batch_size):
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= batch_size:
+                yield self._class_scores(self.decision_function(batch, preprocessed))
+                batch = []
+        if batch:
+            yield self._class_scores(self.decision_function(batch, preprocessed))
+
+    # --- Extração de Entidades (mesma lógica de nlp_utils.extractEntities) ---
+
+    def extract_entities(self, text):
+        if not isinstance(text, str) or not text.strip():
+            return []
+        found = []
+        text_lower = text.lower()
+        for entity_type, value in self.entity_matcher.find_all(text_lower):
+            found.append({'type': entity_type, 'value': value, 'rawMatchInText': value})
+        for match in AGE_REGEX.finditer(text):
+            found.append({'type': 'idade', 'value': int(match.group(1)), 'rawMatchInText': match.group(0)})
+        for match in EMAIL_REGEX.finditer(text_lower):
+            found.append({'type': 'email', 'value': match.group(0), 'rawMatchInText': match.group(0)})
+
+        unique = []
+        seen = set()
+        for entity in found:
+            key = f"{entity['type']}:{entity['value']}"
+            if key not in seen:
+                unique.append(entity)
+                seen.add(key)
+        return unique
+
+
+class _CachedTermIndex:
+    # vocabulary.get(termo) sobre o vocabulário empacotado do formato binário.
+    def __init__(self, model, cache_size=TERM_CACHE_SIZE):
+        self.get = functools.lru_cache(maxsize=cache_size)(model.get)
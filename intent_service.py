@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import time
+from binary_artifacts import BINARY_DIRNAME
+from intent_runtime import MODELS_DIR, IntentRuntime
+from response_cache import cached_top_k, load_response_cache
+
+# Serviço HTTP (asyncio, só biblioteca padrão) de classificação de intenções
+# sobre os artefatos exportados.
+#
+#   POST /classify  {"text": "..."}  -> {"intent", "score", "entities"}
+#   GET  /health                     -> estado e versão dos artefatos carregados
+#   GET  /metrics                    -> profundidade da fila, histogramas de lote, latências, recargas
+#
+# Micro-batching: as requisições concorrentes entram numa fila; o coletor junta
+# até --max-batch mensagens ou espera no máximo --max-wait-ms desde a primeira e
+# classifica o lote inteiro de uma vez (uma vetorização CSR e um único produto
+# matriz esparsa x coeficientes em IntentRuntime), consultando antes o cache de
+# respostas. Sob rajadas, o custo fixo por mensagem é dividido pelo lote.
+# A classificação roda no próprio laço de eventos (um núcleo por processo); o
+# lote seguinte se acumula na fila enquanto o atual é processado.
+#
+# Recarga a quente: os artefatos são verificados (mtime/tamanho) a cada
+# --reload-interval segundos; quando mudam e ficam estáveis por um intervalo,
+# o novo runtime é carregado numa thread e trocado entre dois lotes. Se a carga
+# falhar (ex.: exportação pela metade), o runtime anterior continua servindo.
+# Com --binary o modelo vem de models/bin (memory-map) e o arquivo observado é o
+# manifest.json, que o exportador grava por último; o cache de respostas não é usado.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_RELOAD_INTERVAL = 2.0
+# Acima disso a fila recusa requisições (503) em vez de acumular latência sem limite.
+DEFAULT_MAX_QUEUE = 10000
+MAX_BODY_BYTES = 64 * 1024
+LATENCY_WINDOW = 10000
+WATCHED_ARTIFACTS = ('tfidf_model.json', 'svm_model.json', 'entity_dictionaries.json', 'entity_automaton.json',
+                     'portuguese_stopwords.json', 'stem_table.json', 'response_cache.json')
+WATCHED_BINARY_ARTIFACTS = (os.path.join(BINARY_DIRNAME, 'manifest.json'), 'entity_dictionaries.json',
+                            'entity_automaton.json', 'portuguese_stopwords.json', 'stem_table.json')
+WARMUP_TEXT = 'quero uma cotação de plano de saúde'
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def histogram_bucket(value):
+    # Limite superior em potência de 2 (1, 2, 4, 8, ...): o balde "8" conta valores de 5 a 8.
+    bucket = 1
+    while bucket < value:
+        bucket *= 2
+    return bucket
+
+
+def percentiles_ms(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    return {name: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+            for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))}
+
+
+class MicroBatcher:
+    def __init__(self, score_batch, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT_MS / 1000,
+                 max_queue=DEFAULT_MAX_QUEUE):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(max_queue)
+        self.batches = 0
+        self.requests = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = collections.Counter()
+        self.queue_depths = collections.Counter()
+        self.score_seconds = 0.0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    async def submit(self, text):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((text, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return None
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        depth = self.queue.qsize()
+        self.queue_depths[histogram_bucket(depth) if depth else 0] += 1
+        self.batch_sizes[histogram_bucket(len(batch))] += 1
+        self.batches += 1
+        self.requests += len(batch)
+        start = time.perf_counter()
+        try:
+            results = self.score_batch([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.score_seconds += time.perf_counter() - start
+        now = time.perf_counter()
+        for (_, future, enqueued), result in zip(batch, results):
+            self._latencies.append(now - enqueued)
+            if not future.done(): # cliente desconectado: o futuro já foi cancelado
+                future.set_result(result)
+
+    def metrics(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'batch_size_histogram': {str(bucket): count for bucket, count in sorted(self.batch_sizes.items())},
+            # Mensagens que ainda esperavam na fila no momento de cada lote (0 = fila vazia).
+            'queue_depth_histogram': {str(bucket): count for bucket, count in sorted(self.queue_depths.items())},
+            'mean_batch_score_ms': self.score_seconds / self.batches * 1000 if self.batches else 0.0,
+            'request_latency_ms': percentiles_ms(self._latencies),
+        }
+
+
+class IntentService:
+    def __init__(self, models_dir=MODELS_DIR, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 reload_interval=DEFAULT_RELOAD_INTERVAL, use_response_cache=True, max_queue=DEFAULT_MAX_QUEUE, binary=False):
+        self.models_dir = models_dir
+        self.reload_interval = reload_interval
+        self.binary = binary
+        # As respostas do cache vêm do modelo em precisão total dos JSONs: no modo binário (quantizado) ficam de fora.
+        self.use_response_cache = use_response_cache and not binary
+        self.batcher = MicroBatcher(self.score_batch, max_batch, max_wait_ms / 1000, max_queue)
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_reload_error = None
+        self.started_at = time.time()
+        self.signature = self.artifact_signature()
+        self.runtime, self.response_cache = self.load_artifacts()
+        self.loaded_at = time.time()
+
+    def artifact_signature(self):
+        signature = []
+        for filename in WATCHED_BINARY_ARTIFACTS if self.binary else WATCHED_ARTIFACTS:
+            try:
+                stat = os.stat(os.path.join(self.models_dir, filename))
+                signature.append((filename, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((filename, None, None))
+        return tuple(signature)
+
+    def load_artifacts(self):
+        # Carrega e aquece (NLTK, stemmer, tabela de stems) antes de servir: a 1ª requisição não paga a carga.
+        runtime = IntentRuntime(self.models_dir, binary=self.binary)
+        runtime.predict(WARMUP_TEXT)
+        cache = load_response_cache(self.models_dir) if self.use_response_cache else None
+        return runtime, cache
+
+    def score_batch(self, texts):
+        # Faltas do cache de respostas: um único top_k_with_scores (CSR x coeficientes) para o lote.
+        return [{'intent': ranked[0][0], 'score': ranked[0][1], 'entities': entities}
+                for ranked, entities in cached_top_k(self.runtime, texts, 1, self.response_cache)]
+
+    async def watch_artifacts(self):
+        loop = asyncio.get_running_loop()
+        pending = None
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            signature = self.artifact_signature()
+            if signature == self.signature:
+                pending = None
+                continue
+            # O exportador grava vários arquivos em sequência: só recarrega depois de um intervalo sem mudanças.
+            if signature != pending:
+                pending = signature
+                continue
+            try:
+                runtime, cache = await loop.run_in_executor(None, self.load_artifacts)
+            except Exception as e:
+                self.reload_errors += 1
+                self.last_reload_error = f"{type(e).__name__}: {e}"
+                print(f"Falha ao recarregar os artefatos ({self.last_reload_error}); mantendo a versão anterior.")
+            else:
+                # Sem await entre as duas atribuições: nenhum lote vê runtime e cache de versões diferentes.
+                self.runtime, self.response_cache = runtime, cache
+                self.reloads += 1
+                self.loaded_at = time.time()
+                print(f"Artefatos recarregados de {self.models_dir} (recarga nº {self.reloads}).")
+            self.signature = signature
+            pending = None
+
+    def health(self):
+        return {
+            'status': 'UP',
+            'models_dir': self.models_dir,
+            'binary': self.binary,
+            'classes': len(self.runtime.classes),
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'response_cache': self.response_cache is not None,
+        }
+
+    def metrics(self):
+        metrics = self.batcher.metrics()
+        metrics.update({
+            'uptime_seconds': time.time() - self.started_at,
+            'max_batch': self.batcher.max_batch,
+            'max_wait_ms': self.batcher.max_wait * 1000,
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+            'last_reload_error': self.last_reload_error,
+            'response_cache': self.response_cache.stats() if self.response_cache is not None else None,
+        })
+        return metrics
+
+    async def route(self, method, path, body):
+        path = path.split('?', 1)[0]
+        if path == '/health':
+            return (200, self.health()) if method == 'GET' else (405, {'error': 'Use GET.'})
+        if path == '/metrics':
+            return (200, self.metrics()) if method == 'GET' else (405, {'error': 'Use GET.'})
+        if path != '/classify':
+            return 404, {'error': f'Rota desconhecida: {path}'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST.'}
+        try:
+            payload = json.loads(body or b'null')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return 400, {'error': 'Corpo não é JSON válido.'}
+        # "message" é o nome do campo no POST /chat do Express.
+        text = payload.get('text', payload.get('message')) if isinstance(payload, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            return 400, {'error': 'Forneça uma string não vazia no campo "text".'}
+        try:
+            result = await self.batcher.submit(text)
+        except Exception as e:
+            return 500, {'error': f'Falha ao classificar: {type(e).__name__}: {e}'}
+        if result is None:
+            return 503, {'error': 'Fila cheia; tente novamente.'}
+        return 200, result
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 mínimo com keep-alive: uma requisição por vez por conexão.
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode('latin-1').split()
+                length = headers.get('content-length', '0')
+                if len(parts) != 3 or not length.isdigit():
+                    writer.write(http_response(400, {'error': 'Requisição HTTP inválida.'}, keep_alive=False))
+                    break
+                method, target, version = parts
+                if int(length) > MAX_BODY_BYTES:
+                    writer.write(http_response(413, {'error': f'Corpo acima de {MAX_BODY_BYTES} bytes.'}, keep_alive=False))
+                    break
+                body = await reader.readexactly(int(length)) if int(length) else b''
+                status, payload = await self.route(method, target, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        tasks = [asyncio.create_task(self.batcher.run())]
+        if self.reload_interval > 0:
+            tasks.append(asyncio.create_task(self.watch_artifacts()))
+        print(f"Serviço de intenções em http://{host}:{port} (lote máx. {self.batcher.max_batch}, "
+              f"espera máx. {self.batcher.max_wait * 1000:.1f} ms, artefatos de {self.models_dir})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP asyncio de classificação de intenções com micro-batching.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="Mensagens por lote (1 = uma por vez)")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Espera máxima, desde a 1ª mensagem do lote, por mais mensagens")
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE, help="Mensagens em espera antes de responder 503")
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="Segundos entre verificações dos artefatos (0 desativa a recarga a quente)")
+    parser.add_argument('--no-response-cache', action='store_true', help="Não consulta o cache de respostas exportado")
+    parser.add_argument('--binary', action='store_true',
+                        help="Carrega o modelo do formato binário (models-dir/bin, memory-map) em vez dos JSONs")
+    args = parser.parse_args(argv)
+
+    service = IntentService(args.models_dir, args.max_batch, args.max_wait_ms, args.reload_interval,
+                            use_response_cache=not args.no_response_cache, max_queue=args.max_queue, binary=args.binary)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Serviço encerrado.")
+    return service
+
+
+if __name__ == '__main__':
+    main()
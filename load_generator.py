@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from urllib.parse import urlsplit
+from batch_score import percentile
+
+# Gerador de carga para o intent_service.py (asyncio, só biblioteca padrão).
+#
+# N conexões keep-alive enviam POST /classify com textos de um JSONL de logs (ou
+# uma amostra embutida). Sem --burst-size a carga é fechada: cada conexão envia
+# a próxima mensagem assim que recebe a resposta. Com --burst-size as mensagens
+# são liberadas em rajadas de B requisições a cada --burst-pause-ms, como o
+# tráfego de picos. No fim mostra throughput, latência e o /metrics do serviço
+# (histograma de tamanhos de lote, profundidade da fila).
+#
+# Comparativo com o caminho por mensagem: suba o serviço com --max-batch 1 e
+# depois com o padrão, e rode o mesmo comando contra os dois.
+
+DEFAULT_URL = 'http://127.0.0.1:8000'
+SAMPLE_TEXTS = [
+    'Oi', 'Bom dia', 'Boa tarde, tudo bem?', 'quero uma cotação', 'Quero um plano de saúde para minha família',
+    'Quanto custa o plano individual?', 'O plano cobre cirurgia bariátrica?', 'Tenho 33 anos e moro em Campinas',
+    'Qual a diferença entre o plano empresarial e o individual?', 'Quero cancelar meu contrato', 'Obrigado, tchau',
+]
+
+
+async def http_request(reader, writer, host, method, path, payload=None):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b''
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Conexão fechada pelo serviço.")
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+    data = await reader.readexactly(length) if length else b''
+    return int(status_line.split()[1]), json.loads(data) if data else None
+
+
+async def _client(host, port, tokens, texts, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            token = await tokens.get()
+            if token is None:
+                return
+            start = time.perf_counter()
+            try:
+                status, _ = await http_request(reader, writer, host, 'POST', '/classify', {'text': next(texts)})
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors['connection'] = errors.get('connection', 0) + 1
+                writer.close() # libera o transporte da conexão perdida antes de abrir outra
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def _release(tokens, total, concurrency, burst_size, burst_pause):
+    # Sem rajadas: todas as fichas de uma vez (cada conexão puxa a próxima ao terminar a anterior).
+    sent = 0
+    while sent < total:
+        size = min(burst_size or total, total - sent)
+        for _ in range(size):
+            tokens.put_nowait(True)
+        sent += size
+        if burst_size and sent < total:
+            await asyncio.sleep(burst_pause)
+    for _ in range(concurrency):
+        tokens.put_nowait(None)
+
+
+async def run(url, texts, total, concurrency, burst_size=None, burst_pause_ms=0.0):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    tokens = asyncio.Queue()
+    latencies = []
+    errors = {}
+    cycle = itertools.cycle(texts)
+    start = time.perf_counter()
+    await asyncio.gather(
+        _release(tokens, total, concurrency, burst_size, burst_pause_ms / 1000),
+        *[_client(host, port, tokens, cycle, latencies, errors) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, metrics = await http_request(reader, writer, host, 'GET', '/metrics')
+    finally:
+        writer.close()
+    latencies.sort()
+    return {
+        'requests': total,
+        'ok': len(latencies) - sum(count for key, count in errors.items() if key != 'connection'),
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'latency_p50_ms': percentile(latencies, 0.50) * 1000,
+        'latency_p95_ms': percentile(latencies, 0.95) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'service_metrics': metrics,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera carga (contínua ou em rajadas) contra o intent_service.py.")
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--logs', nargs='+', default=None, help="JSONL de logs com os textos a enviar (padrão: amostra embutida)")
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=64, help="Conexões simultâneas")
+    parser.add_argument('--burst-size', type=int, default=None, help="Libera as requisições em rajadas deste tamanho")
+    parser.add_argument('--burst-pause-ms', type=float, default=50.0, help="Pausa entre rajadas")
+    parser.add_argument('--output', default=None, help="Grava o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    texts = SAMPLE_TEXTS
+    if args.logs:
+        from stem_table import read_log_texts
+        texts = [text for text in read_log_texts(args.logs, args.text_field) if text.strip()] or SAMPLE_TEXTS
+    result = asyncio.run(run(args.url, texts, args.requests, args.concurrency, args.burst_size, args.burst_pause_ms))
+
+    errors = ', '.join(f"{key}: {count}" for key, count in result['errors'].items()) or 'nenhum'
+    print(f"{result['requests']} requisições ({args.concurrency} conexões"
+          f"{f', rajadas de {args.burst_size}' if args.burst_size else ''}) em {result['seconds']:.2f}s "
+          f"-> {result['requests_per_second']:.0f} req/s; erros: {errors}")
+    print(f"Latência: p50 {result['latency_p50_ms']:.2f} ms, p95 {result['latency_p95_ms']:.2f} ms, "
+          f"p99 {result['latency_p99_ms']:.2f} ms")
+    metrics = result['service_metrics']
+    print(f"Serviço (acumulado desde o início): {metrics['batches']} lotes, média {metrics['mean_batch_size']:.1f} mensagens/lote "
+          f"(histograma {metrics['batch_size_histogram']}); fila máx. {metrics['max_queue_depth']}; "
+          f"{metrics['mean_batch_score_ms']:.2f} ms por lote")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Resultado salvo em: {args.output}")
+    return result
+
+
+if __name__ == '__main__':
+    main()
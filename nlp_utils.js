@@ -1,3 +1,4 @@
+const crypto = require('crypto');
 const fs = require('fs');
 const path = require('path');
 const natural = require('natural'); // Importa a biblioteca natural
@@ -32,16 +33,86 @@ try {
     console.error("Erro ao carregar entity_dictionaries.json:", err);
 }
 
-let portugueseStopwords = [];
+// Tabela de scores fundidos (IDF já dobrado em coef_), gerada pelo exportador.
+// Opcional: se ausente, a predição usa o caminho denso calculateTfIdf + predictIntent.
+let fusedModel = null;
+try {
+    const fusedData = fs.readFileSync(path.join(modelsDir, 'fused_scoring.json'), 'utf8');
+    fusedModel = JSON.parse(fusedData);
+    console.log("fused_scoring.json carregado com sucesso.");
+} catch (err) {
+    console.warn("fused_scoring.json não encontrado; usando o caminho TF-IDF denso.");
+}
+
+// Set: consulta O(1) por token (a lista tem ~200 palavras).
+let portugueseStopwords = new Set();
 try {
     const stopwordsData = fs.readFileSync(path.join(modelsDir, 'portuguese_stopwords.json'), 'utf8');
-    portugueseStopwords = JSON.parse(stopwordsData);
+    portugueseStopwords = new Set(JSON.parse(stopwordsData));
     console.log("portuguese_stopwords.json carregado com sucesso.");
 } catch (err)
     {
     console.error("Erro ao carregar portuguese_stopwords.json:", err);
 }
 
+// Tabela token -> stem gerada pelo exportador (stem_table.py) com o RSLPStemmer do treino.
+// Em "stems", um inteiro n é o prefixo de n caracteres do token; uma string é o stem literal.
+// Decodificada uma vez no carregamento. Opcional: se ausente, todo token passa pelo PorterStemmerPt.
+let stemTable = null;
+try {
+    const stemTableData = JSON.parse(fs.readFileSync(path.join(modelsDir, 'stem_table.json'), 'utf8'));
+    stemTable = new Map();
+    for (const [token, value] of Object.entries(stemTableData.stems)) {
+        stemTable.set(token, typeof value === 'number' ? token.slice(0, value) : value);
+    }
+    console.log(`stem_table.json carregado com sucesso (${stemTable.size} tokens).`);
+} catch (err) {
+    console.warn("stem_table.json não encontrado; usando só o PorterStemmerPt.");
+}
+
+// Cache de respostas gerado pelo exportador (response_cache.py): utterance -> intenção/scores/entidades.
+// Chave exata (texto sem espaços nas pontas): devolve intenção e entidades. Chave normalizada
+// (minúsculas, sem pontuação, espaços colapsados): devolve só a intenção; as entidades dependem
+// do texto cru e são extraídas de novo. Limitado a max_entries com remoção LRU (ordem do Map).
+// Só é usado se foi gerado para estes mesmos artefatos: um retreino muda o hash e o desativa.
+const RESPONSE_CACHE_ARTIFACTS = ['tfidf_model.json', 'svm_model.json', 'entity_dictionaries.json',
+                                  'portuguese_stopwords.json', 'stem_table.json']; // mesma lista de response_cache.py
+
+function normalizeUtterance(text) {
+    return text.toLowerCase().replace(/[!"#$%&'()*+,-./:;<=>?@[\]^_`{|}~]/g, '').split(/\s+/).filter(token => token.length > 0).join(' ');
+}
+
+function artifactVersion() {
+    const digest = crypto.createHash('sha256');
+    for (const filename of RESPONSE_CACHE_ARTIFACTS) {
+        const filePath = path.join(modelsDir, filename);
+        const fileHash = fs.existsSync(filePath)
+            ? crypto.createHash('sha256').update(fs.readFileSync(filePath)).digest('hex')
+            : '-';
+        digest.update(`${filename}:${fileHash}\n`);
+    }
+    return digest.digest('hex');
+}
+
+let responseCache = null; // chave normalizada -> { text, intent, entities }
+let responseCacheMaxEntries = 0;
+const responseCacheStats = { exactHits: 0, normalizedHits: 0, misses: 0, evictions: 0, hitMs: 0, missMs: 0 };
+try {
+    const payload = JSON.parse(fs.readFileSync(path.join(modelsDir, 'response_cache.json'), 'utf8'));
+    if (payload.artifact_version !== artifactVersion()) {
+        console.warn("response_cache.json foi gerado para outros artefatos (retreino?); cache de respostas desativado.");
+    } else {
+        responseCache = new Map();
+        responseCacheMaxEntries = payload.max_entries;
+        for (const entry of payload.entries) {
+            cacheResponse(entry.text, entry.scores[0][0], entry.entities);
+        }
+        console.log(`response_cache.json carregado com sucesso (${responseCache.size} utterances).`);
+    }
+} catch (err) {
+    console.warn("response_cache.json não encontrado; todas as mensagens passam pelo pipeline completo.");
+}
+
 // Não é necessário instanciar o stemmer. O método .stem() é chamado estaticamente.
 // console.log("Stemmer (PorterStemmerPt) pronto para uso estático.");
 
@@ -62,11 +133,11 @@ function preprocessText(text) {
     let tokens = text.split(/\s+/).filter(token => token.length > 0);
 
     // 4. Remoção de Stopwords
-    tokens = tokens.filter(token => !portugueseStopwords.includes(token));
+    tokens = tokens.filter(token => !portugueseStopwords.has(token));
 
-    // 5. Stemming (usando o método estático)
+    // 5. Stemming: tabela exportada (mesmos stems do treino); PorterStemmerPt só para tokens fora dela
     try {
-        tokens = tokens.map(token => natural.PorterStemmerPt.stem(token));
+        tokens = tokens.map(token => (stemTable && stemTable.get(token)) ?? natural.PorterStemmerPt.stem(token));
     } catch (e) {
         console.error("Erro durante o stemming com natural.PorterStemmerPt:", e);
         // Retornar tokens não stemizados ou lidar com o erro como preferir
@@ -76,9 +147,56 @@ function preprocessText(text) {
     return tokens;
 }
 
+// --- Hashing de features (tfidf_model.json com "feature_hashing" em vez de vocabulary_) ---
+// MurmurHash3 x86 32 bits sobre os bytes UTF-8, com sinal (mesmo valor de sklearn.utils.murmurhash3_32).
+function murmurhash3_32(key, seed) {
+    const data = Buffer.from(key, 'utf8');
+    const length = data.length;
+    const roundedEnd = length & ~3;
+    let h = seed >>> 0;
+    let k;
+    for (let i = 0; i < roundedEnd; i += 4) {
+        k = data.readUInt32LE(i);
+        k = Math.imul(k, 0xcc9e2d51);
+        k = (k << 15) | (k >>> 17);
+        k = Math.imul(k, 0x1b873593);
+        h ^= k;
+        h = (h << 13) | (h >>> 19);
+        h = (Math.imul(h, 5) + 0xe6546b64) | 0;
+    }
+    k = 0;
+    const tail = length & 3;
+    if (tail === 3) k ^= data[roundedEnd + 2] << 16;
+    if (tail >= 2) k ^= data[roundedEnd + 1] << 8;
+    if (tail >= 1) {
+        k ^= data[roundedEnd];
+        k = Math.imul(k, 0xcc9e2d51);
+        k = (k << 15) | (k >>> 17);
+        k = Math.imul(k, 0x1b873593);
+        h ^= k;
+    }
+    h ^= length;
+    h ^= h >>> 16;
+    h = Math.imul(h, 0x85ebca6b);
+    h ^= h >>> 13;
+    h = Math.imul(h, 0xc2b2ae35);
+    h ^= h >>> 16;
+    return h | 0;
+}
+
+// [índice, sinal] de um n-grama: índice = abs(h) % n_features, sinal = +1 se h >= 0.
+function hashedFeature(ngram, spec) {
+    const h = murmurhash3_32(ngram, spec.seed || 0);
+    const nFeatures = spec.n_features;
+    const index = h === -2147483648 ? (2147483647 - (nFeatures - 1)) % nFeatures : Math.abs(h) % nFeatures;
+    const sign = spec.alternate_sign === false || h >= 0 ? 1 : -1;
+    return [index, sign];
+}
+
 // --- Cálculo TF-IDF ---
 function calculateTfIdf(processedTokens) {
-    if (!tfidfModel || !tfidfModel.vocabulary_ || !tfidfModel.idf_) {
+    const hashing = tfidfModel ? tfidfModel.feature_hashing : null;
+    if (!tfidfModel || !(tfidfModel.vocabulary_ || hashing) || !tfidfModel.idf_) {
         console.error("calculateTfIdf: Modelo TF-IDF não carregado ou inválido.");
         return null;
     }
@@ -104,7 +222,10 @@ function calculateTfIdf(processedTokens) {
 
     const tfVector = new Array(idfValues.length).fill(0);
     for (const ngram of ngrams) {
-        if (vocab.hasOwnProperty(ngram)) {
+        if (hashing) {
+            const [termIndex, sign] = hashedFeature(ngram, hashing);
+            tfVector[termIndex] += sign;
+        } else if (vocab.hasOwnProperty(ngram)) {
             const termIndex = vocab[ngram];
             tfVector[termIndex]++;
         }
@@ -184,6 +305,70 @@ function predictIntent(tfidfVector) {
     return 'fallback_intent_no_prediction';
 }
 
+// --- Predição com a Tabela Fundida (O(tokens), sem vetores do tamanho do vocabulário) ---
+function isFusedModelLoaded() {
+    return fusedModel !== null;
+}
+
+function predictIntentFused(processedTokens) {
+    if (!fusedModel) {
+        console.error("predictIntentFused: Tabela fundida não carregada.");
+        return null;
+    }
+    if (!Array.isArray(processedTokens)) {
+        console.error("predictIntentFused: Entrada não é um array de tokens.");
+        return null;
+    }
+
+    // Mesmo critério do token_pattern padrão do TfidfVectorizer: tokens com 2+ caracteres de palavra.
+    const tokens = processedTokens.join(' ').match(/[\p{L}\p{M}\p{N}_]{2,}/gu) || [];
+    const ngramRange = fusedModel.ngram_range || [1, 1];
+    const counts = new Map();
+    for (let n = ngramRange[0]; n <= ngramRange[1]; n++) {
+        for (let i = 0; i <= tokens.length - n; i++) {
+            const ngram = tokens.slice(i, i + n).join(' ');
+            counts.set(ngram, (counts.get(ngram) || 0) + 1);
+        }
+    }
+
+    const intercepts = fusedModel.intercept_;
+    const scores = new Array(intercepts.length).fill(0);
+    let normAcc = 0;
+    for (const [ngram, count] of counts) {
+        const entry = fusedModel.terms[ngram];
+        if (!entry) {
+            continue;
+        }
+        const [idf, weights] = entry;
+        const tf = fusedModel.sublinear_tf ? 1 + Math.log(count) : count;
+        for (let c = 0; c < scores.length; c++) {
+            scores[c] += tf * weights[c];
+        }
+        const value = tf * idf;
+        normAcc += fusedModel.norm === 'l2' ? value * value : Math.abs(value);
+    }
+    let scale = 1;
+    if (fusedModel.norm === 'l2') {
+        scale = Math.sqrt(normAcc);
+    } else if (fusedModel.norm === 'l1') {
+        scale = normAcc;
+    }
+
+    let maxScore = -Infinity;
+    let predictedIntentIndex = -1;
+    for (let c = 0; c < scores.length; c++) {
+        const score = (scale > 0 ? scores[c] / scale : 0) + intercepts[c];
+        if (score > maxScore) {
+            maxScore = score;
+            predictedIntentIndex = c;
+        }
+    }
+    if (scores.length === 1) { // Caso binário: score único da classe positiva
+        return maxScore > 0 ? fusedModel.classes_[1] : fusedModel.classes_[0];
+    }
+    return predictedIntentIndex !== -1 ? fusedModel.classes_[predictedIntentIndex] : 'fallback_intent_no_prediction';
+}
+
 // --- Extração de Entidades ---
 function escapeRegExp(string) {
   return string.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
@@ -237,11 +422,83 @@ function extractEntities(text) {
     return uniqueEntities;
 }
 
+// --- Cache de Respostas ---
+// Devolve { intent, entities } (entities null se só a chave normalizada bateu) ou null.
+function lookupCachedResponse(text) {
+    if (!responseCache || typeof text !== 'string') {
+        return null;
+    }
+    const exactText = text.trim();
+    const key = normalizeUtterance(exactText);
+    const entry = responseCache.get(key);
+    if (!entry) {
+        responseCacheStats.misses++;
+        return null;
+    }
+    // Reinserir move a chave para o fim: a primeira do Map é sempre a menos usada.
+    responseCache.delete(key);
+    responseCache.set(key, entry);
+    if (entry.text === exactText) {
+        responseCacheStats.exactHits++;
+        return { intent: entry.intent, entities: entry.entities };
+    }
+    responseCacheStats.normalizedHits++;
+    return { intent: entry.intent, entities: null };
+}
+
+function cacheResponse(text, intent, entities) {
+    if (!responseCache || !intent) {
+        return;
+    }
+    const exactText = text.trim();
+    const key = normalizeUtterance(exactText);
+    if (!key) {
+        return;
+    }
+    responseCache.delete(key);
+    responseCache.set(key, { text: exactText, intent, entities });
+    while (responseCache.size > responseCacheMaxEntries) {
+        responseCache.delete(responseCache.keys().next().value);
+        responseCacheStats.evictions++;
+    }
+}
+
+function recordResponseLatency(hit, elapsedMs) {
+    if (responseCache) {
+        responseCacheStats[hit ? 'hitMs' : 'missMs'] += elapsedMs;
+    }
+}
+
+function getResponseCacheStats() {
+    const { exactHits, normalizedHits, misses, evictions, hitMs, missMs } = responseCacheStats;
+    const hits = exactHits + normalizedHits;
+    const lookups = hits + misses;
+    return {
+        enabled: Boolean(responseCache),
+        entries: responseCache ? responseCache.size : 0,
+        maxEntries: responseCacheMaxEntries,
+        lookups,
+        exactHits,
+        normalizedHits,
+        misses,
+        evictions,
+        hitRate: lookups ? hits / lookups : 0,
+        meanHitLatencyMs: hits ? hitMs / hits : 0,
+        meanMissLatencyMs: misses ? missMs / misses : 0,
+    };
+}
+
 module.exports = {
     preprocessText,
     calculateTfIdf,
     predictIntent,
+    isFusedModelLoaded,
+    predictIntentFused,
     extractEntities,
+    lookupCachedResponse,
+    cacheResponse,
+    recordResponseLatency,
+    getResponseCacheStats,
 };
 
 console.log("nlp_utils.js carregado e pronto para uso (stemmer estático).");
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from binary_artifacts import BINARY_DIRNAME
+from corpus_cache import CACHE_DIR
+from dataset_loader import load_dataset
+from feature_hashing import DEFAULT_N_FEATURES
+from fused_scoring import FUSED_FILENAME
+from text_preprocessing import download_nltk_resources, load_default_preprocessor
+from train_pipeline import (DATASET_PATH, JOBLIB_DIR, MODELS_DIR, NGRAM_RANGE, classifier_payload, open_corpus_cache,
+                            tfidf_model_payload)
+
+# Aprendizado incremental a partir de correções rotuladas (JSONL), sem retreino completo.
+#
+# - Espaço de features: hashing (feature_hashing.py) com contagens sem sinal e
+#   normalização L2, sem IDF. Termos fora do vocabulário do treino original não
+#   são descartados: caem em um balde fixo e passam a contribuir assim que
+#   aparecem em exemplos rotulados. Sem IDF, nenhuma estatística global precisa
+#   ser recalculada quando chegam exemplos novos.
+# - Modelos: MultinomialNB e SGDClassifier(loss='hinge', SVM linear por SGD),
+#   ambos atualizados com partial_fit em mini-lotes.
+# - Conjunto de intenções fixo, definido no bootstrap a partir do dataset:
+#   exemplos com intenção desconhecida são rejeitados (é preciso um retreino
+#   completo para criar uma intenção nova).
+# - O estado (hasher + modelos) fica em online_state.joblib; cada atualização
+#   regrava tfidf_model.json/svm_model.json (SGD) e os pipelines joblib, e apaga
+#   fused_scoring.json e models/bin/: ambos são indexados por vocabulário, que o
+#   espaço de hashing não tem, e continuariam servindo o modelo anterior.
+
+STATE_FILENAME = 'online_state.joblib'
+STATE_VERSION = 1
+DEFAULT_BATCH_SIZE = 256
+BOOTSTRAP_EPOCHS = 5
+
+
+def build_hasher(n_features=DEFAULT_N_FEATURES):
+    # Sem sinal: o MultinomialNB exige features não negativas.
+    return HashingVectorizer(n_features=n_features, ngram_range=NGRAM_RANGE, alternate_sign=False, norm='l2')
+
+
+def new_state(classes, n_features=DEFAULT_N_FEATURES):
+    return {
+        'version': STATE_VERSION,
+        'classes': np.asarray(sorted(set(classes))),
+        'hasher': build_hasher(n_features),
+        'models': {
+            'nb': MultinomialNB(alpha=0.1),
+            'svm': SGDClassifier(loss='hinge', alpha=1e-4, random_state=42),
+        },
+        'examples_seen': 0,
+        'updates': 0,
+    }
+
+
+def load_state(path):
+    state = joblib.load(path)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"Estado de aprendizado online incompatível em {path}; rode o bootstrap novamente.")
+    return state
+
+
+def partial_fit(state, processed_texts, labels, batch_size=DEFAULT_BATCH_SIZE, epochs=1, random_state=42):
+    # Mini-lotes sobre os exemplos (embaralhados a cada época); os modelos seguem do estado atual.
+    X = state['hasher'].transform(processed_texts)
+    y = np.asarray(labels)
+    rng = np.random.default_rng(random_state + state['updates'])
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for model in state['models'].values():
+                model.partial_fit(X[batch], y[batch], classes=state['classes'])
+    state['examples_seen'] += len(y) * epochs
+    state['updates'] += 1
+    return X
+
+
+def read_feedback(path, text_field='text', label_field='intent'):
+    # Cada linha: {"text": "...", "intent": "..."}; linhas inválidas são reportadas e ignoradas.
+    texts, labels, errors = [], [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                errors.append((line_number, f'JSON inválido: {e}'))
+                continue
+            text = record.get(text_field) if isinstance(record, dict) else None
+            label = record.get(label_field) if isinstance(record, dict) else None
+            if not isinstance(text, str) or not isinstance(label, str):
+                errors.append((line_number, f"Campos '{text_field}'/'{label_field}' ausentes ou não são texto"))
+                continue
+            texts.append(text)
+            labels.append(label)
+    return texts, labels, errors
+
+
+def export_artifacts(state, models_dir=MODELS_DIR, joblib_dir=JOBLIB_DIR, state_path=None):
+    # Regrava só o que muda com o modelo: TF-IDF (especificação do hash), SVM e pipelines joblib.
+    os.makedirs(models_dir, exist_ok=True)
+    os.makedirs(joblib_dir, exist_ok=True)
+    paths = {
+        'tfidf': os.path.join(models_dir, 'tfidf_model.json'),
+        'svm': os.path.join(models_dir, 'svm_model.json'),
+    }
+    for name, payload in [('tfidf', tfidf_model_payload(state['hasher'])), ('svm', classifier_payload(state['models']['svm']))]:
+        with open(paths[name], 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    # A tabela fundida é indexada por termo; com o espaço de hashing ela ficaria inconsistente.
+    fused_path = os.path.join(models_dir, FUSED_FILENAME)
+    if os.path.exists(fused_path):
+        os.remove(fused_path)
+    # Idem para o formato binário (--binary-export): o runtime com --binary leria o modelo anterior.
+    binary_dir = os.path.join(models_dir, BINARY_DIRNAME)
+    if os.path.exists(os.path.join(binary_dir, 'manifest.json')):
+        shutil.rmtree(binary_dir)
+        print(f"Artefatos binários antigos removidos: {binary_dir}")
+
+    for name, model in state['models'].items():
+        paths[f'joblib_{name}'] = os.path.join(joblib_dir, f'intent_classifier_{name}.joblib')
+        joblib.dump(Pipeline([('tfidf', state['hasher']), ('clf', model)]), paths[f'joblib_{name}'])
+    paths['state'] = state_path or os.path.join(joblib_dir, STATE_FILENAME)
+    joblib.dump(state, paths['state'])
+    return paths
+
+
+def accuracy_by_model(state, X, labels):
+    return {name: float(np.mean(model.predict(X) == np.asarray(labels))) for name, model in state['models'].items()}
+
+
+def bootstrap(dataset_path=DATASET_PATH, models_dir=MODELS_DIR, joblib_dir=JOBLIB_DIR, n_features=DEFAULT_N_FEATURES,
+              batch_size=DEFAULT_BATCH_SIZE, epochs=BOOTSTRAP_EPOCHS, cache_dir=CACHE_DIR):
+    # Estado inicial a partir do dataset completo (mesmo pré-processamento/cache do pipeline de treino).
+    texts, intents, _ = load_dataset(dataset_path)
+    preprocessor = load_default_preprocessor()
+    cache = open_corpus_cache(cache_dir, preprocessor)
+    processed = cache.preprocess(texts, preprocessor.preprocess_batch)
+    cache.close()
+
+    start = time.perf_counter()
+    state = new_state(intents, n_features)
+    X = partial_fit(state, processed, intents, batch_size, epochs)
+    paths = export_artifacts(state, models_dir, joblib_dir)
+    elapsed = time.perf_counter() - start
+    print(f"Bootstrap: {len(texts)} exemplos, {len(state['classes'])} intenções, {n_features} baldes, "
+          f"{epochs} épocas em {elapsed:.2f}s")
+    for name, acc in accuracy_by_model(state, X, intents).items():
+        print(f"  {name.upper()} acurácia (treino): {acc:.4f}")
+    return state, paths
+
+
+def update(feedback_path, models_dir=MODELS_DIR, joblib_dir=JOBLIB_DIR, state_path=None, text_field='text',
+           label_field='intent', batch_size=DEFAULT_BATCH_SIZE, epochs=1):
+    state_path = state_path or os.path.join(joblib_dir, STATE_FILENAME)
+    if not os.path.exists(state_path):
+        raise FileNotFoundError(f"Estado {state_path} não encontrado; rode 'python online_learning.py bootstrap' primeiro.")
+    start = time.perf_counter()
+    state = load_state(state_path)
+    texts, labels, errors = read_feedback(feedback_path, text_field, label_field)
+
+    known = set(state['classes'].tolist())
+    accepted = [i for i, label in enumerate(labels) if label in known]
+    unknown = sorted({label for label in labels if label not in known})
+    n_rejected = len(labels) - len(accepted)
+    for line_number, message in errors:
+        print(f"  Linha {line_number} ignorada: {message}")
+    if unknown:
+        print(f"  {n_rejected} exemplos rejeitados por intenção desconhecida: {', '.join(unknown)}")
+    if not accepted:
+        print("Nenhum exemplo válido para atualizar o modelo.")
+        return None
+
+    texts = [texts[i] for i in accepted]
+    labels = [labels[i] for i in accepted]
+    processed = load_default_preprocessor().preprocess_batch(texts)
+    X = state['hasher'].transform(processed)
+    before = accuracy_by_model(state, X, labels)
+    partial_fit(state, processed, labels, batch_size, epochs)
+    after = accuracy_by_model(state, X, labels)
+    paths = export_artifacts(state, models_dir, joblib_dir, state_path)
+    elapsed = time.perf_counter() - start
+
+    print(f"Atualização: {len(labels)} exemplos incorporados em {elapsed:.2f}s "
+          f"(total visto: {state['examples_seen']}, atualizações: {state['updates']})")
+    for name in state['models']:
+        print(f"  {name.upper()} acurácia no lote: {before[name]:.4f} -> {after[name]:.4f}")
+    return {'accepted': len(labels), 'rejected': n_rejected, 'errors': len(errors),
+            'accuracy_before': before, 'accuracy_after': after, 'seconds': elapsed, 'paths': paths}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aprendizado incremental (partial_fit) a partir de correções rotuladas em JSONL.")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--joblib-dir', default=JOBLIB_DIR)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Tamanho dos mini-lotes do partial_fit")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    bootstrap_parser = subparsers.add_parser('bootstrap', help="Cria o estado online a partir do dataset completo")
+    bootstrap_parser.add_argument('--dataset', default=DATASET_PATH)
+    bootstrap_parser.add_argument('--n-features', type=int, default=DEFAULT_N_FEATURES, help="Nº de baldes do hashing")
+    bootstrap_parser.add_argument('--epochs', type=int, default=BOOTSTRAP_EPOCHS)
+    bootstrap_parser.add_argument('--cache-dir', default=CACHE_DIR)
+
+    update_parser = subparsers.add_parser('update', help="Incorpora exemplos rotulados de um JSONL e reexporta os artefatos")
+    update_parser.add_argument('feedback', help="JSONL com um objeto {\"text\": ..., \"intent\": ...} por linha")
+    update_parser.add_argument('--state', default=None, help=f"Arquivo de estado (padrão: <joblib-dir>/{STATE_FILENAME})")
+    update_parser.add_argument('--text-field', default='text')
+    update_parser.add_argument('--label-field', default='intent')
+    update_parser.add_argument('--epochs', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if not download_nltk_resources():
+        raise RuntimeError("Alguns recursos NLTK não puderam ser baixados/carregados.")
+    if args.command == 'bootstrap':
+        return bootstrap(args.dataset, args.models_dir, args.joblib_dir, args.n_features, args.batch_size, args.epochs,
+                         args.cache_dir)
+    return update(args.feedback, args.models_dir, args.joblib_dir, args.state, args.text_field, args.label_field,
+                  args.batch_size, args.epochs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import contextlib
+import cProfile
+import json
+import os
+import re
+import time
+import tracemalloc
+
+# Instrumentação por etapa do pipeline de treino/exportação.
+#
+# Cada etapa (with tracer.stage('nome'): ...) registra tempo de parede, tempo
+# de CPU, pico de memória alocada pelo Python (tracemalloc) e nº de itens
+# processados. Etapas podem ser aninhadas. O arquivo de trace é JSON no
+# formato "Trace Event" do Chrome (abre em chrome://tracing, Perfetto e
+# speedscope), com a lista estruturada de etapas no campo "stages".
+# Opcionalmente grava um perfil cProfile (.prof) por etapa de nível superior
+# (as etapas aninhadas entram no perfil da etapa que as contém).
+#
+# Desativado (padrão), stage() só devolve um dicionário: custo desprezível.
+
+
+class Tracer:
+    def __init__(self, enabled=True, profile_dir=None, memory=True):
+        self.enabled = enabled or bool(profile_dir)
+        self.profile_dir = profile_dir
+        self.memory = memory and self.enabled
+        self.stages = []
+        self._stack = []
+        # Pico de memória de cada etapa aberta até o último reset_peak() (alinhado com _stack).
+        self._peaks = []
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+        self._profiling = False
+
+    @contextlib.contextmanager
+    def stage(self, name, items=None, **args):
+        # O dicionário devolvido aceita ajustes durante a etapa (ex.: record['items'] = n).
+        record = {'name': name, 'items': items, 'args': args}
+        if not self.enabled:
+            yield record
+            return
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        record['depth'] = len(self._stack)
+        record['parent'] = self._stack[-1]['name'] if self._stack else None
+        memory_start = 0
+        if self.memory:
+            memory_start, peak = tracemalloc.get_traced_memory()
+            # reset_peak() também apaga o pico das etapas abertas (a mãe pode ter alocado e liberado
+            # antes desta começar): ele fica guardado nelas e entra no máximo ao fim de cada uma.
+            self._peaks = [max(open_peak, peak) for open_peak in self._peaks]
+            tracemalloc.reset_peak()
+        profiler = None
+        if self.profile_dir and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+
+        self._stack.append(record)
+        self._peaks.append(0)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['start_seconds'] = wall_start - self._origin
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                os.makedirs(self.profile_dir, exist_ok=True)
+                filename = f"{len(self.stages):02d}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.prof"
+                record['profile'] = os.path.join(self.profile_dir, filename)
+                profiler.dump_stats(record['profile'])
+            if self.memory:
+                memory_end, peak = tracemalloc.get_traced_memory()
+                record['peak_memory_bytes'] = max(peak, self._peaks[-1])
+                record['memory_delta_bytes'] = memory_end - memory_start
+            if record['items'] and record['wall_seconds'] > 0:
+                record['items_per_second'] = record['items'] / record['wall_seconds']
+            self._stack.pop()
+            self._peaks.pop()
+            self.stages.append(record)
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def chrome_trace(self):
+        events = []
+        for record in sorted(self.stages, key=lambda r: r['start_seconds']):
+            args = {key: value for key, value in record.items()
+                    if key not in ('name', 'args', 'start_seconds', 'wall_seconds', 'depth', 'parent') and value is not None}
+            args.update(record['args'])
+            events.append({
+                'name': record['name'],
+                'cat': 'pipeline',
+                'ph': 'X',
+                'ts': record['start_seconds'] * 1e6,
+                'dur': record['wall_seconds'] * 1e6,
+                'pid': os.getpid(),
+                'tid': 0,
+                'args': args,
+            })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'stages': sorted(self.stages, key=lambda r: r['start_seconds']),
+        }
+
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+    def summary(self):
+        lines = [f"{'etapa':<34} {'parede (s)':>10} {'CPU (s)':>9} {'pico mem (MB)':>13} {'itens':>9}"]
+        for record in sorted(self.stages, key=lambda r: r['start_seconds']):
+            peak = record.get('peak_memory_bytes')
+            lines.append(f"{'  ' * record['depth'] + record['name']:<34} {record['wall_seconds']:>10.3f} {record['cpu_seconds']:>9.3f} "
+                         f"{(peak / 2 ** 20 if peak is not None else float('nan')):>13.2f} "
+                         f"{record['items'] if record['items'] is not None else '':>9}")
+        top_level = [record for record in self.stages if record['depth'] == 0]
+        lines.append(f"{'total':<34} {sum(r['wall_seconds'] for r in top_level):>10.3f} {sum(r['cpu_seconds'] for r in top_level):>9.3f}")
+        return '\n'.join(lines)
@@ -0,0 +1,284 @@
+import argparse
+import collections
+import hashlib
+import json
+import os
+import sys
+import time
+from corpus_cache import file_sha256
+from stem_table import STEM_TABLE_FILENAME, read_log_texts
+from text_preprocessing import PUNCTUATION_TABLE
+
+# Cache de respostas: utterance -> (intenção, scores, entidades), pré-calculado pelo
+# exportador (models/response_cache.json) a partir de todos os exemplos do dataset
+# e das utterances mais frequentes de logs de produção.
+#
+# Dois níveis de chave sobre a mesma entrada:
+#   exata       - o texto cru (sem espaços nas pontas): devolve intenção, scores e entidades.
+#   normalizada - minúsculas, sem pontuação, espaços colapsados. Intenção e scores só
+#                 dependem disso (o pré-processamento começa exatamente assim); as
+#                 entidades dependem do texto cru (e-mail, idade, fronteiras de palavra)
+#                 e são extraídas de novo, o que custa uma passada no autômato.
+# O cache é limitado (LRU): mensagens que erram entram no lugar das menos usadas.
+# A versão é um hash dos artefatos que determinam a resposta; depois de um retreino
+# (ou do online_learning.py) o arquivo antigo não bate e é ignorado.
+
+RESPONSE_CACHE_FILENAME = 'response_cache.json'
+RESPONSE_CACHE_FORMAT_VERSION = 1
+# Artefatos que determinam intenção/scores/entidades; a mesma lista está em nlp_utils.js.
+VERSIONED_ARTIFACTS = ('tfidf_model.json', 'svm_model.json', 'entity_dictionaries.json',
+                       'portuguese_stopwords.json', STEM_TABLE_FILENAME)
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_LOG_TOP = 20000
+DEFAULT_TOP_K = 3
+# Amostras de latência mantidas por tipo (acerto/falta) para os percentis.
+LATENCY_WINDOW = 10000
+
+
+def normalize_utterance(text):
+    return ' '.join(text.lower().translate(PUNCTUATION_TABLE).split())
+
+
+def artifact_version(models_dir):
+    # Hash dos hashes dos artefatos (ausente = '-'), em ordem fixa.
+    digest = hashlib.sha256()
+    for filename in VERSIONED_ARTIFACTS:
+        path = os.path.join(models_dir, filename)
+        digest.update(f"{filename}:{file_sha256(path) if os.path.exists(path) else '-'}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, top_k=DEFAULT_TOP_K, version=None):
+        self.max_entries = max_entries
+        self.top_k = top_k
+        self.version = version
+        # chave normalizada -> (texto exato, [(intenção, score), ...], entidades do texto exato)
+        self._entries = collections.OrderedDict()
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._latency = {'hit': collections.deque(maxlen=LATENCY_WINDOW), 'miss': collections.deque(maxlen=LATENCY_WINDOW)}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text):
+        # (ranked, entidades) num acerto; entidades é None quando só a chave normalizada bateu.
+        text = text.strip()
+        key = normalize_utterance(text)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        exact_text, ranked, entities = entry
+        if exact_text == text:
+            self.exact_hits += 1
+            return ranked, entities
+        self.normalized_hits += 1
+        return ranked, None
+
+    def put(self, text, ranked, entities):
+        text = text.strip()
+        key = normalize_utterance(text)
+        if not key:
+            return
+        self._entries[key] = (text, ranked[:self.top_k], entities)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def record_latency(self, hit, seconds):
+        self._latency['hit' if hit else 'miss'].append(seconds)
+
+    def stats(self):
+        lookups = self.exact_hits + self.normalized_hits + self.misses
+        stats = {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'lookups': lookups,
+            'exact_hits': self.exact_hits,
+            'normalized_hits': self.normalized_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.exact_hits + self.normalized_hits) / lookups if lookups else 0.0,
+        }
+        for kind, samples in self._latency.items():
+            ordered = sorted(samples)
+            stats[f'{kind}_latency_ms'] = {
+                'mean': sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+                'p50': ordered[len(ordered) // 2] * 1000 if ordered else 0.0,
+                'p95': ordered[int(len(ordered) * 0.95)] * 1000 if ordered else 0.0,
+            }
+        return stats
+
+    def payload(self):
+        # Menos usadas primeiro: recarregar na mesma ordem preserva a ordem do LRU.
+        return {
+            'format_version': RESPONSE_CACHE_FORMAT_VERSION,
+            'artifact_version': self.version,
+            'max_entries': self.max_entries,
+            'top_k': self.top_k,
+            'entries': [{'text': text, 'scores': [list(pair) for pair in ranked], 'entities': entities}
+                        for text, ranked, entities in self._entries.values()],
+        }
+
+
+def load_response_cache(models_dir, max_entries=None):
+    # ResponseCache semeado com o arquivo exportado; None se ausente ou de outra versão dos artefatos.
+    path = os.path.join(models_dir, RESPONSE_CACHE_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('format_version') != RESPONSE_CACHE_FORMAT_VERSION:
+        print(f"{path}: formato de cache de respostas não suportado; ignorado.", file=sys.stderr)
+        return None
+    version = artifact_version(models_dir)
+    if payload.get('artifact_version') != version:
+        # stderr: batch_score.py pode estar escrevendo JSONL no stdout.
+        print(f"{path} foi gerado para outros artefatos (retreino?); ignorado.", file=sys.stderr)
+        return None
+    cache = ResponseCache(max_entries or payload['max_entries'], payload['top_k'], version)
+    for entry in payload['entries']:
+        cache.put(entry['text'], [tuple(pair) for pair in entry['scores']], entry['entities'])
+    return cache
+
+
+def cached_top_k(runtime, texts, k, cache):
+    # Como runtime.top_k_with_scores + extract_entities, consultando o cache antes.
+    # Devolve [(ranked, entidades), ...]; as faltas são classificadas juntas, em um lote.
+    if cache is None or k > cache.top_k:
+        ranked = runtime.top_k_with_scores(texts, k=k) if texts else []
+        return [(candidates, runtime.extract_entities(text)) for candidates, text in zip(ranked, texts)]
+    results = [None] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        start = time.perf_counter()
+        hit = cache.get(text)
+        if hit is not None:
+            ranked, entities = hit
+            results[i] = (ranked[:k], entities if entities is not None else runtime.extract_entities(text))
+            cache.record_latency(True, time.perf_counter() - start)
+        else:
+            missing.append(i)
+    if missing:
+        start = time.perf_counter()
+        ranked = runtime.top_k_with_scores([texts[i] for i in missing], k=cache.top_k)
+        for i, candidates in zip(missing, ranked):
+            entities = runtime.extract_entities(texts[i])
+            cache.put(texts[i], candidates, entities)
+            results[i] = (candidates[:k], entities)
+        per_text = (time.perf_counter() - start) / len(missing)
+        for _ in missing:
+            cache.record_latency(False, per_text)
+    return results
+
+
+def seed_utterances(dataset_texts, log_paths, log_top=DEFAULT_LOG_TOP, text_field='text'):
+    # Utterances dos logs por frequência (chave normalizada; representante = forma crua mais comum),
+    # depois os exemplos do dataset que ainda não apareceram. Devolve também as contagens dos logs.
+    raw_counts = collections.Counter(text.strip() for text in read_log_texts(log_paths, text_field)) if log_paths else {}
+    by_key = {} # chave -> [ocorrências, representante, ocorrências do representante]
+    for raw, count in raw_counts.items():
+        key = normalize_utterance(raw)
+        if not key:
+            continue
+        entry = by_key.get(key)
+        if entry is None:
+            by_key[key] = [count, raw, count]
+        else:
+            entry[0] += count
+            if count > entry[2]:
+                entry[1], entry[2] = raw, count
+    frequent = sorted(by_key.items(), key=lambda item: (-item[1][0], item[0]))[:log_top]
+    seeds = [entry[1] for _, entry in frequent]
+    seen = {key for key, _ in frequent}
+    from_logs = len(seeds)
+    for text in dataset_texts:
+        text = text.strip()
+        key = normalize_utterance(text)
+        if key and key not in seen:
+            seen.add(key)
+            seeds.append(text)
+    return seeds, from_logs, raw_counts
+
+
+def export_response_cache(runtime, dataset_texts, log_paths, path, max_entries=DEFAULT_MAX_ENTRIES,
+                          log_top=DEFAULT_LOG_TOP, top_k=DEFAULT_TOP_K, text_field='text'):
+    # runtime: IntentRuntime sobre os artefatos recém-exportados (as respostas saem do mesmo código do serviço).
+    seeds, from_logs, raw_counts = seed_utterances(dataset_texts, log_paths, log_top, text_field)
+    kept = seeds[:max_entries]
+    cache = ResponseCache(max_entries, top_k, artifact_version(runtime.models_dir))
+    ranked = runtime.top_k_with_scores(kept, k=top_k) if kept else []
+    # Ordem de inserção invertida: as mais frequentes ficam como as mais recentes do LRU.
+    for text, candidates in reversed(list(zip(kept, ranked))):
+        cache.put(text, candidates, runtime.extract_entities(text))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(cache.payload(), f, ensure_ascii=False, separators=(',', ':'))
+
+    report = {
+        'path': path,
+        'entries': len(cache),
+        'from_logs': min(from_logs, len(kept)),
+        'from_dataset': max(len(kept) - from_logs, 0),
+        'dropped': len(seeds) - len(kept),
+        'bytes': os.path.getsize(path),
+        'log_messages': sum(raw_counts.values()),
+    }
+    if raw_counts:
+        # Taxa de acerto que o cache exportado teria sobre os próprios logs.
+        exact = set(kept)
+        keys = {normalize_utterance(text) for text in kept}
+        report['log_exact_hit_rate'] = sum(n for raw, n in raw_counts.items() if raw in exact) / report['log_messages']
+        report['log_hit_rate'] = sum(n for raw, n in raw_counts.items() if normalize_utterance(raw) in keys) / report['log_messages']
+    return report
+
+
+def format_report(report):
+    dropped = f", {report['dropped']} fora do limite" if report['dropped'] else ''
+    lines = [f"Cache de respostas exportado para: {report['path']} ({report['entries']} utterances: "
+             f"{report['from_logs']} dos logs, {report['from_dataset']} do dataset{dropped}; {report['bytes'] / 1024:.2f} KB)"]
+    if 'log_hit_rate' in report:
+        lines.append(f"  Acerto esperado sobre os {report['log_messages']} logs: {report['log_hit_rate']:.1%} "
+                     f"(exato: {report['log_exact_hit_rate']:.1%})")
+    return '\n'.join(lines)
+
+
+def format_stats(stats):
+    hit, miss = stats['hit_latency_ms'], stats['miss_latency_ms']
+    return (f"Cache de respostas: {stats['lookups']} consultas, acerto {stats['hit_rate']:.1%} "
+            f"(exato {stats['exact_hits']}, normalizado {stats['normalized_hits']}, faltas {stats['misses']}, "
+            f"remoções LRU {stats['evictions']}); latência média acerto {hit['mean']:.3f} ms (p95 {hit['p95']:.3f}), "
+            f"falta {miss['mean']:.3f} ms (p95 {miss['p95']:.3f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproduz logs JSONL contra o cache de respostas exportado e mede acerto e latência.")
+    parser.add_argument('logs', nargs='+', help="JSONL de logs (um objeto com o campo de texto, ou uma string, por linha)")
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--top-k', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=1, help="Mensagens por consulta (1 = uma requisição por vez)")
+    args = parser.parse_args(argv)
+
+    from intent_runtime import IntentRuntime
+    runtime = IntentRuntime(args.models_dir)
+    cache = load_response_cache(args.models_dir)
+    if cache is None:
+        raise SystemExit(f"Cache de respostas ausente ou desatualizado em {args.models_dir}.")
+    texts = list(read_log_texts(args.logs, args.text_field))
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch_size):
+        cached_top_k(runtime, texts[i:i + args.batch_size], args.top_k, cache)
+    elapsed = time.perf_counter() - start
+    print(format_stats(cache.stats()))
+    print(f"{len(texts)} mensagens em {elapsed:.2f}s ({len(texts) / elapsed if elapsed > 0 else 0:.0f} mensagens/s)")
+    return cache.stats()
+
+
+if __name__ == '__main__':
+    main()
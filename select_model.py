@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, StratifiedKFold
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+from corpus_cache import CACHE_DIR
+from dataset_loader import load_dataset
+from intent_runtime import IntentRuntime
+from text_preprocessing import download_nltk_resources, load_default_preprocessor
+from train_pipeline import DATASET_PATH, classifier_payload, open_corpus_cache, tfidf_model_payload
+
+# Seleção de modelo por validação cruzada estratificada (k-fold), em paralelo.
+#
+# - O pré-processamento (NLTK) é feito uma vez e reaproveitado do cache do corpus.
+# - O TfidfVectorizer ajustado em cada fold fica em cache (Pipeline(memory=...)),
+#   então candidatos que só mudam o classificador não refazem a vetorização.
+# - Para cada candidato o relatório traz acurácia média, tamanho dos artefatos
+#   JSON exportados e latência de predição por mensagem, e marca os candidatos
+#   na fronteira de Pareto (acurácia x latência x tamanho). A latência é medida
+#   no IntentRuntime carregado dos JSONs do candidato, o caminho que atende o
+#   tráfego, e não no Pipeline do sklearn.
+
+DEFAULT_FOLDS = 5
+REPORT_PATH = 'model_selection_report.json'
+
+
+def param_grid():
+    vectorizer_grid = {
+        'tfidf__ngram_range': [(1, 1), (1, 2)],
+        'tfidf__min_df': [1, 2],
+        'tfidf__sublinear_tf': [False, True],
+    }
+    return [
+        {**vectorizer_grid, 'clf': [MultinomialNB()], 'clf__alpha': [0.01, 0.1, 1.0]},
+        {**vectorizer_grid, 'clf': [LinearSVC(random_state=42, max_iter=3000, dual=True)], 'clf__C': [0.1, 1.0, 10.0]},
+    ]
+
+
+def filter_stratifiable(processed, intents, folds):
+    # Classes com menos de 2 exemplos não podem ser estratificadas; o nº de folds
+    # fica limitado pela menor classe restante.
+    counts = Counter(intents)
+    keep = [i for i, intent in enumerate(intents) if counts[intent] >= 2]
+    if len(keep) < len(intents):
+        print(f"Filtradas {len(intents) - len(keep)} amostras de classes com < 2 exemplos.")
+    processed = [processed[i] for i in keep]
+    intents = [intents[i] for i in keep]
+    n_splits = min(folds, min(Counter(intents).values()))
+    if n_splits < 2:
+        raise ValueError("Dados insuficientes para validação cruzada estratificada.")
+    return processed, np.asarray(intents), n_splits
+
+
+def runtime_payload(fitted_clf):
+    # svm_model.json lido pelo IntentRuntime. O NB multinomial também é linear no espaço de log:
+    # log P(c|x) = x @ feature_log_prob_[c] + class_log_prior_[c] (a menos de uma constante por amostra).
+    if hasattr(fitted_clf, 'feature_log_prob_'):
+        return {
+            'classes_': fitted_clf.classes_.tolist(),
+            'coef_': fitted_clf.feature_log_prob_.tolist(),
+            'intercept_': fitted_clf.class_log_prior_.tolist(),
+        }
+    return classifier_payload(fitted_clf)
+
+
+def export_candidate(fitted_tfidf, fitted_clf, models_dir):
+    # Mesmo formato do exportador (indent=2): o tamanho medido é o do artefato que seria publicado.
+    paths = []
+    for filename, payload in (('tfidf_model.json', tfidf_model_payload(fitted_tfidf)),
+                              ('svm_model.json', runtime_payload(fitted_clf))):
+        paths.append(os.path.join(models_dir, filename))
+        with open(paths[-1], 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+    return paths
+
+
+def measure_candidate(params, processed, y, latency_samples, rng):
+    # Reajusta o candidato com todos os dados para medir artefato e latência reais.
+    pipeline = Pipeline([('tfidf', TfidfVectorizer()), ('clf', None)])
+    pipeline.set_params(**params)
+    pipeline.fit(processed, y)
+
+    # Tamanho e latência dos mesmos arquivos: os JSONs exportados do candidato, carregados no
+    # runtime de inferência (texto já pré-processado: o custo do NLTK é o mesmo para todos).
+    models_dir = tempfile.mkdtemp(prefix='patel_candidate_')
+    try:
+        paths = export_candidate(pipeline.named_steps['tfidf'], pipeline.named_steps['clf'], models_dir)
+        size = sum(os.path.getsize(path) for path in paths)
+        runtime = IntentRuntime(models_dir)
+    finally:
+        shutil.rmtree(models_dir, ignore_errors=True)
+    runtime.predict_batch(processed[:1], preprocessed=True) # aquecimento: fora da medição
+    sample = rng.choice(len(processed), size=min(latency_samples, len(processed)), replace=False)
+    latencies = []
+    for idx in sample:
+        start = time.perf_counter()
+        runtime.predict_batch([processed[idx]], preprocessed=True)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'artifact_bytes': size,
+        'vocabulary_size': len(pipeline.named_steps['tfidf'].vocabulary_),
+        'predict_latency_p50_ms': latencies[len(latencies) // 2] * 1000,
+        'predict_latency_p95_ms': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000,
+    }
+
+
+def mark_pareto(candidates):
+    # Um candidato é dominado se outro é >= em acurácia e <= em latência e tamanho, com ao menos uma desigualdade estrita.
+    for candidate in candidates:
+        candidate['pareto'] = not any(
+            other is not candidate
+            and other['mean_accuracy'] >= candidate['mean_accuracy']
+            and other['predict_latency_p50_ms'] <= candidate['predict_latency_p50_ms']
+            and other['artifact_bytes'] <= candidate['artifact_bytes']
+            and (other['mean_accuracy'] > candidate['mean_accuracy']
+                 or other['predict_latency_p50_ms'] < candidate['predict_latency_p50_ms']
+                 or other['artifact_bytes'] < candidate['artifact_bytes'])
+            for other in candidates)
+
+
+def describe(params):
+    parts = []
+    for key, value in sorted(params.items()):
+        if key == 'clf':
+            parts.insert(0, type(value).__name__)
+        else:
+            parts.append(f"{key.split('__', 1)[1]}={value}")
+    return ' '.join(parts)
+
+
+def run(dataset_path=DATASET_PATH, folds=DEFAULT_FOLDS, search='grid', n_iter=20, n_jobs=-1,
+        cache_dir=CACHE_DIR, latency_samples=200, report_path=REPORT_PATH, random_state=42):
+    if not download_nltk_resources():
+        raise RuntimeError("Alguns recursos NLTK não puderam ser baixados/carregados.")
+    texts, intents, _ = load_dataset(dataset_path)
+    preprocessor = load_default_preprocessor()
+    cache = open_corpus_cache(cache_dir, preprocessor)
+    processed = cache.preprocess(texts, preprocessor.preprocess_batch)
+    cache.close()
+    processed, y, n_splits = filter_stratifiable(processed, intents, folds)
+
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    transformer_cache = tempfile.mkdtemp(prefix='patel_cv_')
+    try:
+        pipeline = Pipeline([('tfidf', TfidfVectorizer()), ('clf', MultinomialNB())], memory=transformer_cache)
+        if search == 'random':
+            searcher = RandomizedSearchCV(pipeline, param_grid(), n_iter=n_iter, cv=cv, scoring='accuracy',
+                                          n_jobs=n_jobs, random_state=random_state, refit=False)
+        else:
+            searcher = GridSearchCV(pipeline, param_grid(), cv=cv, scoring='accuracy', n_jobs=n_jobs, refit=False)
+        start = time.perf_counter()
+        searcher.fit(processed, y)
+        search_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(transformer_cache, ignore_errors=True)
+
+    results = searcher.cv_results_
+    rng = np.random.default_rng(random_state)
+    candidates = []
+    for i, params in enumerate(results['params']):
+        candidate = {
+            'model': describe(params),
+            'mean_accuracy': float(results['mean_test_score'][i]),
+            'std_accuracy': float(results['std_test_score'][i]),
+            'mean_fit_seconds': float(results['mean_fit_time'][i]),
+        }
+        candidate.update(measure_candidate(params, processed, y, latency_samples, rng))
+        candidates.append(candidate)
+    mark_pareto(candidates)
+    candidates.sort(key=lambda c: (-c['mean_accuracy'], c['predict_latency_p50_ms']))
+
+    report = {
+        'folds': n_splits,
+        'search': search,
+        'samples': len(processed),
+        'search_seconds': search_seconds,
+        'candidates': candidates,
+    }
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def print_report(report):
+    print(f"\n{len(report['candidates'])} candidatos, {report['folds']}-fold estratificado, "
+          f"{report['samples']} amostras, busca em {report['search_seconds']:.1f}s")
+    print(f"{'acurácia':>9} {'±':>6} {'tamanho (KB)':>12} {'p50 (ms)':>9} {'p95 (ms)':>9} {'vocab':>6}  modelo")
+    for c in report['candidates']:
+        flag = '*' if c['pareto'] else ' '
+        print(f"{c['mean_accuracy']:>9.4f} {c['std_accuracy']:>6.3f} {c['artifact_bytes'] / 1024:>12.1f} "
+              f"{c['predict_latency_p50_ms']:>9.3f} {c['predict_latency_p95_ms']:>9.3f} {c['vocabulary_size']:>6} {flag} {c['model']}")
+    print("(* = fronteira de Pareto em acurácia x latência x tamanho; latência por mensagem no IntentRuntime)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seleção de modelo por k-fold estratificado com relatório de tamanho/latência/acurácia.")
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--n-iter', type=int, default=20, help="Candidatos sorteados no modo random")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Processos para a busca (-1 = todos os núcleos)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--latency-samples', type=int, default=200)
+    parser.add_argument('--report', default=REPORT_PATH, help="Arquivo JSON com o relatório completo")
+    args = parser.parse_args()
+    print_report(run(args.dataset, args.folds, args.search, args.n_iter, args.n_jobs, args.cache_dir,
+                     args.latency_samples, args.report))
+    print(f"\nRelatório salvo em: {args.report}")
@@ -0,0 +1,178 @@
+import argparse
+import collections
+import json
+import os
+import statistics
+import sys
+import time
+
+# Tabela token de superfície -> stem, exportada junto com o modelo (models/stem_table.json).
+#
+# O treino faz o stemming com o RSLPStemmer do NLTK; o runtime Node.js usava o
+# PorterStemmerPt do `natural`, outro algoritmo, e portanto outros stems para a
+# mesma palavra. A tabela cobre todo token visto no treino e num corpus de logs
+# de produção (depois de minúsculas, pontuação, tokenização e stopwords, como no
+# treino) e guarda o stem que o modelo espera. Os runtimes consultam a tabela
+# primeiro e só chamam um stemmer algorítmico quando o token não está nela.
+#
+# Formato compacto: em "stems", um inteiro n significa "os n primeiros caracteres
+# do token" (o caso comum: o RSLP só corta sufixos); uma string é o stem literal
+# (quando o RSLP troca o sufixo, ex.: "ões" -> "ão").
+
+STEM_TABLE_FILENAME = 'stem_table.json'
+STEM_TABLE_VERSION = 1
+
+
+def count_tokens(texts, preprocessor):
+    # Tokens de superfície (antes do stemming) com o nº de ocorrências.
+    counts = collections.Counter()
+    for text in texts:
+        counts.update(preprocessor.tokens(text))
+    return counts
+
+
+def read_log_texts(paths, text_field='text'):
+    # Logs em JSONL, no mesmo formato aceito por batch_score.py; linhas inválidas são ignoradas.
+    from batch_score import read_records
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for _, text in read_records(f, text_field):
+                if text is not None:
+                    yield text
+
+
+def encode_stem(token, stem):
+    return len(stem) if token.startswith(stem) else stem
+
+
+def decode_stem(token, value):
+    return token[:value] if isinstance(value, int) else value
+
+
+def table_payload(table, stemmer_name):
+    return {
+        'version': STEM_TABLE_VERSION,
+        'stemmer': stemmer_name,
+        'stems': {token: encode_stem(token, table[token]) for token in sorted(table)},
+    }
+
+
+def write_stem_table(table, stemmer_name, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table_payload(table, stemmer_name), f, ensure_ascii=False, separators=(',', ':'))
+    return os.path.getsize(path)
+
+
+def load_stem_table(path, stemmer_name=None):
+    # dict token -> stem, ou None se o arquivo não existe (ou foi gerado com outro stemmer).
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('version') != STEM_TABLE_VERSION:
+        raise ValueError(f"{path}: versão de tabela de stems não suportada: {payload.get('version')}")
+    if stemmer_name and payload.get('stemmer') != stemmer_name:
+        # stderr: o runtime pode estar escrevendo JSONL no stdout (batch_score.py).
+        print(f"{path} foi gerada com {payload.get('stemmer')}, não {stemmer_name}: tabela ignorada.", file=sys.stderr)
+        return None
+    return {token: decode_stem(token, value) for token, value in payload['stems'].items()}
+
+
+def coverage(table, counts):
+    # Fração dos tokens (ocorrências e distintos) de um corpus que a tabela resolve sem stemmer.
+    total = sum(counts.values())
+    covered = sum(n for token, n in counts.items() if token in table)
+    distinct_covered = sum(1 for token in counts if token in table)
+    return {
+        'tokens': total,
+        'covered': covered,
+        'rate': covered / total if total else 1.0,
+        'distinct': len(counts),
+        'distinct_covered': distinct_covered,
+        'distinct_rate': distinct_covered / len(counts) if counts else 1.0,
+    }
+
+
+def export_stem_table(preprocessor, train_texts, log_paths, path, text_field='text'):
+    train_counts = count_tokens(train_texts, preprocessor)
+    log_counts = count_tokens(read_log_texts(log_paths, text_field), preprocessor) if log_paths else collections.Counter()
+    # O stemmer do próprio treino (sem passar por outra tabela): é o stem que o modelo viu.
+    stem = preprocessor.stemmer.stem
+    table = {token: stem(token) for token in train_counts.keys() | log_counts.keys()}
+    size = write_stem_table(table, preprocessor.stemmer_name(), path)
+    return {
+        'path': path,
+        'entries': len(table),
+        'train_entries': len(train_counts),
+        'log_entries_added': len(table) - len(train_counts),
+        'prefix_entries': sum(1 for token, value in table.items() if token.startswith(value)),
+        'bytes': size,
+        'plain_bytes': len(json.dumps(table, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+        # Sem os logs, quanto do tráfego real a tabela (só com o vocabulário do treino) já cobriria.
+        'log_coverage_train_only': coverage(train_counts, log_counts) if log_paths else None,
+        'log_coverage': coverage(table, log_counts) if log_paths else None,
+    }
+
+
+def format_coverage(cov):
+    return (f"{cov['rate']:.1%} das ocorrências ({cov['covered']}/{cov['tokens']}), "
+            f"{cov['distinct_rate']:.1%} dos tokens distintos ({cov['distinct_covered']}/{cov['distinct']})")
+
+
+def format_report(report):
+    lines = [
+        f"Tabela de stems exportada para: {report['path']} ({report['entries']} tokens: {report['train_entries']} do treino, "
+        f"+{report['log_entries_added']} dos logs; {report['bytes'] / 1024:.2f} KB, "
+        f"{report['bytes'] / max(report['entries'], 1):.1f} B/token; mapa token->stem simples: {report['plain_bytes'] / 1024:.2f} KB)",
+        f"  Stems que são prefixo do token (gravados como inteiro): {report['prefix_entries']}/{report['entries']}",
+    ]
+    if report['log_coverage'] is not None:
+        lines.append(f"  Cobertura dos logs só com o vocabulário do treino: {format_coverage(report['log_coverage_train_only'])}")
+        lines.append(f"  Cobertura dos logs com a tabela exportada: {format_coverage(report['log_coverage'])}")
+    return '\n'.join(lines)
+
+
+def _latency_ms(preprocessor, texts):
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        preprocessor(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {'mean': statistics.fmean(timings), 'p50': timings[len(timings) // 2], 'p95': timings[int(len(timings) * 0.95)]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cobertura e latência da tabela token -> stem exportada com o modelo.")
+    parser.add_argument('logs', nargs='+', help="JSONL de logs de produção (um objeto com o campo de texto, ou uma string, por linha)")
+    parser.add_argument('--table', default=os.path.join('models', STEM_TABLE_FILENAME))
+    parser.add_argument('--text-field', default='text')
+    parser.add_argument('--bench', action='store_true',
+                        help="Também mede a latência por mensagem do pré-processamento com e sem a tabela (pré-processadores novos, cache de stems frio)")
+    args = parser.parse_args(argv)
+
+    from text_preprocessing import download_nltk_resources, load_default_preprocessor
+    if not download_nltk_resources():
+        raise SystemExit("Recursos NLTK indisponíveis.")
+    preprocessor = load_default_preprocessor()
+    table = load_stem_table(args.table, preprocessor.stemmer_name())
+    if table is None:
+        raise SystemExit(f"Tabela de stems não encontrada (ou incompatível): {args.table}")
+    texts = list(read_log_texts(args.logs, args.text_field))
+    cov = coverage(table, count_tokens(texts, preprocessor))
+    print(f"{args.table}: {len(table)} tokens; cobertura de {len(texts)} mensagens: {format_coverage(cov)}")
+    if args.bench and texts:
+        with_table = load_default_preprocessor(stem_table=table)
+        mismatches = sum(1 for text in texts if with_table(text) != preprocessor(text))
+        baseline = _latency_ms(load_default_preprocessor(), texts)
+        tabled = _latency_ms(load_default_preprocessor(stem_table=table), texts)
+        for name, stats in (('stemmer (cache frio)', baseline), ('tabela + stemmer', tabled)):
+            print(f"  {name:<21} média {stats['mean']:.3f} ms, p50 {stats['p50']:.3f} ms, p95 {stats['p95']:.3f} ms por mensagem")
+        print(f"  Saídas divergentes com/sem tabela: {mismatches}")
+        cov['latency_ms'] = {'stemmer': baseline, 'table': tabled}
+        cov['mismatches'] = mismatches
+    return cov
+
+
+if __name__ == '__main__':
+    main()
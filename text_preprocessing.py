@@ -0,0 +1,215 @@
+import argparse
+import functools
+import json
+import multiprocessing
+import string
+import time
+
+# Pré-processamento compartilhado por treino, exportação e inferência em Python.
+# Mesma sequência do treino original (minúsculas -> remoção de pontuação ->
+# word_tokenize -> stopwords -> RSLP), com:
+#   - remoção de pontuação via str.translate (em vez de caractere a caractere);
+#   - cache LRU limitado para o stemmer (o vocabulário é pequeno e repetitivo);
+#   - tabela token -> stem opcional, exportada com o modelo (ver stem_table.py);
+#   - API em lote e modo multiprocessado para corpora grandes;
+#   - medição de throughput (textos/s).
+# O NLTK só é importado quando um pré-processador é criado: `import nltk` sozinho
+# custa segundos (o pacote importa scipy.stats, sklearn e pandas).
+
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+STEM_CACHE_SIZE = 65536
+# Abaixo disso o custo de subir os processos supera o ganho do paralelismo.
+MIN_TEXTS_FOR_POOL = 20000
+
+# Pacote NLTK -> recurso que nltk.data.find precisa localizar (punkt_tab é o
+# formato do word_tokenize a partir do NLTK 3.9; o pacote 'punkt' antigo não serve).
+NLTK_RESOURCES = {
+    'punkt_tab': 'tokenizers/punkt_tab/portuguese/',
+    'stopwords': 'corpora/stopwords/portuguese',
+    'rslp': 'stemmers/rslp/step0.pt',
+}
+# Diretório pré-provisionado e modo offline (sem nltk.download); ver configure_nltk().
+_nltk_settings = {'data_dir': None, 'offline': False, 'ready': False}
+
+
+def configure_nltk(data_dir=None, offline=True):
+    # Com data_dir, o NLTK procura os recursos só nesse diretório; offline nunca tenta a rede.
+    # Sem data_dir valem os caminhos padrão do NLTK (incluindo a variável NLTK_DATA).
+    _nltk_settings.update(data_dir=data_dir or _nltk_settings['data_dir'], offline=offline, ready=False)
+
+
+def missing_nltk_resources():
+    # Só verifica a presença dos arquivos (nltk.data.find), sem carregar tokenizer/stopwords/stemmer.
+    import nltk
+    data_dir = _nltk_settings['data_dir']
+    if data_dir and _nltk_settings['offline']:
+        nltk.data.path[:] = [data_dir]
+    elif data_dir and data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+    missing = []
+    for package, resource in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(package)
+    return missing
+
+
+def download_nltk_resources():
+    # Resolve os recursos uma vez por processo; fora do modo offline baixa o que faltar.
+    if _nltk_settings['ready']:
+        return True
+    missing = missing_nltk_resources()
+    if missing and not _nltk_settings['offline']:
+        import nltk
+        for package in missing:
+            print(f"Baixando recurso NLTK: {package}")
+            nltk.download(package, download_dir=_nltk_settings['data_dir'], quiet=True)
+        missing = missing_nltk_resources()
+    if missing:
+        target = _nltk_settings['data_dir'] or '<diretório>'
+        print(f"Recursos NLTK ausentes: {', '.join(missing)}. "
+              f"Provisione-os com: python -m nltk.downloader -d {target} {' '.join(missing)}")
+        return False
+    _nltk_settings['ready'] = True
+    return True
+
+
+class TextPreprocessor:
+    def __init__(self, stop_words, stemmer, stem_cache_size=STEM_CACHE_SIZE, stem_table=None):
+        self.stop_words = frozenset(stop_words)
+        self.stemmer = stemmer
+        self.stem_cache_size = stem_cache_size
+        self._cached_stem = functools.lru_cache(maxsize=stem_cache_size)(stemmer.stem)
+        self.use_stem_table(stem_table)
+        from nltk.tokenize import word_tokenize
+        self.tokenize = functools.partial(word_tokenize, language='portuguese')
+        self.last_stats = None
+
+    def use_stem_table(self, stem_table):
+        # Tabela token -> stem exportada com o modelo (stem_table.py): consultada antes do stemmer.
+        self.stem_table = stem_table
+        self.stem = self._table_stem if stem_table else self._cached_stem
+
+    def stemmer_name(self):
+        return f"{type(self.stemmer).__module__}.{type(self.stemmer).__qualname__}"
+
+    def config(self):
+        # Tudo o que altera a saída do pré-processamento (usado como chave de cache).
+        return {
+            'stop_words': sorted(self.stop_words),
+            'stemmer': self.stemmer_name(),
+            'punctuation': string.punctuation,
+        }
+
+    def _table_stem(self, word):
+        stem = self.stem_table.get(word)
+        return stem if stem is not None else self._cached_stem(word)
+
+    def tokens(self, text):
+        # Tokens de superfície (antes do stemming), na ordem do texto.
+        text = text.lower().translate(PUNCTUATION_TABLE)
+        stop_words = self.stop_words
+        return [word for word in self.tokenize(text) if word not in stop_words and word.strip()]
+
+    def __call__(self, text):
+        stem = self.stem
+        return ' '.join([stem(word) for word in self.tokens(text)])
+
+    def preprocess_batch(self, texts, workers=None, chunksize=1000):
+        # workers=None/1: no processo atual. workers>1: divide o corpus entre processos,
+        # preservando a ordem de entrada.
+        start = time.perf_counter()
+        texts = texts if isinstance(texts, list) else list(texts)
+        if workers and workers > 1 and len(texts) >= MIN_TEXTS_FOR_POOL:
+            with multiprocessing.Pool(workers, initializer=_init_worker,
+                                      initargs=(sorted(self.stop_words), self.stemmer, self.stem_cache_size,
+                                                self.stem_table)) as pool:
+                processed = pool.map(_preprocess_in_worker, texts, chunksize=chunksize)
+            mode = f'pool[{workers}]'
+        else:
+            processed = [self(text) for text in texts]
+            mode = 'serial'
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            'mode': mode,
+            'texts': len(texts),
+            'seconds': elapsed,
+            'texts_per_second': len(texts) / elapsed if elapsed > 0 else float('inf'),
+            # No modo multiprocessado cada processo tem o próprio cache; só o serial é reportado.
+            # Com tabela de stems, o cache só vê os tokens que não estão nela.
+            'stem_cache': self._cached_stem.cache_info()._asdict() if mode == 'serial' else None,
+        }
+        return processed
+
+    def format_stats(self):
+        stats = self.last_stats
+        if not stats:
+            return "Pré-processamento: sem estatísticas."
+        message = (f"Pré-processamento ({stats['mode']}): {stats['texts']} textos em {stats['seconds']:.3f}s "
+                   f"({stats['texts_per_second']:.0f} textos/s)")
+        cache = stats['stem_cache']
+        if cache:
+            message += f"; cache de stems: {cache['hits']} acertos, {cache['misses']} faltas"
+        return message
+
+
+def load_default_preprocessor(stem_cache_size=STEM_CACHE_SIZE, stem_table=None):
+    from nltk.corpus import stopwords
+    from nltk.stem import RSLPStemmer
+    return TextPreprocessor(stopwords.words('portuguese'), RSLPStemmer(), stem_cache_size, stem_table)
+
+
+_worker_preprocessor = None
+
+
+def _init_worker(stop_words, stemmer, stem_cache_size, stem_table=None):
+    global _worker_preprocessor
+    _worker_preprocessor = TextPreprocessor(stop_words, stemmer, stem_cache_size, stem_table)
+
+
+def _preprocess_in_worker(text):
+    return _worker_preprocessor(text)
+
+
+def _legacy_preprocess(text, stop_words_pt_set, stemmer_pt):
+    # Implementação original dos scripts (mantida só para o comparativo de throughput).
+    from nltk.tokenize import word_tokenize
+    text = text.lower()
+    text = ''.join([char for char in text if char not in string.punctuation])
+    tokens = word_tokenize(text, language='portuguese')
+    tokens = [stemmer_pt.stem(word) for word in tokens if word not in stop_words_pt_set and word.strip()]
+    return ' '.join(tokens)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mede o throughput do pré-processamento (legado vs. motor em lote).")
+    parser.add_argument('--dataset', default='models/dataset_planos_saude.json')
+    parser.add_argument('--repeat', type=int, default=1000, help="Replica o corpus N vezes para simular um dataset maior")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    if not download_nltk_resources():
+        raise SystemExit("Recursos NLTK indisponíveis.")
+    with open(args.dataset, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    corpus = [example for item in data['dataset'] for example in item['exemplos_usuario']] * args.repeat
+
+    from nltk.corpus import stopwords
+    from nltk.stem import RSLPStemmer
+    stop_words_pt_set = set(stopwords.words('portuguese'))
+    stemmer_pt = RSLPStemmer()
+    start = time.perf_counter()
+    legacy = [_legacy_preprocess(text, stop_words_pt_set, stemmer_pt) for text in corpus]
+    legacy_elapsed = time.perf_counter() - start
+    print(f"Legado (apply por texto): {len(corpus)} textos em {legacy_elapsed:.3f}s ({len(corpus) / legacy_elapsed:.0f} textos/s)")
+
+    preprocessor = load_default_preprocessor()
+    serial = preprocessor.preprocess_batch(corpus)
+    print(preprocessor.format_stats())
+    assert serial == legacy, "Saída do motor em lote diverge da implementação original."
+    if args.workers > 1:
+        parallel_preprocessor = load_default_preprocessor()
+        parallel = parallel_preprocessor.preprocess_batch(corpus, workers=args.workers)
+        print(parallel_preprocessor.format_stats())
+        assert parallel == legacy, "Saída do modo multiprocessado diverge da implementação original."
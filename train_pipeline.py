@@ -0,0 +1,555 @@
+import argparse
+import itertools
+import json
+import os
+import shutil
+import time
+from array import array
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.model_selection import train_test_split
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.svm import LinearSVC
+from sklearn.pipeline import Pipeline
+from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import normalize
+from binary_artifacts import BINARY_DIRNAME, QUANTIZATION_MODES, artifact_bytes, check_round_trip, export_binary, quantization_report
+from corpus_cache import CACHE_DIR, CorpusCache, file_sha256
+from dataset_loader import DatasetReader, SpooledTexts
+from entity_matcher import AUTOMATON_FILENAME, export_automaton
+from feature_hashing import build_hashing_vectorizer, hashing_model_payload, is_hashing_vectorizer
+from fused_scoring import FUSED_FILENAME, export_fused_table
+from intent_runtime import IntentRuntime
+from pipeline_trace import Tracer
+from response_cache import DEFAULT_MAX_ENTRIES, RESPONSE_CACHE_FILENAME, export_response_cache
+from response_cache import format_report as format_response_cache_report
+from stem_table import STEM_TABLE_FILENAME, export_stem_table, format_report
+from text_preprocessing import download_nltk_resources, load_default_preprocessor
+from vocab_pruning import L1_C, PRUNING_METHODS, apply_pruning, document_frequency, pruning_config, prune_matrix, select_features
+
+# Pipeline único de treino: o corpus é pré-processado e vetorizado UMA vez,
+# a matriz esparsa TF-IDF é reaproveitada por todos os classificadores e os
+# artefatos joblib/JSON são gravados na mesma execução.
+
+DATASET_PATH = os.path.join('models', 'dataset_planos_saude.json')
+MODELS_DIR = 'models'
+JOBLIB_DIR = '.'
+NGRAM_RANGE = (1, 2)
+# Exemplos lidos/pré-processados por vez na passada em fluxo sobre o dataset.
+STREAM_CHUNK_SIZE = 50000
+# Textos usados para conferir a tabela fundida contra o sklearn (a referência é densa: n x classes).
+FUSED_CHECK_SAMPLE = 5000
+
+
+def build_entity_dictionaries(entities_data):
+    entity_dictionaries = {}
+    for item in entities_data:
+        for entity_info in item['entities']:
+            entity_type = entity_info['tipo_entidade']
+            entity_value = entity_info['valor_entidade'].lower() # Normalizar
+            if entity_type not in entity_dictionaries:
+                entity_dictionaries[entity_type] = set()
+            entity_dictionaries[entity_type].add(entity_value)
+
+    for entity_type in entity_dictionaries: # Converter sets para listas para JSON
+        entity_dictionaries[entity_type] = sorted(list(entity_dictionaries[entity_type])) # Ordenar para consistência
+    return entity_dictionaries
+
+
+def split_indices(y_labels, test_size_ratio=0.2, random_state=42):
+    # Divide os ÍNDICES das linhas (e não os textos), para que a matriz TF-IDF
+    # já calculada possa ser fatiada sem refazer a vetorização.
+    # Tratamento para estratificação: garantir que cada classe no conjunto de teste/treino tenha pelo menos 1 membro.
+    y_labels = np.asarray(y_labels)
+    classes, counts = np.unique(y_labels, return_counts=True)
+    valid_idx = np.flatnonzero(np.isin(y_labels, classes[counts >= 2]))
+
+    if len(valid_idx) < len(y_labels):
+        print(f"Filtradas {len(y_labels) - len(valid_idx)} amostras de classes com < 2 exemplos.")
+
+    y_valid = y_labels[valid_idx]
+    y_labels_unique_count = len(np.unique(y_valid))
+    if len(valid_idx) < 2 or y_labels_unique_count < 1:
+        return None, None
+
+    required_test_size_for_stratify = y_labels_unique_count / len(valid_idx)
+
+    if test_size_ratio < required_test_size_for_stratify and required_test_size_for_stratify < 1.0:
+        print(f"Ajustando test_size de {test_size_ratio:.2f} para {required_test_size_for_stratify:.2f} para tentar acomodar {y_labels_unique_count} classes com estratificação.")
+        if required_test_size_for_stratify > 0.4: # Limite arbitrário
+            print("O test_size necessário para estratificação é muito alto. Tentando sem estratificação.")
+            stratify_option = None
+        else:
+            test_size_ratio = required_test_size_for_stratify + 0.01 # Adicionar uma pequena margem
+            stratify_option = y_valid
+    elif len(valid_idx) * test_size_ratio < y_labels_unique_count:
+        print("Mesmo com ajuste, test_size * n_samples < n_classes. Tentando sem estratificação.")
+        stratify_option = None
+    else:
+        stratify_option = y_valid
+
+    # Garantir que test_size não seja 1.0 (o que significaria nenhum dado de treino)
+    if test_size_ratio >= 0.99:
+        test_size_ratio = 0.5
+        stratify_option = None
+        print("Test size ratio muito alto, resetando para 0.5 e sem estratificação.")
+
+    try:
+        train_idx, test_idx = train_test_split(valid_idx, test_size=test_size_ratio, random_state=random_state, stratify=stratify_option)
+    except ValueError as e:
+        print(f"Erro na divisão treino/teste mesmo após ajustes: {e}. Tentando sem estratificação.")
+        try:
+            train_idx, test_idx = train_test_split(valid_idx, test_size=test_size_ratio, random_state=random_state, stratify=None)
+        except ValueError as e2:
+            print(f"Erro final na divisão treino/teste: {e2}. Treinando com todos os dados e avaliando no treino.")
+            train_idx, test_idx = valid_idx, valid_idx
+    return train_idx, test_idx
+
+
+def build_classifiers(hashing=False):
+    classifiers = {
+        'nb': MultinomialNB(alpha=0.1),
+        'svm': LinearSVC(C=1.0, random_state=42, max_iter=3000, dual=True),
+    }
+    if hashing:
+        # Hashing com sinal gera valores negativos, que o MultinomialNB não aceita.
+        del classifiers['nb']
+    return classifiers
+
+
+def build_vectorizer(hash_features=None):
+    if hash_features:
+        return build_hashing_vectorizer(hash_features, NGRAM_RANGE)
+    return TfidfVectorizer(ngram_range=NGRAM_RANGE)
+
+
+def train_split_matrix(fitted_tfidf, X, train_idx):
+    # Mesma matriz que ajustar um vetorizador novo só com as linhas de treino e transformar todas
+    # as linhas, sem refazer a vetorização: X / idf_ devolve o TF de cada linha (a menos da norma),
+    # que é repesado com o IDF das linhas de treino e normalizado de novo. Termos que não aparecem
+    # no treino ficariam fora do vocabulário desse fit e saem da matriz (no hashing os baldes são fixos).
+    params = fitted_tfidf.named_steps['idf'] if is_hashing_vectorizer(fitted_tfidf) else fitted_tfidf
+    df = document_frequency(X[train_idx])
+    keep = np.arange(X.shape[1]) if is_hashing_vectorizer(fitted_tfidf) else np.flatnonzero(df)
+    smooth = int(params.smooth_idf)
+    train_idf = np.log((len(train_idx) + smooth) / (df[keep] + smooth)) + 1
+    X_train_idf = X[:, keep] @ sp.diags(train_idf / params.idf_[keep])
+    return normalize(X_train_idf, norm=params.norm, copy=False) if params.norm else X_train_idf.tocsr()
+
+
+def tfidf_model_payload(fitted_tfidf):
+    if is_hashing_vectorizer(fitted_tfidf):
+        return hashing_model_payload(fitted_tfidf) # Sem vocabulary_: especificação do hash + idf_
+    return {
+        'vocabulary_': {term: int(idx) for term, idx in fitted_tfidf.vocabulary_.items()}, # dict: term -> index
+        'idf_': fitted_tfidf.idf_.tolist(),       # numpy array -> list
+        'ngram_range': fitted_tfidf.ngram_range, # tupla (min_n, max_n)
+        # Outros parâmetros importantes do TfidfVectorizer para replicar o comportamento:
+        'lowercase': fitted_tfidf.lowercase,
+        'token_pattern': fitted_tfidf.token_pattern,
+        'stop_words': None, # Já aplicamos stopwords antes, então o TF-IDF não precisa.
+        'use_idf': fitted_tfidf.use_idf,
+        'smooth_idf': fitted_tfidf.smooth_idf,
+        'sublinear_tf': fitted_tfidf.sublinear_tf,
+        'norm': fitted_tfidf.norm # geralmente 'l2'
+    }
+
+
+def classifier_payload(fitted_clf):
+    # Parâmetros necessários para predição (formato de svm_model.json; NB exporta as log-probabilidades).
+    if hasattr(fitted_clf, 'feature_log_prob_'):
+        return {
+            'classes_': fitted_clf.classes_.tolist(),
+            'class_log_prior_': fitted_clf.class_log_prior_.tolist(),
+            'feature_log_prob_': fitted_clf.feature_log_prob_.tolist(),
+        }
+    return {
+        'classes_': fitted_clf.classes_.tolist(),
+        'coef_': fitted_clf.coef_.tolist(),
+        'intercept_': fitted_clf.intercept_.tolist()
+    }
+
+
+def json_artifact_bytes(payload):
+    # Tamanho que o payload ocupa em disco no formato do exportador (indent=2).
+    return len(json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def export_json_artifacts(fitted_tfidf, fitted_svm, entity_dictionaries, stop_words_pt_list, models_dir):
+    os.makedirs(models_dir, exist_ok=True)
+    paths = {}
+
+    # --- Exportar Parâmetros do TF-IDF para JSON ---
+    tfidf_model_data = tfidf_model_payload(fitted_tfidf)
+    paths['tfidf'] = os.path.join(models_dir, 'tfidf_model.json')
+    with open(paths['tfidf'], 'w', encoding='utf-8') as f:
+        json.dump(tfidf_model_data, f, ensure_ascii=False, indent=2)
+    print(f"Parâmetros do TF-IDF exportados para: {paths['tfidf']} ({os.path.getsize(paths['tfidf'])/1024:.2f} KB)")
+
+    # --- Exportar Parâmetros do SVM para JSON ---
+    svm_model_data = classifier_payload(fitted_svm)
+    paths['svm'] = os.path.join(models_dir, 'svm_model.json')
+    with open(paths['svm'], 'w', encoding='utf-8') as f:
+        json.dump(svm_model_data, f, ensure_ascii=False, indent=2)
+    print(f"Parâmetros do SVM exportados para: {paths['svm']} ({os.path.getsize(paths['svm'])/1024:.2f} KB)")
+
+    paths['entities'] = os.path.join(models_dir, 'entity_dictionaries.json')
+    with open(paths['entities'], 'w', encoding='utf-8') as f:
+        json.dump(entity_dictionaries, f, ensure_ascii=False, indent=2)
+    print(f"Dicionário de entidades consolidado em: {paths['entities']} ({os.path.getsize(paths['entities'])/1024:.2f} KB)")
+
+    paths['stopwords'] = os.path.join(models_dir, 'portuguese_stopwords.json')
+    with open(paths['stopwords'], 'w', encoding='utf-8') as f:
+        json.dump(sorted(stop_words_pt_list), f, ensure_ascii=False, indent=2)
+    print(f"Lista de stopwords exportada para: {paths['stopwords']}")
+    return paths
+
+
+def open_corpus_cache(cache_dir, preprocessor):
+    return CorpusCache(cache_dir, {**preprocessor.config(), 'ngram_range': list(NGRAM_RANGE)})
+
+
+def _artifact_paths(models_dir, joblib_dir, hash_features=None):
+    json_paths = {name: os.path.join(models_dir, filename) for name, filename in [
+        ('tfidf', 'tfidf_model.json'),
+        ('svm', 'svm_model.json'),
+        ('entities', 'entity_dictionaries.json'),
+        ('stopwords', 'portuguese_stopwords.json'),
+        ('fused', FUSED_FILENAME),
+        ('automaton', AUTOMATON_FILENAME),
+        ('stem_table', STEM_TABLE_FILENAME),
+        ('response_cache', RESPONSE_CACHE_FILENAME),
+    ]}
+    joblib_paths = {name: os.path.join(joblib_dir, f'intent_classifier_{name}.joblib') for name in build_classifiers(bool(hash_features))}
+    return json_paths, joblib_paths
+
+
+def _training_params(json_paths, joblib_paths, binary_export=None, prune=None, hash_features=None, stem_logs=None,
+                     response_logs=None, response_cache_size=DEFAULT_MAX_ENTRIES):
+    return {
+        # Caminhos completos: outro --models-dir/--joblib-dir não pode reaproveitar artefatos gravados em outro lugar.
+        'exports': sorted(os.path.normpath(path) for path in list(json_paths.values()) + list(joblib_paths.values())),
+        'binary_export': binary_export,
+        # Acurácias gravadas antes de o IDF da avaliação passar a vir só do treino não valem mais.
+        'evaluation_idf': 'train_split',
+        'prune': prune,
+        'hash_features': hash_features,
+        # Conteúdo (não só o caminho) dos logs da tabela de stems: logs novos regeram a tabela.
+        'stem_logs': [file_sha256(path) for path in stem_logs or []],
+        'response_logs': [file_sha256(path) for path in response_logs or []],
+        'response_cache_size': response_cache_size,
+        'vectorizer': sorted(TfidfVectorizer(ngram_range=NGRAM_RANGE).get_params().items()),
+        'classifiers': {name: sorted(clf.get_params().items()) for name, clf in build_classifiers(bool(hash_features)).items()},
+    }
+
+
+def preprocess_dataset(reader, preprocess_batch, cache=None, chunk_size=STREAM_CHUNK_SIZE):
+    # Uma passada em fluxo sobre o dataset: pré-processa em blocos e grava o texto processado
+    # em disco. Em memória ficam só um bloco de textos, os rótulos (códigos inteiros) e a
+    # impressão digital da execução.
+    processed = SpooledTexts()
+    codes = array('i')
+    classes = {}
+    fingerprint = cache.run_fingerprint() if cache is not None else None
+    preprocess = (lambda texts: cache.preprocess(texts, preprocess_batch)) if cache is not None else preprocess_batch
+    texts = []
+    for text, intent in reader:
+        texts.append(text)
+        codes.append(classes.setdefault(intent, len(classes)))
+        if fingerprint is not None:
+            fingerprint.add(text, intent)
+        if len(texts) >= chunk_size:
+            processed.write(preprocess(texts))
+            texts = []
+    if texts:
+        processed.write(preprocess(texts))
+    processed.close()
+    # Um único objeto str por intenção: o array de rótulos custa um ponteiro por exemplo.
+    labels = np.asarray(list(classes), dtype=object)[np.frombuffer(codes, dtype=np.intc)]
+    return processed, labels, fingerprint
+
+
+def _results_from_cache(manifest, processed, y, json_paths, joblib_paths, entity_dictionaries):
+    # Nada mudou desde a última execução: reaproveita vetorizador e modelos já ajustados.
+    pipelines = {name: joblib.load(path) for name, path in joblib_paths.items()}
+    vectorizer = pipelines['svm'].named_steps['tfidf']
+    train_idx = manifest.get('train_idx')
+    return {
+        'processed': processed,
+        'y': y,
+        'vectorizer': vectorizer,
+        'X': vectorizer.transform(processed),
+        'accuracy': manifest.get('accuracy', {}),
+        'train_idx': np.asarray(train_idx) if train_idx is not None else None,
+        'models': {name: pipeline.named_steps['clf'] for name, pipeline in pipelines.items()},
+        'joblib_paths': joblib_paths,
+        'json_paths': json_paths,
+        'entity_dictionaries': entity_dictionaries,
+        'cached': True,
+    }
+
+
+def run(dataset_path=DATASET_PATH, models_dir=MODELS_DIR, joblib_dir=JOBLIB_DIR, evaluate=True,
+        cache_dir=CACHE_DIR, use_cache=True, force=False, workers=None, binary_export=None, prune=None, hash_features=None,
+        trace_path=None, profile_dir=None, stem_logs=None, response_logs=None, response_cache_size=DEFAULT_MAX_ENTRIES):
+    if hash_features and (prune or binary_export):
+        raise ValueError("O modo de hashing de features não tem vocabulário: não combina com --prune nem --binary-export.")
+    # Instrumentação por etapa (pipeline_trace.py): só ativa com --trace e/ou --profile-dir.
+    tracer = Tracer(enabled=bool(trace_path), profile_dir=profile_dir)
+    try:
+        return _run(tracer, dataset_path, models_dir, joblib_dir, evaluate, cache_dir, use_cache, force, workers,
+                    binary_export, prune, hash_features, stem_logs, response_logs, response_cache_size)
+    finally:
+        tracer.close()
+        if tracer.stages:
+            print("\n" + tracer.summary())
+        if trace_path:
+            print(f"Trace por etapa gravado em: {tracer.write(trace_path)}")
+        if profile_dir:
+            print(f"Perfis cProfile por etapa em: {profile_dir}")
+
+
+def _run(tracer, dataset_path, models_dir, joblib_dir, evaluate, cache_dir, use_cache, force, workers, binary_export,
+         prune, hash_features, stem_logs, response_logs, response_cache_size):
+    with tracer.stage('nltk_resources'):
+        if not download_nltk_resources():
+            raise RuntimeError("Alguns recursos NLTK não puderam ser baixados/carregados.")
+
+    # Leitura em fluxo + pré-processamento (uma única vez para todo o corpus; exemplos já vistos
+    # vêm do cache). O texto processado vai para um arquivo temporário, relido pela vetorização.
+    with tracer.stage('load_preprocess') as stage:
+        reader = DatasetReader(dataset_path)
+        preprocessor = load_default_preprocessor()
+        preprocess_batch = lambda batch: preprocessor.preprocess_batch(batch, workers=workers)
+        cache = open_corpus_cache(cache_dir, preprocessor) if use_cache else None
+        start = time.perf_counter()
+        processed, y, fingerprint = preprocess_dataset(reader, preprocess_batch, cache)
+        elapsed = time.perf_counter() - start
+        entities_data = reader.entities_data
+        stage['items'] = len(processed)
+        if cache is not None:
+            stage['args'].update(cache_hits=cache.hits, cache_misses=cache.misses)
+            print(f"Cache de pré-processamento: {cache.hits} acertos, {cache.misses} exemplos processados.")
+    print(f"Leitura e pré-processamento em fluxo ({reader.format}): {len(processed)} exemplos em {elapsed:.3f}s "
+          f"({len(processed) / elapsed if elapsed > 0 else 0:.0f} exemplos/s)")
+
+    json_paths, joblib_paths = _artifact_paths(models_dir, joblib_dir, hash_features)
+    entity_dictionaries = build_entity_dictionaries(entities_data)
+    run_key = None
+    if cache is not None:
+        with tracer.stage('cache_check'):
+            run_key = fingerprint.hexdigest(entities_data, _training_params(json_paths, joblib_paths, binary_export, prune, hash_features,
+                                                                          stem_logs, response_logs, response_cache_size))
+            manifest = None if force else cache.load_run(run_key, require_accuracy=evaluate)
+        if manifest is not None:
+            print("Dataset e configuração inalterados: reaproveitando vetorizador e modelos do cache (sem refit).")
+            cache.close()
+            with tracer.stage('load_cached_models'):
+                return _results_from_cache(manifest, processed, y, json_paths, joblib_paths, entity_dictionaries)
+
+    # Vetorização (uma única vez): a matriz esparsa X é compartilhada por
+    # avaliação, treino final e exportação.
+    with tracer.stage('vectorize', items=len(processed)) as stage:
+        tfidf_vectorizer = build_vectorizer(hash_features)
+        X = tfidf_vectorizer.fit_transform(processed)
+        stage['args'].update(n_features=X.shape[1], nnz=X.nnz)
+
+    results = {
+        'processed': processed,
+        'y': y,
+        'vectorizer': tfidf_vectorizer,
+        'X': X,
+        'accuracy': {},
+        'train_idx': None,
+        'cached': False,
+    }
+
+    # --- Avaliação em divisão treino/teste sobre as linhas de X ---
+    # O IDF da avaliação vem só das linhas de treino (como um Pipeline ajustado no treino):
+    # as frequências de documento do teste não entram na acurácia reportada.
+    # SVM ajustado só no treino e a matriz da avaliação: o relatório de quantização mede a acurácia no teste.
+    eval_svm, X_eval, test_idx = None, None, None
+    if evaluate:
+        with tracer.stage('split'):
+            train_idx, test_idx = split_indices(y)
+        if train_idx is None:
+            print("Não há dados/classes suficientes para avaliar após a filtragem.")
+        else:
+            results['train_idx'] = train_idx
+            with tracer.stage('evaluate', items=len(train_idx) + len(test_idx)):
+                with tracer.stage('evaluate:train_idf'):
+                    X_eval = train_split_matrix(tfidf_vectorizer, X, train_idx)
+                if prune:
+                    # A seleção usa os rótulos: na avaliação ela só enxerga as linhas de treino.
+                    with tracer.stage('evaluate:prune'):
+                        keep = select_features(X_eval[train_idx], y[train_idx], prune['method'], prune['k'], prune['min_df'], prune['l1_c'])
+                        X_eval = prune_matrix(X_eval, keep, tfidf_vectorizer.norm)
+                for name, clf in build_classifiers(bool(hash_features)).items():
+                    with tracer.stage(f'evaluate:fit:{name}', items=len(train_idx)):
+                        clf.fit(X_eval[train_idx], y[train_idx])
+                    with tracer.stage(f'evaluate:predict:{name}', items=len(test_idx)):
+                        results['accuracy'][name] = accuracy_score(y[test_idx], clf.predict(X_eval[test_idx]))
+                    if name == 'svm':
+                        eval_svm = clf
+
+    # --- Poda de vocabulário (opcional): remapeia vocabulary_/idf_ antes do treino final e da exportação ---
+    if prune:
+        with tracer.stage('prune', items=X.shape[1]):
+            tfidf_vectorizer, X = apply_pruning(tfidf_vectorizer, X, y, prune)
+            results['vectorizer'] = tfidf_vectorizer
+            results['X'] = X
+
+    # --- Treino final com todos os dados, sobre a mesma matriz X ---
+    print("Treinando modelos finais com todos os dados...")
+    os.makedirs(joblib_dir, exist_ok=True)
+    final_models = {}
+    with tracer.stage('fit_final', items=X.shape[0]):
+        for name, clf in build_classifiers(bool(hash_features)).items():
+            with tracer.stage(f'fit:{name}', items=X.shape[0]):
+                clf.fit(X, y)
+            final_models[name] = clf
+            # Pipeline montado com os passos já ajustados: predict() continua funcionando a partir do texto pré-processado
+            with tracer.stage(f'joblib_dump:{name}'):
+                pipeline = Pipeline([('tfidf', tfidf_vectorizer), ('clf', clf)])
+                joblib.dump(pipeline, joblib_paths[name])
+    results['models'] = final_models
+    results['joblib_paths'] = joblib_paths
+    print("Modelos treinados.")
+
+    results['entity_dictionaries'] = entity_dictionaries
+    with tracer.stage('export_json'):
+        results['json_paths'] = export_json_artifacts(
+            tfidf_vectorizer, final_models['svm'], entity_dictionaries, preprocessor.stop_words, models_dir)
+
+    # Tabela termo -> scores fundidos (IDF dobrado em coef_), conferida contra decision_function.
+    # No modo de hashing não há termos para indexar a tabela; uma tabela antiga seria inconsistente.
+    if hash_features:
+        if os.path.exists(json_paths['fused']):
+            os.remove(json_paths['fused'])
+        print(f"Hashing de features ({hash_features} baldes): tabela de scores fundidos não é gerada.")
+    else:
+        with tracer.stage('export_fused', items=len(tfidf_vectorizer.vocabulary_)):
+            fused = export_fused_table(tfidf_vectorizer, final_models['svm'], json_paths['fused'],
+                                       list(itertools.islice(processed, FUSED_CHECK_SAMPLE)))
+        results['json_paths']['fused'] = json_paths['fused']
+        print(f"Tabela de scores fundidos exportada para: {json_paths['fused']} "
+              f"({os.path.getsize(json_paths['fused'])/1024:.2f} KB; erro máximo vs. sklearn: {fused['max_error_vs_sklearn']:.2e})")
+
+    # Autômato Aho-Corasick pré-compilado sobre os valores de entidade.
+    with tracer.stage('export_automaton', items=sum(len(values) for values in entity_dictionaries.values())):
+        automaton = export_automaton(entity_dictionaries, json_paths['automaton'])
+    results['json_paths']['automaton'] = json_paths['automaton']
+    print(f"Autômato de entidades ({len(automaton['patterns'])} valores, {len(automaton['goto'])} estados) exportado para: "
+          f"{json_paths['automaton']} ({os.path.getsize(json_paths['automaton'])/1024:.2f} KB)")
+
+    # Tabela token -> stem para os runtimes: todo token do treino (relido do dataset) e dos logs informados.
+    with tracer.stage('export_stem_table') as stage:
+        stem_report = export_stem_table(preprocessor, (text for text, _ in reader), stem_logs, json_paths['stem_table'])
+        stage['items'] = stem_report['entries']
+    results['json_paths']['stem_table'] = json_paths['stem_table']
+    results['stem_table_report'] = stem_report
+    print(format_report(stem_report))
+
+    # Cache de respostas (utterance -> intenção, scores, entidades) calculado pelo runtime de inferência
+    # sobre os artefatos já gravados; a versão é o hash deles, então só vale para este treino.
+    with tracer.stage('export_response_cache') as stage:
+        runtime = IntentRuntime(models_dir, preprocessor=preprocessor)
+        response_report = export_response_cache(runtime, (text for text, _ in reader), response_logs,
+                                                json_paths['response_cache'], max_entries=response_cache_size)
+        stage['items'] = response_report['entries']
+    results['json_paths']['response_cache'] = json_paths['response_cache']
+    results['response_cache_report'] = response_report
+    print(format_response_cache_report(response_report))
+
+    artifacts = list(joblib_paths.values()) + list(results['json_paths'].values())
+    binary_dir = os.path.join(models_dir, BINARY_DIRNAME)
+    if binary_export:
+        with tracer.stage('export_binary'):
+            binary_paths = export_binary(tfidf_vectorizer, final_models['svm'], binary_dir, binary_export)
+            coef_error = check_round_trip(tfidf_vectorizer, final_models['svm'], binary_dir, binary_export)
+            report = quantization_report(eval_svm, binary_export, X_eval[test_idx], y[test_idx]) if eval_svm is not None else None
+        json_bytes = artifact_bytes([results['json_paths']['tfidf'], results['json_paths']['svm']])
+        print(f"Artefatos binários ({binary_export}) exportados para: {binary_dir} "
+              f"({artifact_bytes(binary_paths)/1024:.2f} KB vs. {json_bytes/1024:.2f} KB em JSON; "
+              f"releitura conferida, erro máximo dos coeficientes: {coef_error:.2e})")
+        if report is not None:
+            print(f"  Acurácia (teste, SVM da avaliação): {report['accuracy_full']:.4f} -> {report['accuracy_quantized']:.4f} "
+                  f"(delta {report['accuracy_delta']:+.4f}); concordância das predições: {report['prediction_agreement']:.4f}; "
+                  f"erro máximo de score: {report['max_score_error']:.2e}")
+        else:
+            print("  Sem avaliação treino/teste: variação de acurácia da quantização não medida.")
+        results['binary_paths'] = binary_paths
+        results['quantization_report'] = report
+        artifacts += binary_paths
+    elif os.path.exists(os.path.join(binary_dir, 'manifest.json')):
+        # Artefatos binários de um treino anterior não correspondem mais aos JSONs (o runtime com --binary os leria).
+        shutil.rmtree(binary_dir)
+        print(f"Artefatos binários antigos removidos: {binary_dir}")
+
+    if cache is not None:
+        with tracer.stage('save_manifest', items=len(artifacts)):
+            cache.save_run(run_key, artifacts, results['accuracy'], results['train_idx'])
+        cache.close()
+    return results
+
+
+def parse_args(argv=None, eval_option=True):
+    # eval_option=False: o script chamador fixa a avaliação e não expõe --no-eval.
+    parser = argparse.ArgumentParser(description="Treina NB/SVM e exporta os artefatos joblib/JSON em uma única execução.")
+    parser.add_argument('--dataset', default=DATASET_PATH, help="Caminho do dataset_planos_saude.json")
+    parser.add_argument('--models-dir', default=MODELS_DIR, help="Diretório de saída dos artefatos JSON")
+    parser.add_argument('--joblib-dir', default=JOBLIB_DIR, help="Diretório de saída dos pipelines joblib")
+    if eval_option:
+        parser.add_argument('--no-eval', action='store_true', help="Pula a avaliação treino/teste")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Diretório do cache de pré-processamento/artefatos")
+    parser.add_argument('--no-cache', action='store_true', help="Desativa o cache (pré-processa e treina do zero)")
+    parser.add_argument('--force', action='store_true', help="Refaz o fit mesmo que dataset e configuração não tenham mudado")
+    parser.add_argument('--workers', type=int, default=None, help="Processos para o pré-processamento de corpora grandes")
+    parser.add_argument('--binary-export', choices=QUANTIZATION_MODES, default=None,
+                        help="Também exporta o formato binário (CSR + mmap) com a quantização escolhida")
+    parser.add_argument('--prune', choices=PRUNING_METHODS, default=None,
+                        help="Poda o vocabulário antes da exportação (ver vocab_pruning.py)")
+    parser.add_argument('--prune-size', type=int, default=None, help="Nº máximo de termos mantidos (top-k)")
+    parser.add_argument('--prune-min-df', type=int, default=1, help="Frequência mínima de documento de um termo")
+    parser.add_argument('--prune-l1-c', type=float, default=L1_C, help="C do LinearSVC L1 (método l1; menor = mais esparso)")
+    parser.add_argument('--hash-features', type=int, default=None,
+                        help="Usa hashing de features com N baldes em vez de vocabulário (teto fixo de memória)")
+    parser.add_argument('--stem-logs', nargs='+', default=None, metavar='JSONL',
+                        help="Logs de produção (JSONL com campo 'text') cujos tokens também entram na tabela de stems exportada")
+    parser.add_argument('--response-logs', nargs='+', default=None, metavar='JSONL',
+                        help="Logs de produção (JSONL com campo 'text') cujas utterances mais frequentes entram no cache de respostas")
+    parser.add_argument('--response-cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Nº máximo de utterances no cache de respostas (LRU)")
+    parser.add_argument('--trace', default=None, metavar='ARQUIVO',
+                        help="Grava o trace por etapa (tempo, CPU, memória, itens) em JSON compatível com Chrome trace/speedscope")
+    parser.add_argument('--profile-dir', default=None, help="Grava um perfil cProfile (.prof) por etapa neste diretório")
+    args = parser.parse_args(argv)
+    args.prune = pruning_config(args.prune, args.prune_size, args.prune_min_df, args.prune_l1_c) if args.prune else None
+    return args
+
+
+def run_from_args(args, evaluate=None):
+    # Ponto único entre parse_args e run, usado também por process_data.py e export_model_artifacts.py.
+    if evaluate is None:
+        evaluate = not args.no_eval
+    return run(args.dataset, args.models_dir, args.joblib_dir, evaluate=evaluate,
+               cache_dir=args.cache_dir, use_cache=not args.no_cache, force=args.force, workers=args.workers,
+               binary_export=args.binary_export, prune=args.prune,
+               hash_features=args.hash_features, trace_path=args.trace, profile_dir=args.profile_dir,
+               stem_logs=args.stem_logs, response_logs=args.response_logs,
+               response_cache_size=args.response_cache_size)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_from_args(args)
+    for name, acc in results['accuracy'].items():
+        print(f"{name.upper()} Acurácia: {acc:.4f}")
+    print("\nPipeline de treino finalizado.")
+    return results
+
+
+if __name__ == '__main__':
+    main()
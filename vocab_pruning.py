@@ -0,0 +1,221 @@
+import argparse
+import json
+import time
+import numpy as np
+from sklearn.base import clone
+from sklearn.feature_selection import chi2
+from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import normalize
+from sklearn.svm import LinearSVC
+
+# Poda de vocabulário entre a vetorização e a exportação.
+#
+# Cada termo (unigrama ou bigrama) do TF-IDF vira uma coluna em todas as linhas
+# de coef_ exportadas; memória e tempo de parse na inicialização crescem
+# linearmente com o vocabulário. Métodos de seleção:
+#   df   - frequência de documento (min_df / max_features)
+#   chi2 - teste chi² termo x intenção, top-k
+#   coef - magnitude do coeficiente de um LinearSVC, top-k
+#   l1   - termos com coeficiente não nulo em um LinearSVC com penalidade L1
+# A poda gera um vetorizador com vocabulary_ e idf_ remapeados. Como cada linha
+# TF-IDF é normalizada, normalize(X[:, keep]) é exatamente o que o vetorizador
+# podado produz em transform(), sem refazer a vetorização.
+
+PRUNING_METHODS = ('df', 'chi2', 'coef', 'l1')
+L1_C = 1.0
+CURVE_FRACTIONS = [1.0, 0.5, 0.25, 0.1, 0.05, 0.02]
+CURVE_L1_CS = [0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0]
+CURVE_PATH = 'pruning_curve.json'
+
+
+def pruning_config(method, k=None, min_df=1, l1_c=L1_C):
+    if method not in PRUNING_METHODS:
+        raise ValueError(f"Método de poda desconhecido: {method} (use um de {', '.join(PRUNING_METHODS)})")
+    return {'method': method, 'k': k, 'min_df': min_df, 'l1_c': l1_c}
+
+
+def shipped_svm():
+    # Cópia não ajustada do SVM que o pipeline de treino exporta (mesmos hiperparâmetros).
+    from train_pipeline import build_classifiers
+    return clone(build_classifiers()['svm'])
+
+
+def document_frequency(X):
+    return np.bincount(X.tocsr().indices, minlength=X.shape[1])
+
+
+def _top_k(scores, candidates, k):
+    if k is None or k >= len(candidates):
+        return candidates
+    order = np.argsort(-scores, kind='stable')[:k]
+    return np.sort(candidates[order])
+
+
+def select_features(X, y, method, k=None, min_df=1, l1_c=L1_C):
+    # Índices (ordenados) das colunas de X que ficam no vocabulário.
+    candidates = np.flatnonzero(document_frequency(X) >= min_df)
+    X_candidates = X[:, candidates]
+    if method == 'df':
+        keep = _top_k(document_frequency(X_candidates), candidates, k)
+    elif method == 'chi2':
+        scores, _ = chi2(X_candidates, y)
+        keep = _top_k(np.nan_to_num(scores), candidates, k)
+    elif method == 'coef':
+        clf = shipped_svm().fit(X_candidates, y)
+        keep = _top_k(np.abs(clf.coef_).max(axis=0), candidates, k)
+    elif method == 'l1':
+        clf = LinearSVC(C=l1_c, penalty='l1', dual=False, random_state=42, max_iter=3000).fit(X_candidates, y)
+        magnitude = np.abs(clf.coef_).max(axis=0)
+        nonzero = magnitude > 0
+        keep = _top_k(magnitude[nonzero], candidates[nonzero], k)
+    else:
+        raise ValueError(f"Método de poda desconhecido: {method}")
+    if len(keep) == 0:
+        raise ValueError("Nenhum termo restou após a poda; reduza min_df ou aumente k/C.")
+    return keep
+
+
+def prune_matrix(X, keep, norm='l2'):
+    X_pruned = X[:, keep]
+    return normalize(X_pruned, norm=norm, copy=False) if norm else X_pruned
+
+
+def prune_vectorizer(fitted_tfidf, keep):
+    # Novo vetorizador (API pública) com os mesmos parâmetros, vocabulário fixo remapeado
+    # (novos índices na ordem de keep) e idf_ das colunas mantidas.
+    terms = np.empty(len(fitted_tfidf.vocabulary_), dtype=object)
+    for term, idx in fitted_tfidf.vocabulary_.items():
+        terms[idx] = term
+    pruned = clone(fitted_tfidf)
+    pruned.set_params(vocabulary={terms[old]: new for new, old in enumerate(keep)})
+    pruned.idf_ = fitted_tfidf.idf_[keep]
+    return pruned
+
+
+def apply_pruning(fitted_tfidf, X, y, config):
+    # Devolve (vetorizador podado, matriz podada); o vetorizador original não é alterado.
+    keep = select_features(X, y, config['method'], config.get('k'), config.get('min_df', 1), config.get('l1_c', L1_C))
+    print(f"Poda de vocabulário ({config['method']}): {X.shape[1]} -> {len(keep)} termos")
+    return prune_vectorizer(fitted_tfidf, keep), prune_matrix(X, keep, fitted_tfidf.norm)
+
+
+# --- Curva acurácia x tamanho do vocabulário x bytes do artefato ---
+
+def _artifact_cost(fitted_tfidf, keep, clf):
+    # Tamanho e tempo de parse dos JSONs que o exportador gravaria com este vocabulário.
+    from train_pipeline import classifier_payload, tfidf_model_payload
+    terms = sorted(fitted_tfidf.vocabulary_, key=fitted_tfidf.vocabulary_.get)
+    tfidf_payload = tfidf_model_payload(fitted_tfidf)
+    tfidf_payload['vocabulary_'] = {terms[old]: new for new, old in enumerate(keep)}
+    tfidf_payload['idf_'] = fitted_tfidf.idf_[keep].tolist()
+    documents = [json.dumps(payload, ensure_ascii=False, indent=2) for payload in (tfidf_payload, classifier_payload(clf))]
+    start = time.perf_counter()
+    for document in documents:
+        json.loads(document)
+    parse_ms = (time.perf_counter() - start) * 1000
+    return sum(len(document.encode('utf-8')) for document in documents), parse_ms
+
+
+def curve_point(fitted_tfidf, X, y, train_idx, test_idx, method, k=None, min_df=1, l1_c=L1_C):
+    # Seleção e treino só com as linhas de treino; acurácia na divisão de teste.
+    if method is None:
+        keep = np.arange(X.shape[1])
+    else:
+        keep = select_features(X[train_idx], y[train_idx], method, k, min_df, l1_c)
+    X_pruned = prune_matrix(X, keep, fitted_tfidf.norm)
+    clf = shipped_svm().fit(X_pruned[train_idx], y[train_idx])
+    size, parse_ms = _artifact_cost(fitted_tfidf, keep, clf)
+    return {
+        'method': method or 'nenhum',
+        'k': k,
+        'l1_c': l1_c if method == 'l1' else None,
+        'vocabulary_size': int(len(keep)),
+        'accuracy': float(accuracy_score(y[test_idx], clf.predict(X_pruned[test_idx]))),
+        'artifact_bytes': size,
+        'parse_ms': parse_ms,
+    }
+
+
+def pruning_curve(fitted_tfidf, X, y, train_idx, test_idx, methods=PRUNING_METHODS, sizes=None, l1_cs=CURVE_L1_CS, min_df=1):
+    n_features = X.shape[1]
+    if sizes is None:
+        sizes = sorted({max(1, int(n_features * fraction)) for fraction in CURVE_FRACTIONS}, reverse=True)
+    settings = [(method, None, c) for method in methods if method == 'l1' for c in l1_cs]
+    settings += [(method, k, L1_C) for method in methods if method != 'l1' for k in sizes]
+    settings.sort(key=lambda setting: methods.index(setting[0]))
+    points = [curve_point(fitted_tfidf, X, y, train_idx, test_idx, None)]
+    for method, k, c in settings:
+        try:
+            points.append(curve_point(fitted_tfidf, X, y, train_idx, test_idx, method, k, min_df, c))
+        except ValueError as e:
+            print(f"Ponto ignorado ({method}, k={k}, C={c}): {e}")
+    return points
+
+
+def suggest_operating_point(points, max_accuracy_drop=0.01):
+    # Menor artefato cuja acurácia fica a no máximo max_accuracy_drop da do vocabulário completo.
+    baseline = points[0]['accuracy']
+    eligible = [p for p in points if p['accuracy'] >= baseline - max_accuracy_drop]
+    return min(eligible, key=lambda p: (p['artifact_bytes'], -p['accuracy']))
+
+
+def print_curve(points, suggestion=None):
+    print(f"{'método':>7} {'parâmetro':>10} {'vocab':>7} {'acurácia':>9} {'artefato (KB)':>13} {'parse (ms)':>10}")
+    for p in points:
+        param = f"C={p['l1_c']}" if p['l1_c'] is not None else (f"k={p['k']}" if p['k'] is not None else '-')
+        flag = ' <-' if p is suggestion else ''
+        print(f"{p['method']:>7} {param:>10} {p['vocabulary_size']:>7} {p['accuracy']:>9.4f} "
+              f"{p['artifact_bytes'] / 1024:>13.1f} {p['parse_ms']:>10.2f}{flag}")
+
+
+def main(argv=None):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from corpus_cache import CACHE_DIR
+    from dataset_loader import load_dataset
+    from text_preprocessing import download_nltk_resources, load_default_preprocessor
+    from train_pipeline import DATASET_PATH, NGRAM_RANGE, open_corpus_cache, split_indices
+
+    parser = argparse.ArgumentParser(description="Curva acurácia x tamanho do vocabulário x bytes do artefato para cada método de poda.")
+    parser.add_argument('--dataset', default=DATASET_PATH)
+    parser.add_argument('--methods', nargs='+', choices=PRUNING_METHODS, default=list(PRUNING_METHODS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=None,
+                        help="Tamanhos de vocabulário (k) a testar; padrão: frações do vocabulário completo")
+    parser.add_argument('--l1-cs', nargs='+', type=float, default=CURVE_L1_CS, help="Valores de C do LinearSVC L1")
+    parser.add_argument('--min-df', type=int, default=1)
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.01,
+                        help="Perda de acurácia aceita na sugestão de ponto de operação")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--output', default=CURVE_PATH, help="Arquivo JSON com a curva")
+    args = parser.parse_args(argv)
+
+    if not download_nltk_resources():
+        raise RuntimeError("Alguns recursos NLTK não puderam ser baixados/carregados.")
+    texts, intents, _ = load_dataset(args.dataset)
+    preprocessor = load_default_preprocessor()
+    cache = open_corpus_cache(args.cache_dir, preprocessor)
+    processed = cache.preprocess(texts, preprocessor.preprocess_batch)
+    cache.close()
+
+    y = np.asarray(intents)
+    train_idx, test_idx = split_indices(y)
+    if train_idx is None:
+        raise ValueError("Não há dados/classes suficientes para avaliar após a filtragem.")
+    # Vocabulário e IDF só das linhas de treino: as frequências de documento do teste não entram na curva.
+    tfidf_vectorizer = TfidfVectorizer(ngram_range=NGRAM_RANGE).fit([processed[i] for i in train_idx])
+    X = tfidf_vectorizer.transform(processed)
+
+    points = pruning_curve(tfidf_vectorizer, X, y, train_idx, test_idx, args.methods, args.sizes, args.l1_cs, args.min_df)
+    suggestion = suggest_operating_point(points, args.max_accuracy_drop)
+    print_curve(points, suggestion)
+    print(f"\nSugestão (<-): {suggestion['method']} com {suggestion['vocabulary_size']} termos, "
+          f"acurácia {suggestion['accuracy']:.4f}, {suggestion['artifact_bytes'] / 1024:.1f} KB "
+          f"(vocabulário completo: {points[0]['vocabulary_size']} termos, {points[0]['artifact_bytes'] / 1024:.1f} KB)")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'points': points, 'suggestion': suggestion}, f, ensure_ascii=False, indent=2)
+        print(f"Curva salva em: {args.output}")
+    return points
+
+
+if __name__ == '__main__':
+    main()